@@ -1,6 +1,5 @@
 from cdb.objects import ViewObject
 from cdb.objects import Object
-from . import hr_machining_skills
 
 
 
@@ -55,4 +54,19 @@ class HrUserAnswers(ViewObject):
  
 class HrTestAttempts(ViewObject):
  __classname__ = "hr_test_attempts"
- __maps_to__ = "hr_test_attempts"
\ No newline at end of file
+ __maps_to__ = "hr_test_attempts"
+
+
+# API modules import the classes above, so they are loaded last
+from . import hr_machining_skills
+from . import skill_analytics
+from . import metricsapi
+from . import test_engine
+from . import test_authoring
+from . import training_scheduler
+from . import master_data
+from . import skill_trends
+from . import skill_export
+from . import search_index
+from . import staffing
+from . import plant_rollup
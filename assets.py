@@ -0,0 +1,248 @@
+"""Content-hashed, precompressed copies of the JS bundle.
+
+:func:`build` runs when the libraries are registered. It copies
+``js/build/kalyani-iot-skill_matrix.js`` to
+``kalyani-iot-skill_matrix.<hash>.js`` and writes ``.gz`` and (if the
+``brotli`` module is installed) ``.br`` variants next to it, plus
+``asset-manifest.json``. Unchanged bundles are not rewritten. The hash
+also becomes the library version, so every build gets new URLs and the
+old ones can be cached forever.
+
+Variants that cannot be written (read-only install) are skipped and the
+file is served uncompressed; running :func:`build` when the package is
+built leaves nothing to write at startup.
+
+``/kalyani.iot/skill_matrix/assets/<name>`` serves the hashed files. The
+static library only registers the hashed ``.js``. Requests under the
+library's URL (``LIBRARY_URL``) are answered by :func:`serve` from a
+tween on the root app (main.py), so the page's include gets the same
+treatment as the assets route. The
+variant is chosen by Accept-Encoding, each variant has its own ETag, and
+responses carry ``Cache-Control: immutable``. The source map is never
+registered with the library. It is served only when a browser's
+devtools follow the bundle's ``sourceMappingURL``, and not at all with
+``SKILL_MATRIX_SOURCE_MAPS=0``.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+
+from webob import Response
+
+from .instrumentation import log
+
+try:
+    import brotli
+except ImportError:  # optional: only gzip variants are written
+    brotli = None
+
+
+BUNDLE = "kalyani-iot-skill_matrix"
+BUILD_DIR = os.path.join(os.path.dirname(__file__), "js", "build")
+MANIFEST_FILE = "asset-manifest.json"
+# Skill_matrixApp mount path (main.py) + the asset route
+ASSET_URL = "/kalyani.iot/skill_matrix/assets/"
+# Where the static registry serves the library's files
+LIBRARY_URL = f"/static/{BUNDLE}/"
+# Library version when no bundle has been built
+FALLBACK_VERSION = "0.0.1"
+HASH_LENGTH = 12
+
+SOURCE_MAPS = os.environ.get("SKILL_MATRIX_SOURCE_MAPS", "1") not in ("0", "false")
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+# Preferred first; (Accept-Encoding token, file suffix)
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+CONTENT_TYPES = {
+    ".js": "application/javascript",
+    ".map": "application/json",
+}
+CHUNK_BYTES = 64 * 1024
+
+_manifest = None
+
+
+def _write_if_changed(path, data):
+    if os.path.exists(path) and os.path.getsize(path) == len(data):
+        with open(path, "rb") as f:
+            if f.read() == data:
+                return
+    # A unique temporary name per writer; concurrent builds never share it
+    f = tempfile.NamedTemporaryFile(dir=os.path.dirname(path), delete=False)
+    try:
+        with f:
+            f.write(data)
+        os.replace(f.name, path)
+    except BaseException:
+        os.unlink(f.name)
+        raise
+
+
+def _variants(path, data):
+    """Write ``data`` to ``path`` plus the compressed variants that could be written"""
+    _write_if_changed(path, data)
+    encodings = ["identity"]
+    # mtime=0 keeps the .gz byte-identical across rebuilds
+    compressors = [("gzip", ".gz", lambda d: gzip.compress(d, 9, mtime=0))]
+    if brotli is not None:
+        compressors.append(("br", ".br", brotli.compress))
+    for encoding, suffix, compress in compressors:
+        try:
+            _write_if_changed(path + suffix, compress(data))
+        except OSError as e:
+            log.warning("not serving %s%s: %s", os.path.basename(path), suffix, e)
+            continue
+        encodings.append(encoding)
+    return encodings
+
+
+def build(build_dir=BUILD_DIR, bundle=BUNDLE):
+    """Write the hashed bundle, its variants and the manifest; None if unbuilt"""
+    global _manifest
+    source = os.path.join(build_dir, bundle + ".js")
+    if not os.path.exists(source):
+        return None
+    with open(source, "rb") as f:
+        data = f.read()
+    digest = hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+    hashed = f"{bundle}.{digest}.js"
+    files = {hashed: _variants(os.path.join(build_dir, hashed), _rewrite_map_url(
+        data, hashed, os.path.exists(source + ".map")))}
+
+    source_map = None
+    if os.path.exists(source + ".map"):
+        source_map = hashed + ".map"
+        with open(source + ".map", "rb") as f:
+            map_data = f.read()
+        files[source_map] = _variants(os.path.join(build_dir, source_map), map_data)
+
+    manifest = {
+        "version": digest,
+        "js": hashed,
+        "map": source_map,
+        "files": files,
+    }
+    try:
+        _write_if_changed(
+            os.path.join(build_dir, MANIFEST_FILE),
+            json.dumps(manifest, indent=2, sort_keys=True).encode("utf-8"),
+        )
+    except OSError as e:
+        # Only for tooling; the process serves from the in-memory manifest
+        log.warning("could not write %s: %s", MANIFEST_FILE, e)
+    _manifest = dict(manifest, build_dir=build_dir)
+    log.info("asset bundle %s (%s)", hashed, ", ".join(files[hashed]))
+    return manifest
+
+
+def _rewrite_map_url(data, hashed, has_map):
+    """Point the bundle's sourceMappingURL at the hashed map (or drop it)"""
+    marker = b"//# sourceMappingURL="
+    position = data.rfind(marker)
+    if position >= 0:
+        data = data[:position].rstrip(b"\n")
+        if has_map:
+            data += b"\n" + marker + f"{ASSET_URL}{hashed}.map".encode("ascii")
+        data += b"\n"
+    return data
+
+
+def version():
+    """Library version: the bundle's content hash once built"""
+    return _manifest["version"] if _manifest else FALLBACK_VERSION
+
+
+def manifest():
+    return _manifest
+
+
+def _accepted(accept_encoding):
+    accepted = set()
+    for token in (accept_encoding or "").split(","):
+        name, _, params = token.partition(";")
+        quality = params.strip().replace(" ", "")
+        if quality.startswith("q=") and quality[2:] in ("0", "0.0", "0.00", "0.000"):
+            continue
+        accepted.add(name.strip().lower())
+    return accepted
+
+
+def _negotiate(accept_encoding, available):
+    accepted = _accepted(accept_encoding)
+    for encoding, suffix in ENCODINGS:
+        if encoding in available and encoding in accepted:
+            return encoding, suffix
+    return None, ""
+
+
+def _iter_file(path):
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(CHUNK_BYTES)
+            if not chunk:
+                return
+            yield chunk
+
+
+class Asset:
+    """One hashed file from the manifest"""
+
+    def __init__(self, name, encodings, build_dir):
+        self.name = name
+        self.encodings = encodings
+        self.build_dir = build_dir
+
+    @classmethod
+    def lookup(cls, name):
+        """The asset called ``name``, or None (unknown files are never served)"""
+        if _manifest is None or name not in _manifest["files"]:
+            return None
+        if name == _manifest["map"] and not SOURCE_MAPS:
+            return None
+        return cls(name, _manifest["files"][name], _manifest["build_dir"])
+
+    def response(self, request):
+        headers = {
+            "Cache-Control": IMMUTABLE,
+            "Vary": "Accept-Encoding",
+        }
+        encoding, suffix = _negotiate(
+            request.headers.get("Accept-Encoding"), self.encodings
+        )
+        # One strong ETag per content-coding, so caches keep them apart
+        etag = f"{self.name}-{encoding}" if encoding else self.name
+        if etag in request.if_none_match:
+            response = Response(status=304)
+            response.headers.update(headers)
+            response.etag = etag
+            return response
+
+        path = os.path.join(self.build_dir, self.name + suffix)
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        headers["Content-Length"] = str(os.path.getsize(path))
+        response = Response(
+            app_iter=_iter_file(path),
+            content_type=CONTENT_TYPES[os.path.splitext(self.name)[1]],
+        )
+        response.headers.update(headers)
+        response.etag = etag
+        return response
+
+
+def serve(request):
+    """Response for a hashed bundle file, else None
+
+    Used by the root tween for requests under ``LIBRARY_URL``, so the
+    static library's URL for the bundle is served like the assets route.
+    """
+    if request.method not in ("GET", "HEAD"):
+        return None
+    name = request.path.rsplit("/", 1)[-1]
+    if not name.startswith(BUNDLE + "."):
+        return None
+    asset = Asset.lookup(name)
+    return asset.response(request) if asset is not None else None
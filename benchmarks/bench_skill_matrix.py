@@ -0,0 +1,258 @@
+"""Benchmark the skill_matrix hot paths against a synthetic plant.
+
+Runs outside the platform, on the SQLite stand-ins from ``standin.py``::
+
+    python benchmarks/bench_skill_matrix.py --employees 500 --skills 40 \\
+        --trainings 2000 --repeat 30
+
+The script builds N employees × M skills (plus K training schedules) and
+then calls ``MachiningSkillsData``, ``TrainingScheduleData`` and
+``PlantCodeHandler`` directly. For each operation it reports throughput,
+p50/p95/p99 latency and peak traced memory. Compare runs before and after
+a change to the handlers, since absolute numbers on SQLite do not carry
+over to the production database.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import standin  # noqa: E402  (must run before the package is imported)
+
+standin.install()
+pkg = standin.load_package()
+
+from skill_matrix import conditional, schedule_employees, skill_changes  # noqa: E402
+from skill_matrix import training_calendar  # noqa: E402
+from skill_matrix.hr_machining_skills import MachiningSkillsData  # noqa: E402
+from skill_matrix.hr_training_schedule import TrainingScheduleData  # noqa: E402
+from skill_matrix.plantcodeapi import PlantCodeHandler, plant_code_cache  # noqa: E402
+
+
+PLANT = 2021
+
+BASE_SCHEMA = (
+    """
+    CREATE TABLE hr_machining_skills (
+        cdb_object_id VARCHAR(40) PRIMARY KEY,
+        machining_skills_names VARCHAR(200), f_c_g CHAR(1),
+        department VARCHAR(100), education VARCHAR(100),
+        person_name VARCHAR(200), skill_required INTEGER, actual INTEGER,
+        liness VARCHAR(100), plantt_code INTEGER
+    )
+    """,
+    "CREATE INDEX hr_machining_skills_plant ON hr_machining_skills"
+    " (plantt_code, f_c_g, department)",
+    """
+    CREATE TABLE hr_training_schedule (
+        cdb_object_id VARCHAR(40) PRIMARY KEY,
+        training_id VARCHAR(60), skill_id INTEGER, skill_name VARCHAR(200),
+        skill_code VARCHAR(60), skill_type CHAR(1), employee_ids TEXT,
+        employee_names TEXT, training_date VARCHAR(10),
+        training_day VARCHAR(20), training_time VARCHAR(5),
+        duration_hours REAL, trainer_name VARCHAR(100), notes TEXT
+    )
+    """,
+    """
+    CREATE TABLE angestellter (
+        personalnummer VARCHAR(20) PRIMARY KEY, plant_code INTEGER
+    )
+    """,
+)
+
+
+def build_schema():
+    conn = standin.connection()
+    for ddl in BASE_SCHEMA:
+        conn.execute(ddl)
+    schedule_employees.create_link_table()
+    skill_changes.create_change_table()
+    conditional.create_version_table()
+    training_calendar.create_date_index()
+
+
+def synthetic_plant(employees, skills, trainings, seed=7):
+    rnd = random.Random(seed)
+    lines = [f"Line {i}" for i in range(1, 9)]
+    departments = ["Machining", "Forging", "Assembly", "Quality"]
+    skill_names = [f"Skill {i:03d}" for i in range(skills)]
+    skill_types = {name: rnd.choice("FCG") for name in skill_names}
+
+    rows = []
+    for e in range(employees):
+        person = f"Operator {e:05d}"
+        line = rnd.choice(lines)
+        department = rnd.choice(departments)
+        for name in skill_names:
+            required = rnd.randint(1, 4)
+            rows.append({
+                "machining_skills_names": name,
+                "f_c_g": skill_types[name],
+                "department": department,
+                "person_name": person,
+                "skill_required": required,
+                "actual": rnd.randint(0, 4),
+                "liness": line,
+                "plantt_code": PLANT,
+            })
+
+    sessions = []
+    for t in range(trainings):
+        attendees = rnd.sample(range(employees), k=min(employees, rnd.randint(2, 12)))
+        day = rnd.randint(1, 28)
+        month = rnd.randint(1, 12)
+        sessions.append({
+            "training_id": f"TRN_BENCH_{t}",
+            "skill_id": rnd.randint(1, skills),
+            "skill_name": rnd.choice(skill_names),
+            "skill_type": rnd.choice("FCG"),
+            "employee_ids": [str(a) for a in attendees],
+            "employee_names": [f"Operator {a:05d}" for a in attendees],
+            "training_date": f"{day:02d}/{month:02d}/2026",
+            "training_time": rnd.choice(["09:00", "11:00", "14:00"]),
+            "duration_hours": rnd.choice([1, 2, 4]),
+            "trainer_name": f"Trainer {rnd.randint(1, 15)}",
+        })
+    return rows, sessions
+
+
+def load(rows, sessions, employees):
+    skills = MachiningSkillsData()
+    trainings = TrainingScheduleData()
+    result = skills.create_skills_bulk(rows)
+    assert result["status"] == "success", result["message"]
+    result = trainings.create_training_schedule_bulk(sessions)
+    assert result["status"] == "success", result["message"]
+    conn = standin.connection()
+    conn.executemany(
+        "INSERT INTO angestellter (personalnummer, plant_code) VALUES (?, ?)",
+        [(str(1000 + e), PLANT) for e in range(employees)],
+    )
+
+
+def _percentile(ordered, pct):
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def measure(name, func, repeat):
+    func()  # warm up statement caches
+    timings = []
+    tracemalloc.start()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - t0) * 1000.0)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    timings.sort()
+    return {
+        "operation": name,
+        "ops_per_s": round(repeat / elapsed, 1) if elapsed else None,
+        "p50_ms": round(_percentile(timings, 50), 3),
+        "p95_ms": round(_percentile(timings, 95), 3),
+        "p99_ms": round(_percentile(timings, 99), 3),
+        "peak_kib": round(peak / 1024.0, 1),
+    }
+
+
+def _drain(response):
+    return sum(len(chunk) for chunk in response.app_iter)
+
+
+def operations(employees):
+    skills = MachiningSkillsData()
+    trainings = TrainingScheduleData()
+    plant = PlantCodeHandler()
+    filters = {"plantt_code": PLANT}
+    counter = iter(range(10 ** 9))
+
+    def single_update():
+        row = skills.get_skill_matrix(filters, limit=1)["people"][0]
+        cell = next(iter(row["cells"].values()))
+        skills.update_skill({
+            "cdb_object_id": cell["cdb_object_id"], "machining_skills_names": "Skill 000",
+            "f_c_g": "C", "person_name": row["person_name"], "actual": 2,
+            "skill_required": 3, "liness": row["liness"],
+            "department": row["department"], "plantt_code": PLANT,
+        })
+
+    def create_and_delete():
+        n = next(counter)
+        batch = [{"machining_skills_names": f"Bench {n}", "person_name": f"Bench {i}",
+                  "plantt_code": PLANT} for i in range(100)]
+        result = skills.create_skills_bulk(batch)
+        for oid in result["cdb_object_ids"][:5]:
+            skills.delete_skill({"cdb_object_id": oid})
+
+    def plant_code_cold():
+        plant_code_cache.invalidate()
+        plant.logic_for_api()
+
+    return [
+        ("skills.get plant", lambda: skills.get_skills_data(filters)),
+        ("skills.get plant+type", lambda: skills.get_skills_data(
+            {"plantt_code": PLANT, "skill_type": "C"})),
+        ("skills.matrix page", lambda: skills.get_skill_matrix(filters, limit=50)),
+        ("skills.stream ndjson", lambda: _drain(
+            skills.stream_skills_data(filters, ndjson=True))),
+        ("skills.since latest", lambda: skills.get_skill_changes(
+            skill_changes.current_version(PLANT) - 10, filters)),
+        ("skills.data_version", lambda: skills.data_version(filters)),
+        ("skills.update", single_update),
+        ("skills.bulk create 100 + delete 5", create_and_delete),
+        ("training.get all", lambda: trainings.get_training_schedules({})),
+        ("training.get employee", lambda: trainings.get_training_schedules(
+            {"employee_id": str(random.randrange(employees))})),
+        ("training.calendar month", lambda: trainings.get_calendar(
+            {"date_from": "2026-03-01", "date_to": "2026-03-31"}, bucket="week")),
+        ("plant_code cold", plant_code_cold),
+        ("plant_code warm", plant.logic_for_api),
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--employees", type=int, default=300)
+    parser.add_argument("--skills", type=int, default=30)
+    parser.add_argument("--trainings", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--only", help="run operations whose name contains this")
+    parser.add_argument("--json", action="store_true", help="print JSON lines")
+    args = parser.parse_args(argv)
+
+    build_schema()
+    t0 = time.perf_counter()
+    rows, sessions = synthetic_plant(args.employees, args.skills, args.trainings)
+    load(rows, sessions, args.employees)
+    print(f"# plant: {len(rows)} skill rows, {len(sessions)} trainings,"
+          f" loaded in {time.perf_counter() - t0:.2f}s", file=sys.stderr)
+
+    results = []
+    for name, func in operations(args.employees):
+        if args.only and args.only not in name:
+            continue
+        results.append(measure(name, func, args.repeat))
+
+    if args.json:
+        for result in results:
+            print(json.dumps(result))
+        return
+    header = f"{'operation':36} {'ops/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'peak KiB':>10}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(f"{r['operation']:36} {r['ops_per_s']:>9} {r['p50_ms']:>9} "
+              f"{r['p95_ms']:>9} {r['p99_ms']:>9} {r['peak_kib']:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+"""SQLite-backed stand-ins for the CONTACT platform modules.
+
+:func:`install` registers ``cdb.*``, ``cs.platform.*`` (and ``webob`` if it
+is missing) in ``sys.modules`` so the skill_matrix package can be imported
+and driven outside the platform. ``cdb.sqlapi`` runs on an in-memory
+SQLite database. The only SQL rewrite is ``OFFSET 0 ROWS FETCH NEXT ? ROWS
+ONLY`` → ``LIMIT ?``. Everything else the handlers send is plain SQL that
+SQLite accepts as is.
+"""
+
+import importlib.util
+import itertools
+import os
+import re
+import sqlite3
+import sys
+import threading
+import types
+import uuid
+
+
+_FETCH_NEXT = re.compile(r"OFFSET\s+0\s+ROWS\s+FETCH\s+NEXT\s+\?\s+ROWS\s+ONLY", re.I)
+
+_db = threading.local()
+# Shared-cache in-memory database, so worker threads see the same data
+MEMORY_DB = "file:skill_matrix_bench?mode=memory&cache=shared"
+_db_path = MEMORY_DB
+_shared = {}
+
+# personalnummer returned by cdb.auth.get_attribute
+current_user = {"personalnummer": "1001"}
+
+
+def connection():
+    conn = getattr(_db, "conn", None)
+    if conn is None:
+        # One connection per thread on a shared in-memory database
+        conn = sqlite3.connect(
+            _db_path, uri=_db_path.startswith("file:"),
+            isolation_level=None, check_same_thread=False,
+        )
+        conn.row_factory = sqlite3.Row
+        _db.conn = conn
+        _db.depth = 0
+        _shared.setdefault("keepalive", conn)
+    return conn
+
+
+def _translate(sql):
+    return _FETCH_NEXT.sub("LIMIT ?", sql)
+
+
+class _Row(dict):
+    pass
+
+
+class RecordSet2(list):
+    def __init__(self, table=None, condition=None, sql=None, params=()):
+        if sql is None:
+            sql = f"SELECT * FROM {table} WHERE {condition or '1=1'}"
+        cursor = connection().execute(_translate(sql), list(params))
+        names = [d[0] for d in cursor.description]
+        super().__init__(_Row(zip(names, row)) for row in cursor.fetchall())
+
+
+def SQL(sql, params=()):
+    return connection().execute(_translate(sql), list(params)).rowcount
+
+
+class Record(dict):
+    def __init__(self, table, **key):
+        super().__init__(key)
+        self._table = table
+        self._key = dict(key)
+        self._changed = {}
+
+    def __setitem__(self, name, value):
+        super().__setitem__(name, value)
+        self._changed[name] = value
+
+    def insert(self):
+        columns = list(self.keys())
+        SQL(f"INSERT INTO {self._table} ({', '.join(columns)})"
+            f" VALUES ({', '.join('?' * len(columns))})",
+            [self[c] for c in columns])
+
+    def _where(self):
+        return " AND ".join(f"{k} = ?" for k in self._key), list(self._key.values())
+
+    def update(self):
+        if not self._changed:
+            return
+        where, params = self._where()
+        sets = ", ".join(f"{k} = ?" for k in self._changed)
+        SQL(f"UPDATE {self._table} SET {sets} WHERE {where}",
+            list(self._changed.values()) + params)
+
+    def delete(self):
+        where, params = self._where()
+        SQL(f"DELETE FROM {self._table} WHERE {where}", params)
+
+
+class Transaction:
+    """Outermost level is BEGIN/COMMIT, nested levels are savepoints"""
+
+    def __enter__(self):
+        conn = connection()
+        self._depth = _db.depth
+        if self._depth == 0:
+            conn.execute("BEGIN")
+        else:
+            conn.execute(f"SAVEPOINT sp{self._depth}")
+        _db.depth += 1
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        conn = connection()
+        _db.depth -= 1
+        if self._depth == 0:
+            conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        elif exc_type:
+            conn.execute(f"ROLLBACK TO sp{self._depth}")
+            conn.execute(f"RELEASE sp{self._depth}")
+        else:
+            conn.execute(f"RELEASE sp{self._depth}")
+        return False
+
+
+_counters = {}
+_counter_lock = threading.Lock()
+
+
+def nextval(name):
+    with _counter_lock:
+        counter = _counters.setdefault(name, itertools.count(1))
+        return next(counter)
+
+
+class _Decorators:
+    """Accepts any decorator-factory call and returns the function as is"""
+
+    @classmethod
+    def _passthrough(cls, *args, **kwargs):
+        return lambda func: func
+
+    path = json = view = mount = _passthrough
+
+
+class _Response:
+    """Just enough of webob.Response for the streaming and 304 paths"""
+
+    def __init__(self, body=b"", status=200, app_iter=None,
+                 content_type="text/html", charset=None, headers=None):
+        self.status = status
+        self.app_iter = app_iter if app_iter is not None else [body]
+        self.content_type = content_type
+        self.charset = charset
+        self.headers = dict(headers or {})
+        self.etag = None
+
+
+class Request:
+    """Minimal request: params, json body, If-None-Match, after-callbacks"""
+
+    def __init__(self, params=None, json=None, if_none_match=(), path="/"):
+        self.params = dict(params or {})
+        self.json = json
+        self.if_none_match = set(if_none_match)
+        self.content_length = 0
+        self.path = path
+        self.after_callbacks = []
+        self.app = types.SimpleNamespace(include=lambda *a, **k: None)
+
+    def after(self, func):
+        self.after_callbacks.append(func)
+        return func
+
+
+def _module(name, **attrs):
+    module = types.ModuleType(name)
+    module.__dict__.update(attrs)
+    sys.modules[name] = module
+    return module
+
+
+def install(db_path=MEMORY_DB):
+    """Register the stand-in modules; call before importing the package
+
+    Later calls do nothing, so scripts and tests can each call it.
+    """
+    global _db_path
+    if _shared.get("installed"):
+        return
+    _shared["installed"] = True
+    _db_path = db_path
+
+    _module("cdb.sqlapi", RecordSet2=RecordSet2, SQL=SQL, Record=Record)
+    _module("cdb.auth", get_attribute=lambda name: current_user.get(name))
+    _module("cdb.transaction", Transaction=Transaction)
+    _module("cdb.cdbuuid", create_uuid=lambda: str(uuid.uuid4()))
+    _module("cdb.util", nextval=nextval)
+    _module("cdb.sig", connect=lambda *args, **kwargs: (lambda func: func))
+    _module("cdb.rte", APPLICATIONS_LOADED_HOOK="APPLICATIONS_LOADED_HOOK")
+
+    class Object:
+        pass
+
+    class ViewObject(Object):
+        pass
+
+    class Person(Object):
+        pass
+
+    _module("cdb.objects", Object=Object, ViewObject=ViewObject)
+    _module("cdb.objects.org", Person=Person)
+    cdb = _module("cdb")
+    for name in ("sqlapi", "auth", "transaction", "cdbuuid", "util", "sig",
+                 "rte", "objects"):
+        setattr(cdb, name, sys.modules["cdb." + name])
+
+    class JsonAPI(_Decorators):
+        pass
+
+    class Internal(_Decorators):
+        pass
+
+    _module("cs")
+    _module("cs.platform")
+    _module("cs.platform.web", JsonAPI=JsonAPI, static=types.SimpleNamespace())
+    _module("cs.platform.web.root", Internal=Internal, Root=Internal)
+
+    if importlib.util.find_spec("webob") is None:
+        _module("webob", Response=_Response)
+
+
+def load_package(name="skill_matrix"):
+    """Import the repository root as package ``name``"""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    spec = importlib.util.spec_from_file_location(
+        name, os.path.join(root, "__init__.py"),
+        submodule_search_locations=[root],
+    )
+    package = importlib.util.module_from_spec(spec)
+    sys.modules[name] = package
+    spec.loader.exec_module(package)
+    return package
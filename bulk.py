@@ -0,0 +1,189 @@
+"""Chunked multi-row INSERTs, UPDATEs and DELETEs for the handlers.
+
+Rows are written up to ``BULK_CHUNK_ROWS`` at a time with one
+``INSERT ... VALUES (...), (...)`` statement per chunk. Wide tables get
+smaller chunks: no statement binds more than ``MAX_BIND_PARAMS``
+parameters. ``cdb_object_id``
+values are assigned up front so they can be returned to the client.
+Batch updates set each column with a ``CASE`` over the row ids, so one
+statement updates a whole chunk of rows with different values.
+"""
+
+from cdb import cdbuuid
+from cdb import transaction
+
+from . import sqlquery
+
+
+# Rows per INSERT / DELETE statement, at most
+BULK_CHUNK_ROWS = 200
+# Bind parameters per statement (SQL Server allows 2100)
+MAX_BIND_PARAMS = 2000
+
+
+def chunk_rows(params_per_row, limit=BULK_CHUNK_ROWS, power_of_two=False):
+    """Rows per statement so that rows × ``params_per_row`` fits the budget
+
+    With ``power_of_two`` the result is a power of two, for statements
+    whose row lists are padded by :func:`_pad` / ``sqlquery.placeholders``.
+    """
+    rows = max(1, min(limit, MAX_BIND_PARAMS // params_per_row))
+    if power_of_two:
+        size = 1
+        while size * 2 <= rows:
+            size *= 2
+        rows = size
+    return rows
+
+
+def _insert_chunk(table, columns, rows):
+    row_marks = "(" + ", ".join("?" * len(columns)) + ")"
+    sql = sqlquery.statement(
+        "INSERT INTO {0} ({1}) VALUES {2}",
+        table, ", ".join(columns), ", ".join([row_marks] * len(rows)),
+    )
+    sqlquery.execute(sql, [value for row in rows for value in row])
+
+
+def bulk_insert(table, columns, rows, chunk_size=BULK_CHUNK_ROWS, atomic=True,
+                on_chunk=None):
+    """Insert ``rows`` (value tuples matching ``columns``) into ``table``.
+
+    With ``atomic`` the whole batch runs in one transaction and the first
+    failing chunk rolls everything back. Otherwise each chunk commits on its
+    own and the failed chunks are listed in the result.
+
+    ``on_chunk(rows)`` is called inside the transaction after each chunk is
+    written, with the rows prefixed by their new ``cdb_object_id``.
+    """
+    columns = ("cdb_object_id",) + tuple(columns)
+    chunk_size = chunk_rows(len(columns), chunk_size)
+    rows = [(cdbuuid.create_uuid(),) + tuple(row) for row in rows]
+    chunks = [
+        (start, rows[start:start + chunk_size])
+        for start in range(0, len(rows), chunk_size)
+    ]
+
+    def chunk_report(index, start, chunk, status, message=None):
+        report = {
+            "chunk": index,
+            "rows": [start, start + len(chunk) - 1],
+            "status": status,
+        }
+        if message:
+            report["message"] = message
+        return report
+
+    reports = []
+    created_ids = []
+
+    if atomic:
+        failed = None
+        try:
+            with transaction.Transaction():
+                for index, (start, chunk) in enumerate(chunks):
+                    failed = index
+                    _insert_chunk(table, columns, chunk)
+                    if on_chunk is not None:
+                        on_chunk(chunk)
+                    reports.append(chunk_report(index, start, chunk, "ok"))
+                failed = None
+        except Exception as e:
+            reports = [
+                chunk_report(index, start, chunk,
+                             "error" if index == failed else "rolled_back",
+                             str(e) if index == failed else None)
+                for index, (start, chunk) in enumerate(chunks)
+            ]
+            return {
+                "status": "error",
+                "message": f"Bulk insert failed in chunk {failed}: {e}",
+                "created": 0,
+                "cdb_object_ids": [],
+                "chunks": reports,
+            }
+        created_ids = [row[0] for row in rows]
+    else:
+        for index, (start, chunk) in enumerate(chunks):
+            try:
+                with transaction.Transaction():
+                    _insert_chunk(table, columns, chunk)
+                    if on_chunk is not None:
+                        on_chunk(chunk)
+            except Exception as e:
+                reports.append(chunk_report(index, start, chunk, "error", str(e)))
+                continue
+            reports.append(chunk_report(index, start, chunk, "ok"))
+            created_ids.extend(row[0] for row in chunk)
+
+    failed_chunks = [r for r in reports if r["status"] == "error"]
+    if not failed_chunks:
+        status = "success"
+    elif created_ids:
+        status = "partial"
+    else:
+        status = "error"
+    return {
+        "status": status,
+        "message": f"Created {len(created_ids)} of {len(rows)} {table} record(s)",
+        "created": len(created_ids),
+        "cdb_object_ids": created_ids,
+        "chunks": reports,
+    }
+
+
+def _pad(rows):
+    # Power-of-two row counts keep the number of statement texts small;
+    # repeating the last row is harmless in CASE and IN lists
+    size = 1
+    while size < len(rows):
+        size *= 2
+    return rows + [rows[-1]] * (size - len(rows))
+
+
+def update_rows(table, columns, rows):
+    """Set ``columns`` per row with one statement per chunk.
+
+    ``rows`` are ``(cdb_object_id, value, ...)`` tuples matching
+    ``columns``. Each column becomes a ``CASE cdb_object_id WHEN ? THEN ?``
+    expression, and the rows are matched with ``cdb_object_id IN (...)``.
+    Returns the number of rows updated.
+    """
+    columns = tuple(columns)
+    chunk_size = chunk_rows(2 * len(columns) + 1, MAX_BIND_PARAMS, power_of_two=True)
+    updated = 0
+    for start in range(0, len(rows), chunk_size):
+        chunk = _pad(list(rows[start:start + chunk_size]))
+        cases = ", ".join(
+            "{0} = CASE cdb_object_id{1} END".format(
+                column, " WHEN ? THEN ?" * len(chunk)
+            )
+            for column in columns
+        )
+        sql = sqlquery.statement(
+            "UPDATE {0} SET {1} WHERE cdb_object_id IN ({2})",
+            table, cases, ", ".join("?" * len(chunk)),
+        )
+        params = []
+        for position in range(len(columns)):
+            for row in chunk:
+                params += [row[0], row[position + 1]]
+        params += [row[0] for row in chunk]
+        sqlquery.execute(sql, params)
+        updated += min(chunk_size, len(rows) - start)
+    return updated
+
+
+def delete_rows(table, cdb_object_ids, chunk_size=BULK_CHUNK_ROWS):
+    """Delete rows by ``cdb_object_id`` with one IN (...) per chunk"""
+    cdb_object_ids = list(cdb_object_ids)
+    # placeholders() pads each chunk up to a power of two
+    chunk_size = chunk_rows(1, chunk_size, power_of_two=True)
+    for start in range(0, len(cdb_object_ids), chunk_size):
+        markers, ids = sqlquery.placeholders(cdb_object_ids[start:start + chunk_size])
+        sqlquery.execute(
+            sqlquery.statement("DELETE FROM {0} WHERE cdb_object_id IN ({1})",
+                               table, markers),
+            ids,
+        )
+    return len(cdb_object_ids)
@@ -0,0 +1,141 @@
+"""Single-flight coalescing for identical concurrent GETs.
+
+At shift start many terminals send the same GET within a second. With
+:func:`do`, the first request for a key (the leader) runs the work.
+Requests arriving with the same key while it runs wait for it and get
+its result instead of running their own query. Nothing is kept after
+the flight lands, so this is not a cache. A request never sees data
+older than one in-flight call.
+
+:func:`shared_json` also shares the serialization: the leader encodes the
+body once and every waiter gets a response over the same bytes.
+
+Counters per flight group (leaders, shared, ratio, largest group) are
+exposed by the metrics endpoint. ``SKILL_MATRIX_COALESCE=0`` turns
+coalescing off.
+"""
+
+import os
+import threading
+
+from webob import Response
+
+from .instrumentation import log, phase
+from .streaming import _encode
+
+
+ENABLED = os.environ.get("SKILL_MATRIX_COALESCE", "1") not in ("0", "false")
+# Waiters give up on a stuck leader after this and run the work themselves
+WAIT_SECONDS = float(os.environ.get("SKILL_MATRIX_COALESCE_WAIT_S", "30"))
+
+_groups = {}
+_groups_lock = threading.Lock()
+
+
+class _Flight:
+    __slots__ = ("landed", "value", "error", "waiters")
+
+    def __init__(self):
+        self.landed = threading.Event()
+        self.value = None
+        self.error = None
+        self.waiters = 0
+
+
+class FlightGroup:
+    """In-flight calls of one kind, keyed by normalized request"""
+
+    def __init__(self, name):
+        self.name = name
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.leaders = 0
+        self.shared = 0
+        self.timeouts = 0
+        self.largest = 0
+
+    def do(self, key, work):
+        """Result of ``work()``, shared with concurrent calls for ``key``"""
+        with self._lock:
+            self.calls += 1
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = self._flights[key] = _Flight()
+                self.leaders += 1
+                leader = True
+            else:
+                flight.waiters += 1
+                self.shared += 1
+                self.largest = max(self.largest, flight.waiters + 1)
+                leader = False
+
+        if not leader:
+            if not flight.landed.wait(WAIT_SECONDS):
+                with self._lock:
+                    self.timeouts += 1
+                log.warning("%s: leader still running after %.0f s, running %r alone",
+                            self.name, WAIT_SECONDS, key)
+                return work()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = work()
+            return flight.value
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.landed.set()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "executed": self.leaders,
+                "shared": self.shared,
+                "coalescing_ratio": round(self.shared / self.calls, 4) if self.calls else 0.0,
+                "largest_group": self.largest,
+                "in_flight": len(self._flights),
+                "wait_timeouts": self.timeouts,
+            }
+
+
+def group(name):
+    with _groups_lock:
+        flights = _groups.get(name)
+        if flights is None:
+            flights = _groups[name] = FlightGroup(name)
+        return flights
+
+
+def do(name, key, work):
+    """Run ``work()`` once for all concurrent calls with the same name and key"""
+    if not ENABLED:
+        return work()
+    return group(name).do(key, work)
+
+
+def _encoded(build):
+    value = build()
+    with phase("encode"):
+        return _encode(value).encode("utf-8")
+
+
+def shared_json(name, key, build):
+    """JSON response of ``build()``, built and encoded once per concurrent key
+
+    ``build`` must return plain JSON data, not a Response.
+    """
+    body = do(name, key, lambda: _encoded(build))
+    return Response(body=body, content_type="application/json", charset="utf-8")
+
+
+def stats():
+    with _groups_lock:
+        groups = list(_groups.values())
+    return {flights.name: flights.stats() for flights in groups}
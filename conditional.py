@@ -0,0 +1,89 @@
+"""ETag / If-None-Match support for the internal GET handlers.
+
+A handler computes a cheap version for the data behind a request (row
+count of the filter plus a modification stamp) and calls
+:func:`conditional`. If the client already has that version, a bodiless
+304 goes out before the main query or serialization runs. Otherwise the
+body is built and the strong ETag is set on the response.
+
+Tables without a usable modification column get their stamp from
+``hr_skill_matrix_versions``. This is a per-table counter that the write
+paths increase with :func:`bump` inside their transaction. Create it once
+with :func:`create_version_table`.
+"""
+
+import hashlib
+
+from webob import Response
+
+from . import sqlquery
+from .sqlquery import statement
+
+
+VERSION_TABLE = "hr_skill_matrix_versions"
+
+CREATE_STATEMENTS = (
+    f"""
+    CREATE TABLE {VERSION_TABLE} (
+        table_name VARCHAR(64) NOT NULL PRIMARY KEY,
+        version BIGINT NOT NULL
+    )
+    """,
+)
+
+
+def create_version_table():
+    for ddl in CREATE_STATEMENTS:
+        sqlquery.execute(ddl)
+
+
+def bump(table):
+    """Increase the stamp of ``table``; call in the writer's transaction"""
+    updated = sqlquery.execute(
+        f"UPDATE {VERSION_TABLE} SET version = version + 1 WHERE table_name = ?",
+        [table],
+    )
+    if not updated:
+        sqlquery.execute(
+            f"INSERT INTO {VERSION_TABLE} (table_name, version) VALUES (?, 1)",
+            [table],
+        )
+
+
+def table_stamp(table):
+    rs = sqlquery.select(
+        f"SELECT version FROM {VERSION_TABLE} WHERE table_name = ?", [table]
+    )
+    return int(rs[0]["version"]) if rs and len(rs) else 0
+
+
+def row_count(table, where, params):
+    rs = sqlquery.select(
+        statement("SELECT COUNT(*) AS cnt FROM {0} WHERE {1}", table, where),
+        params,
+    )
+    return int(rs[0]["cnt"] or 0) if rs and len(rs) else 0
+
+
+def make_etag(*parts):
+    """Strong ETag value (unquoted) for the given version parts"""
+    return hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()
+
+
+def request_key(request):
+    """Normalized query string, so equal filters give equal ETags"""
+    return tuple(sorted(request.params.items()))
+
+
+def conditional(request, etag, build):
+    """Answer 304 if ``etag`` matches If-None-Match, else return ``build()``"""
+    if etag in request.if_none_match:
+        response = Response(status=304)
+        response.etag = etag
+        return response
+
+    @request.after
+    def _set_etag(response):
+        response.etag = etag
+
+    return build()
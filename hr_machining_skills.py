@@ -1,8 +1,85 @@
 from cs.platform.web import JsonAPI
 from cs.platform.web.root import Internal
-from cdb import sqlapi
+from cdb import sqlapi, cdbuuid, transaction
 from datetime import datetime, date
 
+from . import coalesce
+from . import matrix_index
+from . import search_index
+from . import skill_changes
+from . import sqlquery
+from .bulk import bulk_insert, delete_rows, update_rows
+from .instrumentation import add_rows, instrumented, log, phase
+from .conditional import conditional, make_etag, request_key, row_count
+from .sqlquery import statement
+from .streaming import iter_keyset, stream_response, wants_stream
+
+
+# Matrix view: number of people per page (default / hard cap)
+MATRIX_PAGE_SIZE = 50
+MATRIX_MAX_PAGE_SIZE = 500
+
+SKILL_COLUMNS = (
+    "cdb_object_id",
+    "machining_skills_names",
+    "f_c_g",
+    "person_name",
+    "skill_required",
+    "actual",
+    "liness",
+    "department",
+    "plantt_code",
+)
+# Columns written by POST (cdb_object_id is assigned on insert)
+INSERT_COLUMNS = (
+    "machining_skills_names",
+    "f_c_g",
+    "department",
+    "education",
+    "person_name",
+    "skill_required",
+    "actual",
+    "liness",
+    "plantt_code",
+)
+# Columns a batch update may set, with their value conversion
+BATCH_COLUMNS = {
+    "machining_skills_names": None,
+    "f_c_g": None,
+    "department": None,
+    "education": None,
+    "person_name": None,
+    "skill_required": int,
+    "actual": int,
+    "liness": None,
+    "plantt_code": int,
+}
+
+
+def _skill_values(obj):
+    """Column values for a new skill record, with POST defaults applied"""
+    return {
+        "machining_skills_names": obj.get("machining_skills_names"),
+        "f_c_g": obj.get("f_c_g", "G"),
+        "department": obj.get("department", ""),
+        "education": obj.get("education", ""),
+        "person_name": obj.get("person_name", ""),
+        "skill_required": obj.get("skill_required", 1),
+        "actual": obj.get("actual", 0),
+        "liness": obj.get("liness", ""),
+        "plantt_code": obj.get("plantt_code", 2021),
+    }
+
+
+def _committed(rows=(), deleted=()):
+    """Apply committed writes to the in-process matrix and search indexes"""
+    for row in rows:
+        matrix_index.upsert(row)
+        search_index.upsert(row)
+    if deleted:
+        matrix_index.remove(deleted)
+        search_index.remove(deleted)
+
 
 class MachiningSkillsAPI(JsonAPI):
     pass
@@ -19,35 +96,24 @@ class MachiningSkillsData:
     # 🔹 GET → Fetch all skills or with filters
     def get_skills_data(self, filters=None):
         filters = filters or {}
-        skill_type = filters.get('skill_type')
-        department = filters.get('department')
-        plantt_code = filters.get('plantt_code')
-
-        sql = """
-            SELECT
-                cdb_object_id,
-                machining_skills_names,
-                f_c_g,
-                person_name,
-                skill_required,
-                actual,
-                liness,
-                department,
-                plantt_code
-            FROM hr_machining_skills
-            WHERE 1=1
-        """
-
-        if skill_type:
-            sql += f" AND f_c_g = '{skill_type}'"
-        if department:
-            sql += f" AND department = '{department}'"
-        if plantt_code:
-            sql += f" AND plantt_code = {plantt_code}"
-
-        rs = sqlapi.RecordSet2(sql=sql)
-        print(f"📋 SQL Query: {sql}")
-        print(f"✅ Found {len(rs)} records")
+        index = matrix_index.for_plant(filters.get('plantt_code'))
+        if index is not None:
+            # Plant filter → served from the in-process index
+            with phase("serialize"):
+                rows = index.rows(filters)
+            add_rows(len(rows))
+            return rows
+
+        where, params = sqlquery.where(sqlquery.SKILL_FILTERS, filters)
+        sql = statement(
+            "SELECT {0} FROM hr_machining_skills WHERE {1}",
+            ", ".join(SKILL_COLUMNS), where,
+        )
+
+        with phase("query"):
+            rs = sqlquery.select(sql, params)
+        add_rows(len(rs))
+        log.debug("skills query %s %s: %d rows", sql, params, len(rs))
 
         def serialize(row):
             result = {}
@@ -58,7 +124,144 @@ class MachiningSkillsData:
                     result[key] = value
             return result
 
-        return [serialize(row) for row in rs]
+        with phase("serialize"):
+            return [serialize(row) for row in rs]
+
+    # 🔹 GET (stream=1 / format=ndjson) → Chunked response, flat memory
+    def stream_skills_data(self, filters=None, ndjson=False):
+        """Stream matching rows to the client in keyset-ordered chunks"""
+        where, params = sqlquery.where(sqlquery.SKILL_FILTERS, filters or {})
+        rows = iter_keyset(SKILL_COLUMNS, "hr_machining_skills", where, params)
+        return stream_response(rows, ndjson=ndjson)
+
+    # 🔹 Cheap version of a filter's data (for ETags)
+    def data_version(self, filters=None):
+        filters = filters or {}
+        index = matrix_index.for_plant(filters.get('plantt_code'))
+        if index is not None:
+            # version only moves on sync; generation also counts this
+            # process's own writes, which reach the index without a sync
+            return index.count(filters), index.version, index.built_at, index.generation
+        where, params = sqlquery.where(sqlquery.SKILL_FILTERS, filters)
+        return (
+            row_count("hr_machining_skills", where, params),
+            skill_changes.fingerprint(filters.get('plantt_code')),
+        )
+
+    # 🔹 GET (since=<version>) → Only rows changed / deleted after version
+    def get_skill_changes(self, since, filters=None):
+        """Delta since ``since``; an empty ``since`` returns just the version"""
+        filters = filters or {}
+        if since in (None, "", "latest"):
+            return {
+                "since": None,
+                "version": skill_changes.current_version(filters.get('plantt_code')),
+                "changed": [],
+                "deleted": [],
+            }
+        return skill_changes.changes_since(since, SKILL_COLUMNS, filters)
+
+    # 🔹 GET (view=matrix) → People × skills grid, one page at a time
+    def get_skill_matrix(self, filters=None, after=None, limit=None):
+        """Return one page of the pivoted skill matrix.
+
+        People are ordered by the smallest ``cdb_object_id`` of their rows,
+        which is stable across requests and used as the keyset cursor
+        (``after``). Rows whose person or skill name is empty/"None" are
+        skipped, same as the grid did client-side.
+        """
+        filters = filters or {}
+        try:
+            limit = int(limit or MATRIX_PAGE_SIZE)
+        except (TypeError, ValueError):
+            limit = MATRIX_PAGE_SIZE
+        limit = max(1, min(limit, MATRIX_MAX_PAGE_SIZE))
+
+        index = matrix_index.for_plant(filters.get('plantt_code'))
+        if index is not None:
+            with phase("serialize"):
+                return index.matrix(filters, after, limit)
+
+        where, params = sqlquery.where(
+            sqlquery.SKILL_FILTERS, filters, sqlquery.VALID_SKILL_ROWS
+        )
+
+        # 1️⃣ Page of people (keyset on their anchor cdb_object_id)
+        having = " HAVING MIN(cdb_object_id) > ?" if after else ""
+        people_sql = statement(
+            "SELECT person_name, MIN(cdb_object_id) AS anchor"
+            " FROM hr_machining_skills WHERE {0}"
+            " GROUP BY person_name{1} ORDER BY anchor" + sqlquery.FETCH_FIRST,
+            where, having,
+        )
+        people_params = params + ([after] if after else []) + [limit + 1]
+        people_rs = sqlquery.select(people_sql, people_params)
+        anchors = [(r["person_name"], r["anchor"]) for r in people_rs]
+        has_more = len(anchors) > limit
+        anchors = anchors[:limit]
+
+        # 2️⃣ F/C/G totals for the whole filter (not just this page)
+        totals = {"total": 0, "F": 0, "C": 0, "G": 0}
+        totals_sql = statement(
+            "SELECT f_c_g, COUNT(*) AS cnt FROM hr_machining_skills"
+            " WHERE {0} GROUP BY f_c_g",
+            where,
+        )
+        for r in sqlquery.select(totals_sql, params):
+            cnt = int(r["cnt"] or 0)
+            totals["total"] += cnt
+            if r["f_c_g"] in totals:
+                totals[r["f_c_g"]] += cnt
+
+        result = {
+            "view": "matrix",
+            "skills": [],
+            "people": [],
+            "totals": totals,
+            "limit": limit,
+            "next_after": anchors[-1][1] if has_more else None,
+        }
+        if not anchors:
+            return result
+
+        # 3️⃣ All cells for the people on this page
+        markers, names = sqlquery.placeholders(name for name, _ in anchors)
+        cells_sql = statement(
+            "SELECT {0} FROM hr_machining_skills"
+            " WHERE {1} AND person_name IN ({2}) ORDER BY cdb_object_id",
+            ", ".join(SKILL_COLUMNS), where, markers,
+        )
+
+        people = {
+            name: {
+                "person_name": name,
+                "anchor": anchor,
+                "department": None,
+                "liness": None,
+                "cells": {},
+            }
+            for name, anchor in anchors
+        }
+        skills = {}
+        for row in sqlquery.select(cells_sql, params + names):
+            person = people.get(row["person_name"])
+            if person is None:
+                continue
+            skill = row["machining_skills_names"]
+            skills.setdefault(skill, row["f_c_g"])
+            person["department"] = person["department"] or row["department"]
+            person["liness"] = person["liness"] or row["liness"]
+            person["cells"].setdefault(skill, {
+                "cdb_object_id": row["cdb_object_id"],
+                "required": row["skill_required"],
+                "actual": row["actual"] or 0,
+            })
+
+        result["skills"] = [
+            {"name": name, "f_c_g": skills[name]} for name in sorted(skills)
+        ]
+        result["people"] = [people[name] for name, _ in anchors]
+        return result
 
     # 🔹 POST → Create single or multiple skills
     def create_skills(self, data):
@@ -71,37 +274,19 @@ class MachiningSkillsData:
         created_count = 0
         for obj in data:
             try:
-                machining_skills_names = obj.get("machining_skills_names")
-                f_c_g = obj.get("f_c_g", "G")
-                department = obj.get("department", "All")
-                education = obj.get("education", "")
-                person_name = obj.get("person_name", "")
-                skill_required = obj.get("skill_required", 1)
-                actual = obj.get("actual", 0)
-                liness = obj.get("liness", "")
-                department = obj.get("department", "")
-                plantt_code = obj.get("plantt_code", 2021)
-
-                print(f"📝 Creating skill: {machining_skills_names} for {person_name}")
-
-                r_new = sqlapi.Record(
-                    "hr_machining_skills",
-                    machining_skills_names=machining_skills_names,
-                    f_c_g=f_c_g,
-                    department=department,
-                    education=education,
-                    person_name=person_name,
-                    skill_required=skill_required,
-                    actual=actual,
-                    liness=liness,
-                    plantt_code=plantt_code
-                )
-                r_new.insert()
+                values = _skill_values(obj)
+                skill_id = cdbuuid.create_uuid()
+                with transaction.Transaction():
+                    r_new = sqlapi.Record(
+                        "hr_machining_skills", cdb_object_id=skill_id, **values
+                    )
+                    r_new.insert()
+                    skill_changes.record([skill_id])
+                _committed([dict(values, cdb_object_id=skill_id)])
                 created_count += 1
-                print(f"✅ Skill created: {machining_skills_names}")
-                
-            except Exception as e:
-                print(f"❌ Error creating skill: {e}")
+
+            except Exception:
+                log.exception("Error creating skill")
                 raise
 
         return {
@@ -109,6 +294,31 @@ class MachiningSkillsData:
             "message": f"Successfully created {created_count} skill records"
         }
 
+    # 🔹 POST (bulk=1) → Multi-row inserts, chunked, in one transaction
+    def create_skills_bulk(self, data, atomic=True):
+        """Create skill records in chunks and return their cdb_object_ids"""
+        if not isinstance(data, list):
+            data = [data]
+        rows = []
+        for obj in data:
+            values = _skill_values(obj)
+            rows.append(tuple(values[c] for c in INSERT_COLUMNS))
+        written = []
+
+        def on_chunk(chunk):
+            skill_changes.record(row[0] for row in chunk)
+            written.extend(chunk)
+
+        result = bulk_insert(
+            "hr_machining_skills", INSERT_COLUMNS, rows, atomic=atomic,
+            on_chunk=on_chunk,
+        )
+        # Only committed rows go into the index
+        created = set(result["cdb_object_ids"])
+        columns = ("cdb_object_id",) + INSERT_COLUMNS
+        _committed(dict(zip(columns, row)) for row in written if row[0] in created)
+        return result
+
     # 🔹 PUT/PATCH → Update existing skill
     def update_skill(self, data):
         """Update existing skill record"""
@@ -133,26 +343,140 @@ class MachiningSkillsData:
         department = data.get("department")
         plantt_code = data.get("plantt_code", 2021)
 
-        update_query = f"""
+        update_query = """
             UPDATE hr_machining_skills
-               SET machining_skills_names = '{machining_skills_names}',
-                   f_c_g = '{f_c_g}',
-                   person_name = '{person_name}',
-                   skill_required = {skill_required},
-                   actual = {actual},
-                   liness = '{liness}',
-                   department = '{department}',
-                   plantt_code = {plantt_code}
-             WHERE cdb_object_id = '{cdb_object_id}'
+               SET machining_skills_names = ?,
+                   f_c_g = ?,
+                   person_name = ?,
+                   skill_required = ?,
+                   actual = ?,
+                   liness = ?,
+                   department = ?,
+                   plantt_code = ?
+             WHERE cdb_object_id = ?
         """
+        params = [
+            machining_skills_names, f_c_g, person_name, skill_required,
+            actual, liness, department, plantt_code, cdb_object_id,
+        ]
+
+        with transaction.Transaction():
+            result = sqlquery.execute(update_query, params)
+            if result:
+                skill_changes.record([cdb_object_id])
+        log.debug("skill %s updated, affected rows: %s", cdb_object_id, result)
+        if not result:
+            return {"status": "error", "message": f"Skill {cdb_object_id} not found"}
+        _committed([{
+            "cdb_object_id": cdb_object_id,
+            "machining_skills_names": machining_skills_names,
+            "f_c_g": f_c_g,
+            "person_name": person_name,
+            "skill_required": skill_required,
+            "actual": actual,
+            "liness": liness,
+            "department": department,
+            "plantt_code": plantt_code,
+        }])
 
-        print("📝 Update Query:")
-        print(update_query)
+        return {"status": "success", "message": "Skill updated successfully"}
 
-        result = sqlapi.SQL(update_query)
-        print(f"✅ Query executed, affected rows: {result}")
+    # 🔹 PUT/PATCH (list body) → Partial updates and deletes in one go
+    def update_skills_batch(self, items):
+        """Apply partial updates / deletes (``is_delete``) in one transaction.
 
-        return {"status": "success", "message": "Skill updated successfully"}
+        Only columns whose value actually changes are written. Updates with
+        the same set of changed columns share one set-based statement per
+        chunk. Returns a result per item, in request order.
+        """
+        results = [None] * len(items)
+        requested = {}
+        for position, item in enumerate(items):
+            cdb_object_id = item.get('cdb_object_id') if isinstance(item, dict) else None
+            if not cdb_object_id:
+                results[position] = {"status": "error",
+                                     "message": "cdb_object_id is required"}
+                continue
+            if cdb_object_id in requested:
+                results[position] = {"cdb_object_id": cdb_object_id, "status": "error",
+                                     "message": "duplicate cdb_object_id in batch"}
+                continue
+            try:
+                values = {
+                    column: convert(item[column]) if convert and item[column] is not None
+                    else item[column]
+                    for column, convert in BATCH_COLUMNS.items() if column in item
+                }
+            except (TypeError, ValueError) as e:
+                results[position] = {"cdb_object_id": cdb_object_id, "status": "error",
+                                     "message": f"Invalid value: {e}"}
+                continue
+            requested[cdb_object_id] = (position, bool(item.get('is_delete')), values)
+
+        # 1️⃣ Current rows, to skip unchanged columns and report unknown ids
+        columns = ("cdb_object_id",) + INSERT_COLUMNS
+        current = {}
+        ids = list(requested)
+        for start in range(0, len(ids), MATRIX_MAX_PAGE_SIZE):
+            markers, chunk = sqlquery.placeholders(ids[start:start + MATRIX_MAX_PAGE_SIZE])
+            sql = statement(
+                "SELECT {0} FROM hr_machining_skills WHERE cdb_object_id IN ({1})",
+                ", ".join(columns), markers,
+            )
+            for row in sqlquery.select(sql, chunk):
+                current[row["cdb_object_id"]] = {c: row[c] for c in columns}
+
+        deletes = []
+        groups = {}
+        for cdb_object_id, (position, is_delete, values) in requested.items():
+            row = current.get(cdb_object_id)
+            if row is None:
+                results[position] = {"cdb_object_id": cdb_object_id, "status": "not_found"}
+            elif is_delete:
+                deletes.append(cdb_object_id)
+                results[position] = {"cdb_object_id": cdb_object_id, "status": "deleted"}
+            else:
+                changed = tuple(sorted(c for c, v in values.items() if row[c] != v))
+                if changed:
+                    groups.setdefault(changed, []).append(
+                        (cdb_object_id,) + tuple(values[c] for c in changed)
+                    )
+                    row.update(values)
+                results[position] = {
+                    "cdb_object_id": cdb_object_id,
+                    "status": "updated" if changed else "unchanged",
+                    "columns": list(changed),
+                }
+        updated = [row[0] for rows in groups.values() for row in rows]
+
+        # 2️⃣ One transaction for all statements and change stamps
+        try:
+            with transaction.Transaction():
+                for changed, rows in groups.items():
+                    update_rows("hr_machining_skills", changed, rows)
+                skill_changes.record(updated)
+                if deletes:
+                    skill_changes.record(deletes, skill_changes.OP_DELETE)
+                    delete_rows("hr_machining_skills", deletes)
+        except Exception as e:
+            log.exception("Batch skill update failed")
+            for result in results:
+                if result["status"] in ("updated", "deleted"):
+                    result["status"] = "rolled_back"
+            return {"status": "error", "message": f"Batch update failed: {e}",
+                    "results": results}
+
+        _committed([current[cdb_object_id] for cdb_object_id in updated], deletes)
+
+        failed = sum(1 for r in results if r["status"] in ("error", "not_found"))
+        return {
+            "status": "success" if not failed else ("partial" if failed < len(items) else "error"),
+            "message": f"Updated {len(updated)}, deleted {len(deletes)},"
+                       f" failed {failed} of {len(items)} item(s)",
+            "updated": len(updated),
+            "deleted": len(deletes),
+            "results": results,
+        }
 
     # 🔹 DELETE → Delete skill record
     def delete_skill(self, data):
@@ -163,16 +487,16 @@ class MachiningSkillsData:
         if not cdb_object_id:
             return {"status": "error", "message": "cdb_object_id is required for delete"}
 
-        delete_query = f"""
+        delete_query = """
             DELETE FROM hr_machining_skills
-             WHERE cdb_object_id = '{cdb_object_id}'
+             WHERE cdb_object_id = ?
         """
 
-        print("🗑️ Delete Query:")
-        print(delete_query)
+        with transaction.Transaction():
+            skill_changes.record([cdb_object_id], skill_changes.OP_DELETE)
+            sqlquery.execute(delete_query, [cdb_object_id])
+        _committed(deleted=[cdb_object_id])
 
-        sqlapi.SQL(delete_query)
-        
         return {"status": "success", "message": "Skill deleted successfully"}
 
 
@@ -184,11 +508,13 @@ def _path():
 
 # 🔹 GET → Fetch skills with optional filters
 @MachiningSkillsAPI.json(model=MachiningSkillsData, request_method="GET")
+@instrumented("hr_machining_skills.GET")
 def _get_json(model, request):
     filters = {}
     skill_type = request.params.get('skill_type')
     department = request.params.get('department')
     plantt_code = request.params.get('plantt_code')
+    liness = request.params.get('liness')
 
     if skill_type:
         filters['skill_type'] = skill_type
@@ -196,33 +522,88 @@ def _get_json(model, request):
         filters['department'] = department
     if plantt_code:
         filters['plantt_code'] = plantt_code
+    if liness:
+        filters['liness'] = liness
+
+    # ?since=<version> → delta for polling clients (plant filter only)
+    if 'since' in request.params:
+        since = request.params.get('since')
+        try:
+            return model.get_skill_changes(since, {'plantt_code': plantt_code})
+        except ValueError:
+            return {"status": "error", "message": f"Invalid since version: {since}"}
+
+    # Numeric filters are checked before the version query uses them
+    try:
+        sqlquery.where(sqlquery.SKILL_FILTERS, filters)
+    except ValueError as e:
+        return {"status": "error", "message": f"Invalid filter: {e}"}
+
+    # If-None-Match → 304 before the main query runs; concurrent requests
+    # with the same filters share the version check and the body
+    version = coalesce.do(
+        "hr_machining_skills.version", tuple(sorted(filters.items())),
+        lambda: model.data_version(filters),
+    )
+    etag = make_etag(request_key(request), *version)
+    return conditional(request, etag, lambda: _get_body(model, request, filters, etag))
+
+
+def _get_body(model, request, filters, etag):
+    # ?stream=1 / ?format=ndjson → chunked body, rows in cdb_object_id order
+    stream, ndjson = wants_stream(request)
+    if stream:
+        return model.stream_skills_data(filters, ndjson=ndjson)
+
+    return coalesce.shared_json(
+        "hr_machining_skills.GET", etag, lambda: _get_data(model, request, filters)
+    )
+
+
+def _get_data(model, request, filters):
+    # ?view=matrix → pivoted, paginated grid (&after=<cursor>&limit=<n>)
+    if request.params.get('view') == 'matrix':
+        return model.get_skill_matrix(
+            filters,
+            after=request.params.get('after'),
+            limit=request.params.get('limit'),
+        )
 
     return model.get_skills_data(filters)
 
 
 # 🔹 POST → Create new skills
 @MachiningSkillsAPI.json(model=MachiningSkillsData, request_method="POST")
+@instrumented("hr_machining_skills.POST")
 def _post_json(model, request):
     incoming_data = request.json
-    print("📥 Incoming POST data:")
-    print(f"   Records count: {len(incoming_data) if isinstance(incoming_data, list) else 1}")
-    if isinstance(incoming_data, list) and len(incoming_data) > 0:
-        print(f"   First record: {incoming_data[0]}")
+    add_rows(len(incoming_data) if isinstance(incoming_data, list) else 1)
+
+    # ?bulk=1 → chunked multi-row insert (&atomic=0 commits per chunk)
+    if request.params.get('bulk') in ("1", "true"):
+        atomic = request.params.get('atomic') not in ("0", "false")
+        return model.create_skills_bulk(data=incoming_data, atomic=atomic)
+
     return model.create_skills(data=incoming_data)
 
 
 # 🔹 PUT → Update existing skill
 @MachiningSkillsAPI.json(model=MachiningSkillsData, request_method="PUT")
+@instrumented("hr_machining_skills.PUT")
 def _put_json(model, request):
     incoming_data = request.json
-    print("📥 Incoming PUT data:")
-    print(incoming_data)
+    # List body → batch of partial updates / deletes
+    if isinstance(incoming_data, list):
+        add_rows(len(incoming_data))
+        return model.update_skills_batch(incoming_data)
     return model.update_skill(data=incoming_data)
 
 
 @MachiningSkillsAPI.json(model=MachiningSkillsData, request_method="PATCH")
+@instrumented("hr_machining_skills.PATCH")
 def _patch_json(model, request):
     incoming_data = request.json
-    print("📥 Incoming PATCH data:")
-    print(incoming_data)
+    if isinstance(incoming_data, list):
+        add_rows(len(incoming_data))
+        return model.update_skills_batch(incoming_data)
     return model.update_skill(data=incoming_data)
@@ -1,9 +1,77 @@
 from cs.platform.web import JsonAPI
 from cs.platform.web.root import Internal
-from cdb import sqlapi
+from cdb import sqlapi, cdbuuid, transaction
 from datetime import datetime, date
 import json
 
+from . import coalesce
+from . import schedule_employees
+from . import sqlquery
+from . import training_calendar
+from .bulk import bulk_insert
+from .instrumentation import add_rows, instrumented, log, phase
+from .conditional import (
+    bump, conditional, make_etag, request_key, row_count, table_stamp,
+)
+from .sqlquery import statement
+from .streaming import iter_keyset, stream_response, wants_stream
+
+
+TRAINING_COLUMNS = (
+    "cdb_object_id",
+    "training_id",
+    "skill_id",
+    "skill_name",
+    "skill_code",
+    "skill_type",
+    "employee_ids",
+    "employee_names",
+    "training_date",
+    "training_day",
+    "training_time",
+    "duration_hours",
+    "trainer_name",
+    "notes",
+)
+
+# Columns written by POST (cdb_object_id is assigned on insert)
+INSERT_COLUMNS = TRAINING_COLUMNS[1:]
+
+
+def _db_date(training_date):
+    """Convert date format from DD/MM/YYYY to YYYY-MM-DD"""
+    date_parts = training_date.split("/")
+    return f"{date_parts[2]}-{date_parts[1]}-{date_parts[0]}"
+
+
+def _training_values(obj, default_id):
+    """Column values for a new training schedule, with POST defaults applied"""
+    return {
+        "training_id": obj.get("training_id", default_id),
+        "skill_id": obj.get("skill_id"),
+        "skill_name": obj.get("skill_name"),
+        "skill_code": obj.get("skill_code"),
+        "skill_type": obj.get("skill_type"),
+        "employee_ids": json.dumps(obj.get("employee_ids", [])),
+        "employee_names": json.dumps(obj.get("employee_names", [])),
+        "training_date": _db_date(obj.get("training_date")),
+        "training_day": obj.get("training_day"),
+        "training_time": obj.get("training_time", "09:00"),
+        "duration_hours": obj.get("duration_hours", 8),
+        "trainer_name": obj.get("trainer_name"),
+        "notes": obj.get("notes", ""),
+    }
+
+
+def _with_defaults(result, now):
+    """Fill placeholder values for columns that don't exist in table"""
+    result.setdefault('status', 'Scheduled')
+    result.setdefault('scheduled_by', 'Admin')
+    result.setdefault('scheduled_at', now)
+    result.setdefault('created_date', now)
+    result.setdefault('modified_date', now)
+    return result
+
 
 class TrainingScheduleAPI(JsonAPI):
     pass
@@ -20,47 +88,22 @@ class TrainingScheduleData:
     # 🔹 GET → Fetch all scheduled trainings with filters (SIMPLIFIED)
     def get_training_schedules(self, filters=None):
         filters = filters or {}
-        skill_id = filters.get('skill_id')
-        employee_id = filters.get('employee_id')
-        date_from = filters.get('date_from')
-        date_to = filters.get('date_to')
-
-        # ✅ SIMPLIFIED SQL - Only essential columns that exist in table
-        sql = """
-            SELECT
-                cdb_object_id,
-                training_id,
-                skill_id,
-                skill_name,
-                skill_code,
-                skill_type,
-                employee_ids,
-                employee_names,
-                training_date,
-                training_day,
-                training_time,
-                duration_hours,
-                trainer_name,
-                notes
-            FROM hr_training_schedule
-            WHERE 1=1
-        """
-
-        if skill_id:
-            sql += f" AND skill_id = {skill_id}"
-        if employee_id:
-            sql += f" AND employee_ids LIKE '%{employee_id}%'"
-        if date_from:
-            sql += f" AND training_date >= '{date_from}'"
-        if date_to:
-            sql += f" AND training_date <= '{date_to}'"
-
-        sql += " ORDER BY training_date ASC"
 
         try:
-            rs = sqlapi.RecordSet2(sql=sql)
-            print(f"📋 SQL Query: {sql}")
-            print(f"✅ Found {len(rs)} records")
+            # ✅ SIMPLIFIED SQL - Only essential columns that exist in table
+            where, params = sqlquery.where(sqlquery.TRAINING_FILTERS, filters)
+            sql = statement(
+                "SELECT {0} FROM hr_training_schedule WHERE {1}"
+                " ORDER BY training_date ASC",
+                ", ".join(TRAINING_COLUMNS), where,
+            )
+
+            with phase("query"):
+                rs = sqlquery.select(sql, params)
+            add_rows(len(rs))
+            log.debug("training query %s %s: %d rows", sql, params, len(rs))
+
+            now = datetime.now().isoformat()
 
             def serialize(row):
                 result = {}
@@ -69,27 +112,68 @@ class TrainingScheduleData:
                         result[key] = value.isoformat()
                     else:
                         result[key] = value
-                
+
                 # ✅ Add default values for columns that don't exist in table
-                if 'status' not in result:
-                    result['status'] = 'Scheduled'
-                if 'scheduled_by' not in result:
-                    result['scheduled_by'] = 'Admin'
-                if 'scheduled_at' not in result:
-                    result['scheduled_at'] = datetime.now().isoformat()
-                if 'created_date' not in result:
-                    result['created_date'] = datetime.now().isoformat()
-                if 'modified_date' not in result:
-                    result['modified_date'] = datetime.now().isoformat()
-                    
-                return result
-
-            return [serialize(row) for row in rs]
-            
-        except Exception as e:
-            print(f"❌ Error fetching training schedules: {e}")
+                return _with_defaults(result, now)
+
+            with phase("serialize"):
+                return [serialize(row) for row in rs]
+
+        except ValueError as e:
+            return {"status": "error", "message": f"Invalid filter: {e}"}
+        except Exception:
+            log.exception("Error fetching training schedules")
             return []
 
+    # 🔹 GET (view=calendar) → Day/week/month buckets with trainer load
+    def get_calendar(self, filters=None, bucket="month", plantt_code=None,
+                     with_sessions=True):
+        """Bucketed schedules; defaults to the current month"""
+        filters = filters or {}
+        unsupported = sorted(k for k in ('employee_id', 'skill_id') if filters.get(k))
+        if unsupported:
+            return {"status": "error",
+                    "message": f"view=calendar does not support {', '.join(unsupported)}"}
+        date_from, date_to = training_calendar.default_window(
+            filters.get('date_from'), filters.get('date_to')
+        )
+        try:
+            return training_calendar.calendar(
+                date_from, date_to, bucket=bucket, plantt_code=plantt_code,
+                with_sessions=with_sessions,
+            )
+        except ValueError as e:
+            return {"status": "error", "message": f"Invalid calendar request: {e}"}
+
+    # 🔹 Cheap version of the calendar view (for ETags)
+    def calendar_version(self, filters=None, plantt_code=None):
+        """Resolved window plus the tables the calendar reads"""
+        filters = filters or {}
+        window = training_calendar.default_window(
+            filters.get('date_from'), filters.get('date_to')
+        )
+        return window + training_calendar.version(plantt_code)
+
+    # 🔹 Cheap version of a filter's data (for ETags)
+    def data_version(self, filters=None):
+        where, params = sqlquery.where(sqlquery.TRAINING_FILTERS, filters or {})
+        return (
+            row_count("hr_training_schedule", where, params),
+            table_stamp("hr_training_schedule"),
+        )
+
+    # 🔹 GET (stream=1 / format=ndjson) → Chunked response, flat memory
+    def stream_training_schedules(self, filters=None, ndjson=False):
+        """Stream matching schedules in keyset (cdb_object_id) order"""
+        where, params = sqlquery.where(sqlquery.TRAINING_FILTERS, filters or {})
+        now = datetime.now().isoformat()
+        rows = iter_keyset(
+            TRAINING_COLUMNS, "hr_training_schedule", where, params
+        )
+        return stream_response(
+            rows, ndjson=ndjson, transform=lambda row: _with_defaults(row, now)
+        )
+
     # 🔹 POST → Create new training schedule (SIMPLIFIED)
     def create_training_schedule(self, data):
         """Create new training schedule records"""
@@ -103,50 +187,27 @@ class TrainingScheduleData:
         
         for obj in data:
             try:
-                training_id = obj.get("training_id", f"TRN_{int(datetime.now().timestamp())}")
-                skill_id = obj.get("skill_id")
-                skill_name = obj.get("skill_name")
-                skill_code = obj.get("skill_code")
-                skill_type = obj.get("skill_type")
-                employee_ids = json.dumps(obj.get("employee_ids", []))
-                employee_names = json.dumps(obj.get("employee_names", []))
-                training_date = obj.get("training_date")
-                training_day = obj.get("training_day")
-                training_time = obj.get("training_time", "09:00")
-                duration_hours = obj.get("duration_hours", 8)
-                trainer_name = obj.get("trainer_name")
-                notes = obj.get("notes", "")
-
-                print(f"📝 Creating training schedule: {skill_name} on {training_date}")
-
-                # Convert date format from DD/MM/YYYY to YYYY-MM-DD
-                date_parts = training_date.split("/")
-                db_date = f"{date_parts[2]}-{date_parts[1]}-{date_parts[0]}"
+                values = _training_values(
+                    obj, f"TRN_{int(datetime.now().timestamp())}"
+                )
+                training_id = values["training_id"]
 
                 # ✅ SIMPLIFIED INSERT - Only columns that exist in table
-                r_new = sqlapi.Record(
-                    "hr_training_schedule",
-                    training_id=training_id,
-                    skill_id=skill_id,
-                    skill_name=skill_name,
-                    skill_code=skill_code,
-                    skill_type=skill_type,
-                    employee_ids=employee_ids,
-                    employee_names=employee_names,
-                    training_date=db_date,
-                    training_day=training_day,
-                    training_time=training_time,
-                    duration_hours=duration_hours,
-                    trainer_name=trainer_name,
-                    notes=notes
-                )
-                r_new.insert()
+                schedule_id = cdbuuid.create_uuid()
+                with transaction.Transaction():
+                    r_new = sqlapi.Record(
+                        "hr_training_schedule", cdb_object_id=schedule_id, **values
+                    )
+                    r_new.insert()
+                    schedule_employees.replace_links(
+                        schedule_id, obj.get("employee_ids", [])
+                    )
+                    bump("hr_training_schedule")
                 created_count += 1
                 created_ids.append(training_id)
-                print(f"✅ Training schedule created: {training_id}")
-                
+
             except Exception as e:
-                print(f"❌ Error creating training schedule: {e}")
+                log.exception("Error creating training schedule")
                 return {
                     "status": "error",
                     "message": f"Failed to create training schedule: {str(e)}"
@@ -158,6 +219,44 @@ class TrainingScheduleData:
             "training_ids": created_ids
         }
 
+    # 🔹 POST (bulk=1) → Multi-row inserts, chunked, in one transaction
+    def create_training_schedule_bulk(self, data, atomic=True):
+        """Create training schedules in chunks and return their cdb_object_ids"""
+        if not isinstance(data, list):
+            data = [data]
+        stamp = int(datetime.now().timestamp())
+        rows = []
+        training_ids = []
+        for index, obj in enumerate(data):
+            try:
+                values = _training_values(obj, f"TRN_{stamp}_{index}")
+            except (AttributeError, IndexError) as e:
+                return {
+                    "status": "error",
+                    "message": f"Invalid training_date in record {index}: {e}",
+                }
+            rows.append(tuple(values[c] for c in INSERT_COLUMNS))
+            training_ids.append(values["training_id"])
+
+        employees_at = 1 + INSERT_COLUMNS.index("employee_ids")
+
+        def link_employees(chunk):
+            schedule_employees.add_links(
+                (row[0], employee_id)
+                for row in chunk
+                for employee_id in schedule_employees.normalize_ids(row[employees_at])
+            )
+            bump("hr_training_schedule")
+
+        result = bulk_insert("hr_training_schedule", INSERT_COLUMNS, rows,
+                             atomic=atomic, on_chunk=link_employees)
+        result["training_ids"] = [
+            training_id
+            for chunk in result["chunks"] if chunk["status"] == "ok"
+            for training_id in training_ids[chunk["rows"][0]:chunk["rows"][1] + 1]
+        ]
+        return result
+
     # 🔹 PUT → Update existing training schedule (SIMPLIFIED)
     def update_training_schedule(self, data):
         """Update existing training schedule record"""
@@ -187,9 +286,7 @@ class TrainingScheduleData:
             if "employee_names" in data:
                 r["employee_names"] = json.dumps(data["employee_names"])
             if "training_date" in data:
-                # Convert date format
-                date_parts = data["training_date"].split("/")
-                r["training_date"] = f"{date_parts[2]}-{date_parts[1]}-{date_parts[0]}"
+                r["training_date"] = _db_date(data["training_date"])
             if "training_day" in data:
                 r["training_day"] = data["training_day"]
             if "training_time" in data:
@@ -201,13 +298,17 @@ class TrainingScheduleData:
             if "notes" in data:
                 r["notes"] = data["notes"]
             
-            r.update()
-            print(f"✅ Training schedule updated: {cdb_object_id}")
+            with transaction.Transaction():
+                r.update()
+                if "employee_ids" in data:
+                    schedule_employees.replace_links(cdb_object_id, data["employee_ids"])
+                bump("hr_training_schedule")
+            log.debug("training schedule %s updated", cdb_object_id)
 
             return {"status": "success", "message": "Training schedule updated successfully"}
             
         except Exception as e:
-            print(f"❌ Error updating training schedule: {e}")
+            log.exception("Error updating training schedule %s", cdb_object_id)
             return {
                 "status": "error",
                 "message": f"Failed to update training schedule: {str(e)}"
@@ -224,13 +325,16 @@ class TrainingScheduleData:
 
         try:
             r = sqlapi.Record("hr_training_schedule", cdb_object_id=cdb_object_id)
-            r.delete()
-            print(f"✅ Training schedule deleted: {cdb_object_id}")
+            with transaction.Transaction():
+                schedule_employees.delete_links(cdb_object_id)
+                r.delete()
+                bump("hr_training_schedule")
+            log.debug("training schedule %s deleted", cdb_object_id)
             
             return {"status": "success", "message": "Training schedule deleted successfully"}
             
         except Exception as e:
-            print(f"❌ Error deleting training schedule: {e}")
+            log.exception("Error deleting training schedule %s", cdb_object_id)
             return {
                 "status": "error",
                 "message": f"Failed to delete training schedule: {str(e)}"
@@ -245,6 +349,7 @@ def _path():
 
 # 🔹 GET → Fetch training schedules with optional filters
 @TrainingScheduleAPI.json(model=TrainingScheduleData, request_method="GET")
+@instrumented("hr_training_schedule.GET")
 def _get_json(model, request):
     filters = {}
     skill_id = request.params.get('skill_id')
@@ -261,45 +366,92 @@ def _get_json(model, request):
     if date_to:
         filters['date_to'] = date_to
 
-    print(f"📥 GET request with filters: {filters}")
+    calendar_view = request.params.get('view') == 'calendar'
+    plantt_code = request.params.get('plantt_code') if calendar_view else None
+
+    # Numeric filters (and the calendar's plant) are checked before the
+    # version query uses them
+    try:
+        sqlquery.where(sqlquery.TRAINING_FILTERS, filters)
+        sqlquery.where(sqlquery.SKILL_FILTERS, {"plantt_code": plantt_code})
+    except ValueError as e:
+        return {"status": "error", "message": f"Invalid filter: {e}"}
+
+    # If-None-Match → 304 before the main query runs; concurrent requests
+    # with the same filters share the version check and the body
+    if calendar_view:
+        version = coalesce.do(
+            "hr_training_schedule.version",
+            ("calendar", plantt_code, tuple(sorted(filters.items()))),
+            lambda: model.calendar_version(filters, plantt_code),
+        )
+    else:
+        version = coalesce.do(
+            "hr_training_schedule.version", tuple(sorted(filters.items())),
+            lambda: model.data_version(filters),
+        )
+    etag = make_etag(request_key(request), *version)
+    return conditional(request, etag, lambda: _get_body(model, request, filters, etag))
+
+
+def _get_body(model, request, filters, etag):
+    # ?stream=1 / ?format=ndjson → chunked body, rows in cdb_object_id order
+    stream, ndjson = wants_stream(request)
+    if stream and request.params.get('view') != 'calendar':
+        return model.stream_training_schedules(filters, ndjson=ndjson)
+
+    return coalesce.shared_json(
+        "hr_training_schedule.GET", etag, lambda: _get_data(model, request, filters)
+    )
+
+
+def _get_data(model, request, filters):
+    # ?view=calendar → buckets (&bucket=day|week|month&plantt_code=&sessions=0)
+    if request.params.get('view') == 'calendar':
+        return model.get_calendar(
+            filters,
+            bucket=request.params.get('bucket') or "month",
+            plantt_code=request.params.get('plantt_code'),
+            with_sessions=request.params.get('sessions') not in ("0", "false"),
+        )
+
     return model.get_training_schedules(filters)
 
 
 # 🔹 POST → Create new training schedules
 @TrainingScheduleAPI.json(model=TrainingScheduleData, request_method="POST")
+@instrumented("hr_training_schedule.POST")
 def _post_json(model, request):
     incoming_data = request.json
-    print("📥 Incoming POST data:")
-    print(f"   Records count: {len(incoming_data) if isinstance(incoming_data, list) else 1}")
-    if isinstance(incoming_data, list) and len(incoming_data) > 0:
-        print(f"   First record: {incoming_data[0]}")
-    elif not isinstance(incoming_data, list):
-        print(f"   Single record: {incoming_data}")
+    add_rows(len(incoming_data) if isinstance(incoming_data, list) else 1)
+
+    # ?bulk=1 → chunked multi-row insert (&atomic=0 commits per chunk)
+    if request.params.get('bulk') in ("1", "true"):
+        atomic = request.params.get('atomic') not in ("0", "false")
+        return model.create_training_schedule_bulk(data=incoming_data, atomic=atomic)
+
     return model.create_training_schedule(data=incoming_data)
 
 
 # 🔹 PUT → Update existing training schedule
 @TrainingScheduleAPI.json(model=TrainingScheduleData, request_method="PUT")
+@instrumented("hr_training_schedule.PUT")
 def _put_json(model, request):
     incoming_data = request.json
-    print("📥 Incoming PUT data:")
-    print(incoming_data)
     return model.update_training_schedule(data=incoming_data)
 
 
 # 🔹 PATCH → Update existing training schedule (same as PUT)
 @TrainingScheduleAPI.json(model=TrainingScheduleData, request_method="PATCH")
+@instrumented("hr_training_schedule.PATCH")
 def _patch_json(model, request):
     incoming_data = request.json
-    print("📥 Incoming PATCH data:")
-    print(incoming_data)
     return model.update_training_schedule(data=incoming_data)
 
 
 # 🔹 DELETE → Delete training schedule
 @TrainingScheduleAPI.json(model=TrainingScheduleData, request_method="DELETE")
+@instrumented("hr_training_schedule.DELETE")
 def _delete_json(model, request):
     incoming_data = request.json
-    print("📥 Incoming DELETE data:")
-    print(incoming_data)
     return model.delete_training_schedule(data=incoming_data)
\ No newline at end of file
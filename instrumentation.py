@@ -0,0 +1,240 @@
+"""Per-endpoint timing and sampled logging for the JsonAPI handlers.
+
+Views are wrapped with :func:`instrumented`. Inside a request, data
+methods mark their phases with :func:`phase` (``"query"``,
+``"serialize"``, ...) and report result sizes with :func:`add_rows`.
+Recent samples are kept in fixed-size windows per endpoint, and
+:func:`snapshot` turns them into p50/p95/p99 figures for the metrics
+endpoint.
+
+A request is measured until its response is rendered, and a streamed
+response until its body has been iterated to the end (or closed).
+``payload_bytes`` is the size of the response body as sent,
+``request_bytes`` that of the request body.
+
+Request summaries are logged at DEBUG for a sampled fraction of requests
+(``SKILL_MATRIX_LOG_SAMPLE``, default 1%). Slow requests are always
+logged at WARNING.
+"""
+
+import functools
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+log = logging.getLogger("kalyani.iot.skill_matrix")
+
+LOG_SAMPLE_RATE = float(os.environ.get("SKILL_MATRIX_LOG_SAMPLE", "0.01"))
+SLOW_REQUEST_MS = float(os.environ.get("SKILL_MATRIX_SLOW_MS", "1000"))
+
+# Samples kept per endpoint and metric
+WINDOW = 2048
+
+_local = threading.local()
+_lock = threading.Lock()
+_endpoints = {}
+
+
+class _EndpointStats:
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.samples = {}
+
+    def add(self, metric, value):
+        window = self.samples.get(metric)
+        if window is None:
+            window = self.samples[metric] = deque(maxlen=WINDOW)
+        window.append(value)
+
+
+class _RequestTracker:
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+        self.phases = {}
+        self.rows = 0
+        self.request_bytes = 0
+        self.payload_bytes = 0
+        self.start = time.perf_counter()
+        # Set when the response's after-callback records the request
+        self.deferred = False
+
+    def finish(self, failed=False):
+        _record(self, (time.perf_counter() - self.start) * 1000.0, failed)
+
+
+class _CountingIter:
+    """Response body iterator that counts bytes and records at the end"""
+
+    def __init__(self, app_iter, tracker):
+        self._app_iter = app_iter
+        self._chunks = iter(app_iter)
+        self._tracker = tracker
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            chunk = next(self._chunks)
+        except StopIteration:
+            self.close()
+            raise
+        except Exception:
+            self._finish(failed=True)
+            raise
+        self._tracker.payload_bytes += len(chunk)
+        return chunk
+
+    def _finish(self, failed=False):
+        tracker, self._tracker = self._tracker, None
+        if tracker is not None:
+            tracker.finish(failed)
+
+    def close(self):
+        # WSGI servers call close() also when the client went away
+        try:
+            close = getattr(self._app_iter, "close", None)
+            if close is not None:
+                close()
+        finally:
+            self._finish()
+
+
+def _percentile(ordered, pct):
+    if not ordered:
+        return None
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def sampled():
+    """True for the sampled fraction of calls"""
+    return random.random() < LOG_SAMPLE_RATE
+
+
+def _record(tracker, total_ms, failed):
+    with _lock:
+        stats = _endpoints.get(tracker.endpoint)
+        if stats is None:
+            stats = _endpoints[tracker.endpoint] = _EndpointStats()
+        stats.count += 1
+        if failed:
+            stats.errors += 1
+        stats.add("total_ms", total_ms)
+        for name, ms in tracker.phases.items():
+            stats.add(name + "_ms", ms)
+        stats.add("rows", tracker.rows)
+        stats.add("request_bytes", tracker.request_bytes)
+        stats.add("payload_bytes", tracker.payload_bytes)
+
+    if total_ms >= SLOW_REQUEST_MS:
+        log.warning("slow %s: %.1f ms %s rows=%d payload=%d",
+                    tracker.endpoint, total_ms, tracker.phases,
+                    tracker.rows, tracker.payload_bytes)
+    elif log.isEnabledFor(logging.DEBUG) and sampled():
+        log.debug("%s: %.1f ms %s rows=%d payload=%d",
+                  tracker.endpoint, total_ms, tracker.phases,
+                  tracker.rows, tracker.payload_bytes)
+
+
+@contextmanager
+def track(endpoint):
+    """Measure one request to ``endpoint``
+
+    The request is recorded on exit unless ``tracker.deferred`` was set,
+    in which case the caller records it with ``tracker.finish()``.
+    """
+    tracker = _RequestTracker(endpoint)
+    previous = getattr(_local, "tracker", None)
+    _local.tracker = tracker
+    failed = False
+    try:
+        yield tracker
+    except Exception:
+        failed = True
+        raise
+    finally:
+        _local.tracker = previous
+        if failed or not tracker.deferred:
+            tracker.finish(failed)
+
+
+@contextmanager
+def phase(name):
+    """Time a phase of the current request (no-op outside a request)"""
+    tracker = getattr(_local, "tracker", None)
+    if tracker is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        ms = (time.perf_counter() - start) * 1000.0
+        tracker.phases[name] = tracker.phases.get(name, 0.0) + ms
+
+
+def add_rows(count):
+    tracker = getattr(_local, "tracker", None)
+    if tracker is not None:
+        tracker.rows += count
+
+
+def _measure(tracker, response):
+    """After-callback: count the rendered body, or wrap a streamed one"""
+    app_iter = response.app_iter
+    if isinstance(app_iter, (list, tuple)):
+        tracker.payload_bytes = sum(len(chunk) for chunk in app_iter)
+        tracker.finish()
+    else:
+        response.app_iter = _CountingIter(app_iter, tracker)
+
+
+def instrumented(endpoint):
+    """Decorator for JsonAPI view functions ``(model, request)``"""
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(model, request, *args, **kwargs):
+            with track(endpoint) as tracker:
+                tracker.request_bytes = request.content_length or 0
+                result = view(model, request, *args, **kwargs)
+                # Recorded once the response exists: dicts are rendered
+                # after the view returns, streamed bodies later still
+                tracker.deferred = True
+            request.after(functools.partial(_measure, tracker))
+            return result
+        return wrapper
+    return decorator
+
+
+def snapshot():
+    """Counters and p50/p95/p99 of every metric, per endpoint"""
+    with _lock:
+        copies = {
+            name: (stats.count, stats.errors,
+                   {m: sorted(w) for m, w in stats.samples.items()})
+            for name, stats in _endpoints.items()
+        }
+    result = {}
+    for name, (count, errors, samples) in copies.items():
+        metrics = {}
+        for metric, ordered in samples.items():
+            metrics[metric] = {
+                "p50": _percentile(ordered, 50),
+                "p95": _percentile(ordered, 95),
+                "p99": _percentile(ordered, 99),
+                "max": ordered[-1] if ordered else None,
+            }
+        result[name] = {"count": count, "errors": errors, "metrics": metrics}
+    return result
+
+
+def reset():
+    with _lock:
+        _endpoints.clear()
@@ -18,6 +18,8 @@ from cs.platform.web.root import Root
 from cs.web.components.base.main import BaseApp
 from cs.web.components.base.main import BaseModel
 
+from . import assets
+
 
 class Skill_matrixApp(BaseApp):
     pass
@@ -35,7 +37,7 @@ def default_document_title(self, request):
 
 @Skill_matrixApp.view(model=BaseModel, name="app_component", internal=True)
 def _setup(self, request):
-    request.app.include("kalyani-iot-skill_matrix", "0.0.1")
+    request.app.include(assets.BUNDLE, assets.version())
     return "kalyani-iot-skill_matrix-MainComponent"
 
 
@@ -44,10 +46,44 @@ def get_base_path(self, request):
     return request.path
 
 
+# Hashed bundle files (immutable, precompressed, source map on request)
+@Skill_matrixApp.path(model=assets.Asset, path="assets/{name}")
+def _asset_path(name):
+    return assets.Asset.lookup(name)
+
+
+@Skill_matrixApp.view(model=assets.Asset)
+def _asset_view(self, request):
+    return self.response(request)
+
+
+# The page includes the bundle from the static library's URL; answer it
+# with the hashed, negotiated and immutable asset response instead
+@Root.tween_factory()
+def _asset_tween(app, handler):
+    def tween(request):
+        # Everything outside the library's URL goes straight to the handler
+        if not request.path.startswith(assets.LIBRARY_URL):
+            return handler(request)
+        response = assets.serve(request)
+        return response if response is not None else handler(request)
+    return tween
+
+
 @sig.connect(rte.APPLICATIONS_LOADED_HOOK)
 def _register_libraries():
-    lib = static.Library("kalyani-iot-skill_matrix", "0.0.1",
-                         os.path.join(os.path.dirname(__file__), 'js', 'build'))
-    lib.add_file("kalyani-iot-skill_matrix.js")
-    lib.add_file("kalyani-iot-skill_matrix.js.map")
+    build_dir = os.path.join(os.path.dirname(__file__), 'js', 'build')
+    try:
+        manifest = assets.build(build_dir)
+    except OSError:
+        # Read-only install: fall back to the plain bundle
+        assets.log.exception("could not write the hashed asset bundle")
+        manifest = None
+
+    lib = static.Library(assets.BUNDLE, assets.version(), build_dir)
+    if manifest is None:
+        lib.add_file("kalyani-iot-skill_matrix.js")
+    else:
+        # Only the script itself: the variants are chosen per request
+        lib.add_file(manifest["js"])
     static.Registry().add(lib)
@@ -0,0 +1,123 @@
+"""Read-through cache for the master data tables.
+
+``GET /internal/hr_master_data?plant_code=`` returns the departments,
+lines, skills and categories of a plant in one response. Each plant's
+bundle is cached in process and keyed by the ``kln_hr_masters`` stamp
+from :mod:`conditional`. Writes to ``Department``, ``Line``, ``Skill`` or
+``Category`` increase that stamp inside their transaction and drop the
+local entries. The response ETag is derived from the stamp, so an
+unchanged client gets a 304 after one primary-key lookup.
+"""
+
+from cs.platform.web import JsonAPI
+from cs.platform.web.root import Internal
+from cdb import sig
+
+from . import Category, Department, Line, Skill
+from . import sqlquery
+from .conditional import bump, conditional, make_etag, table_stamp
+from .instrumentation import add_rows, instrumented
+from .ttlcache import TTLCache
+
+
+MASTERS_STAMP = "kln_hr_masters"
+
+MASTERS_TTL = 60 * 60
+masters_cache = TTLCache(maxsize=64, ttl=MASTERS_TTL)
+
+# (response key, table, columns, filtered by plant)
+MASTER_TABLES = (
+    ("departments", "kln_hr_department", ("cdb_object_id", "department", "plant_code"), True),
+    ("lines", "kln_hr_line", ("cdb_object_id", "line", "plant_code"), True),
+    ("skills", "kln_hr_skill",
+     ("cdb_object_id", "skill", "plant_code", "department", "type"), True),
+    ("categories", "kln_hr_category", ("cdb_object_id", "category"), False),
+)
+
+
+class MasterDataAPI(JsonAPI):
+    pass
+
+
+@Internal.mount(app=MasterDataAPI, path="hr_master_data")
+def _mount_app():
+    return MasterDataAPI()
+
+
+def _load(plant_code):
+    bundle = {}
+    for key, table, columns, by_plant in MASTER_TABLES:
+        sql = sqlquery.statement(
+            "SELECT {0} FROM {1} WHERE {2} ORDER BY {3}",
+            ", ".join(columns), table,
+            "plant_code = ?" if by_plant and plant_code else "1=1",
+            columns[1],
+        )
+        params = [int(plant_code)] if by_plant and plant_code else []
+        rows = [{c: row[c] for c in columns} for row in sqlquery.select(sql, params)]
+        # Same clean-up the UI applied to every list
+        bundle[key] = [
+            row for row in rows
+            if row[columns[1]] and str(row[columns[1]]).strip() not in ("", "None")
+        ]
+        add_rows(len(rows))
+    return bundle
+
+
+def masters_version():
+    return table_stamp(MASTERS_STAMP)
+
+
+def get_masters(plant_code=None, version=None):
+    """All master lists of a plant (cached per plant and version)"""
+    version = masters_version() if version is None else version
+    bundle = masters_cache.get_or_load(
+        (plant_code, version), lambda: _load(plant_code)
+    )
+    return {"plant_code": plant_code, "version": version, **bundle}
+
+
+def invalidate_masters():
+    masters_cache.invalidate()
+
+
+class MasterDataHandler:
+    def get_masters(self, plant_code=None, version=None):
+        return get_masters(plant_code, version)
+
+
+@MasterDataAPI.path(model=MasterDataHandler, path="")
+def _path():
+    return MasterDataHandler()
+
+
+# 🔹 GET → ?plant_code=
+@MasterDataAPI.json(model=MasterDataHandler, request_method="GET")
+@instrumented("hr_master_data.GET")
+def _get_json(model, request):
+    plant_code = request.params.get('plant_code') or None
+    try:
+        plant_code = int(plant_code) if plant_code is not None else None
+    except ValueError:
+        return {"status": "error", "message": f"Invalid plant_code: {plant_code}"}
+    version = masters_version()
+    etag = make_etag(MASTERS_STAMP, plant_code, version)
+    return conditional(request, etag, lambda: model.get_masters(plant_code, version))
+
+
+# 🔄 Any master write bumps the version (in the writer's transaction)
+@sig.connect(Department, "create", "post")
+@sig.connect(Department, "modify", "post")
+@sig.connect(Department, "delete", "post")
+@sig.connect(Line, "create", "post")
+@sig.connect(Line, "modify", "post")
+@sig.connect(Line, "delete", "post")
+@sig.connect(Skill, "create", "post")
+@sig.connect(Skill, "modify", "post")
+@sig.connect(Skill, "delete", "post")
+@sig.connect(Category, "create", "post")
+@sig.connect(Category, "modify", "post")
+@sig.connect(Category, "delete", "post")
+def _master_changed(self, ctx):
+    bump(MASTERS_STAMP)
+    invalidate_masters()
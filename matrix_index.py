@@ -0,0 +1,439 @@
+"""In-process index of hr_machining_skills, one per plant.
+
+A plant's rows are held column-wise. Person, skill, department, line and
+F/C/G values are interned to small ints, and ``skill_required``/``actual``
+live in ``array('i')`` columns. Each department, line and F/C/G value has
+a bitmap of the row slots carrying it. A filtered read ANDs the bitmaps of
+the active filters and reads the matching slots, so it touches no
+database rows at all.
+
+Writes through ``MachiningSkillsData`` update loaded indexes in place once
+their transaction has committed. Writes from other processes are picked
+up through :mod:`skill_changes`: at most every ``SKILL_MATRIX_INDEX_SYNC_S``
+seconds (default 2) a read compares the plant's change version with the
+index and applies the delta. Writes that bypass the handlers are only
+seen when the index is rebuilt after ``INDEX_REBUILD_SECONDS``.
+``SKILL_MATRIX_INDEX=0`` turns the index off, and every read then goes
+to the database.
+"""
+
+import os
+import threading
+import time
+from array import array
+
+from . import skill_changes
+from . import sqlquery
+from .instrumentation import add_rows, log
+from .plant_indexes import PlantIndexes
+from .streaming import iter_keyset
+
+
+ENABLED = os.environ.get("SKILL_MATRIX_INDEX", "1") not in ("0", "false")
+SYNC_SECONDS = float(os.environ.get("SKILL_MATRIX_INDEX_SYNC_S", "2"))
+
+# Full reload, which also catches writes that bypass the change table
+INDEX_REBUILD_SECONDS = 30 * 60
+
+# Stored in the int columns for NULL levels
+NULL_LEVEL = -(2 ** 31)
+
+INDEX_COLUMNS = (
+    "cdb_object_id",
+    "machining_skills_names",
+    "f_c_g",
+    "person_name",
+    "skill_required",
+    "actual",
+    "liness",
+    "department",
+    "plantt_code",
+)
+
+# Set-bit positions of every byte value, for walking a bitmap
+_BITS = tuple(tuple(b for b in range(8) if value >> b & 1) for value in range(256))
+
+
+def _level(value):
+    if value is None or value == "":
+        return NULL_LEVEL
+    return int(value)
+
+
+def _level_value(stored):
+    return None if stored == NULL_LEVEL else stored
+
+
+def _valid_name(value):
+    # Same rule as sqlquery.VALID_SKILL_ROWS
+    return value is not None and value not in ("", "None")
+
+
+class _Interned:
+    """Bidirectional value <-> small int table"""
+
+    __slots__ = ("values", "ids")
+
+    def __init__(self):
+        self.values = []
+        self.ids = {}
+
+    def id_of(self, value):
+        index = self.ids.get(value)
+        if index is None:
+            index = self.ids[value] = len(self.values)
+            self.values.append(value)
+        return index
+
+
+class Bitmap:
+    """Growable bitset over row slots, backed by a bytearray"""
+
+    __slots__ = ("bits",)
+
+    def __init__(self, size=0):
+        self.bits = bytearray((size + 7) >> 3)
+
+    def set(self, slot):
+        byte = slot >> 3
+        if byte >= len(self.bits):
+            self.bits.extend(bytes(byte + 1 - len(self.bits)))
+        self.bits[byte] |= 1 << (slot & 7)
+
+    def clear(self, slot):
+        byte = slot >> 3
+        if byte < len(self.bits):
+            self.bits[byte] &= ~(1 << (slot & 7)) & 0xFF
+
+    def as_int(self):
+        return int.from_bytes(self.bits, "little")
+
+
+def members(mask):
+    """Slots set in the int bitmask ``mask``, in ascending order"""
+    if not mask:
+        return []
+    data = mask.to_bytes((mask.bit_length() + 7) >> 3, "little")
+    slots = []
+    for index, byte in enumerate(data):
+        if byte:
+            base = index << 3
+            slots.extend(base + bit for bit in _BITS[byte])
+    return slots
+
+
+def popcount(mask):
+    return bin(mask).count("1")
+
+
+class PlantIndex:
+    """Column-wise rows of one plant plus bitmaps per filter value"""
+
+    def __init__(self, plantt_code):
+        self.plantt_code = int(plantt_code)
+        self.version = 0
+        # Bumped by every upsert/remove, for caches derived from the index
+        self.generation = 0
+        self.stamp = None
+        self.built_at = time.monotonic()
+        self.synced_at = 0.0
+        self.lock = threading.RLock()
+
+        self.people = _Interned()
+        self.skills = _Interned()
+        self.departments = _Interned()
+        self.lines = _Interned()
+        self.types = _Interned()
+
+        self.object_ids = []
+        self.person = array("i")
+        self.skill = array("i")
+        self.department = array("i")
+        self.line = array("i")
+        self.f_c_g = array("i")
+        self.required = array("i")
+        self.actual = array("i")
+
+        self.slot_of = {}
+        self.free = []
+        self.alive = Bitmap()
+        self.by_department = {}
+        self.by_line = {}
+        self.by_type = {}
+
+    # 🔹 Maintenance
+
+    @staticmethod
+    def _bitmap(bitmaps, key):
+        bitmap = bitmaps.get(key)
+        if bitmap is None:
+            bitmap = bitmaps[key] = Bitmap()
+        return bitmap
+
+    def _unlink(self, slot):
+        self.alive.clear(slot)
+        self.by_department[self.department[slot]].clear(slot)
+        self.by_line[self.line[slot]].clear(slot)
+        self.by_type[self.f_c_g[slot]].clear(slot)
+
+    def _same(self, slot, row):
+        return (
+            self.people.values[self.person[slot]] == row.get("person_name")
+            and self.skills.values[self.skill[slot]] == row.get("machining_skills_names")
+            and self.departments.values[self.department[slot]] == row.get("department")
+            and self.lines.values[self.line[slot]] == row.get("liness")
+            and self.types.values[self.f_c_g[slot]] == row.get("f_c_g")
+            and self.required[slot] == _level(row.get("skill_required"))
+            and self.actual[slot] == _level(row.get("actual"))
+        )
+
+    def upsert(self, row):
+        """Insert or replace one row (dict with :data:`INDEX_COLUMNS`)"""
+        object_id = row["cdb_object_id"]
+        with self.lock:
+            slot = self.slot_of.get(object_id)
+            if slot is not None:
+                if self._same(slot, row):
+                    # Re-read deltas must not look like changes
+                    return
+                self._unlink(slot)
+            elif self.free:
+                slot = self.free.pop()
+            else:
+                slot = len(self.object_ids)
+                self.object_ids.append(None)
+                for column in (self.person, self.skill, self.department, self.line,
+                               self.f_c_g, self.required, self.actual):
+                    column.append(0)
+
+            self.generation += 1
+            self.object_ids[slot] = object_id
+            self.slot_of[object_id] = slot
+            self.person[slot] = self.people.id_of(row.get("person_name"))
+            self.skill[slot] = self.skills.id_of(row.get("machining_skills_names"))
+            self.department[slot] = department = self.departments.id_of(row.get("department"))
+            self.line[slot] = line = self.lines.id_of(row.get("liness"))
+            self.f_c_g[slot] = f_c_g = self.types.id_of(row.get("f_c_g"))
+            self.required[slot] = _level(row.get("skill_required"))
+            self.actual[slot] = _level(row.get("actual"))
+
+            self.alive.set(slot)
+            self._bitmap(self.by_department, department).set(slot)
+            self._bitmap(self.by_line, line).set(slot)
+            self._bitmap(self.by_type, f_c_g).set(slot)
+
+    def remove(self, object_id):
+        with self.lock:
+            slot = self.slot_of.pop(object_id, None)
+            if slot is None:
+                return False
+            self.generation += 1
+            self._unlink(slot)
+            self.object_ids[slot] = None
+            self.free.append(slot)
+            return True
+
+    def load(self):
+        """Fill the index from the database, keyset page by keyset page"""
+        # Version first: changes racing the load are re-applied by sync()
+        stamp = skill_changes.fingerprint(self.plantt_code)
+        version = stamp[0]
+        where, params = sqlquery.where(
+            sqlquery.SKILL_FILTERS, {"plantt_code": self.plantt_code}
+        )
+        count = 0
+        for row in iter_keyset(INDEX_COLUMNS, "hr_machining_skills", where, params):
+            self.upsert(row)
+            count += 1
+        add_rows(count)
+        self.version = version
+        self.stamp = stamp
+        self.synced_at = time.monotonic()
+        log.debug("matrix index for plant %s: %d rows, version %s",
+                  self.plantt_code, count, version)
+        return self
+
+    def sync(self, force=False):
+        """Apply changes made by other processes since the last sync"""
+        now = time.monotonic()
+        if not force and now - self.synced_at < SYNC_SECONDS:
+            return self.version
+        with self.lock:
+            stamp = skill_changes.fingerprint(self.plantt_code)
+            if stamp != self.stamp:
+                delta = skill_changes.changes_since(
+                    self.version, INDEX_COLUMNS, {"plantt_code": self.plantt_code}
+                )
+                for object_id in delta["deleted"]:
+                    self.remove(object_id)
+                for row in delta["changed"]:
+                    if row["plantt_code"] is not None \
+                            and int(row["plantt_code"]) != self.plantt_code:
+                        self.remove(row["cdb_object_id"])
+                    else:
+                        self.upsert(row)
+                add_rows(len(delta["changed"]) + len(delta["deleted"]))
+                self.version = delta["version"]
+                self.stamp = stamp
+            self.synced_at = now
+            return self.version
+
+    # 🔹 Reads
+
+    def mask(self, filters=None):
+        """Int bitmask of the slots matching ``filters``"""
+        filters = filters or {}
+        mask = self.alive.as_int()
+        for key, ids, bitmaps in (
+            ("skill_type", self.types.ids, self.by_type),
+            ("department", self.departments.ids, self.by_department),
+            ("liness", self.lines.ids, self.by_line),
+        ):
+            value = filters.get(key)
+            if value is None or value == "":
+                continue
+            value_id = ids.get(value)
+            if value_id is None:
+                return 0
+            mask &= bitmaps[value_id].as_int()
+        return mask
+
+    def count(self, filters=None):
+        with self.lock:
+            return popcount(self.mask(filters))
+
+    def row(self, slot):
+        return {
+            "cdb_object_id": self.object_ids[slot],
+            "machining_skills_names": self.skills.values[self.skill[slot]],
+            "f_c_g": self.types.values[self.f_c_g[slot]],
+            "person_name": self.people.values[self.person[slot]],
+            "skill_required": _level_value(self.required[slot]),
+            "actual": _level_value(self.actual[slot]),
+            "liness": self.lines.values[self.line[slot]],
+            "department": self.departments.values[self.department[slot]],
+            "plantt_code": self.plantt_code,
+        }
+
+    def rows(self, filters=None):
+        """Rows matching ``filters``, in the shape of the GET response"""
+        with self.lock:
+            return [self.row(slot) for slot in members(self.mask(filters))]
+
+    def matrix(self, filters, after, limit):
+        """One page of the pivoted grid (same result as the SQL path)"""
+        with self.lock:
+            people_values = self.people.values
+            skill_values = self.skills.values
+            type_values = self.types.values
+            object_ids = self.object_ids
+            valid_people = [_valid_name(v) for v in people_values]
+            valid_skills = [_valid_name(v) for v in skill_values]
+
+            slots = [
+                slot for slot in members(self.mask(filters))
+                if valid_people[self.person[slot]] and valid_skills[self.skill[slot]]
+            ]
+
+            totals = {"total": len(slots), "F": 0, "C": 0, "G": 0}
+            anchors = {}
+            for slot in slots:
+                f_c_g = type_values[self.f_c_g[slot]]
+                if f_c_g in totals:
+                    totals[f_c_g] += 1
+                person = self.person[slot]
+                object_id = object_ids[slot]
+                anchor = anchors.get(person)
+                if anchor is None or object_id < anchor:
+                    anchors[person] = object_id
+
+            ordered = sorted(
+                (anchor, person) for person, anchor in anchors.items()
+                if not after or anchor > after
+            )
+            has_more = len(ordered) > limit
+            ordered = ordered[:limit]
+
+            page = {person: {
+                "person_name": people_values[person],
+                "anchor": anchor,
+                "department": None,
+                "liness": None,
+                "cells": {},
+            } for anchor, person in ordered}
+            skills = {}
+            cell_slots = sorted(
+                (slot for slot in slots if self.person[slot] in page),
+                key=object_ids.__getitem__,
+            )
+            for slot in cell_slots:
+                entry = page[self.person[slot]]
+                skill = skill_values[self.skill[slot]]
+                skills.setdefault(skill, type_values[self.f_c_g[slot]])
+                entry["department"] = (
+                    entry["department"] or self.departments.values[self.department[slot]]
+                )
+                entry["liness"] = entry["liness"] or self.lines.values[self.line[slot]]
+                entry["cells"].setdefault(skill, {
+                    "cdb_object_id": object_ids[slot],
+                    "required": _level_value(self.required[slot]),
+                    "actual": _level_value(self.actual[slot]) or 0,
+                })
+
+            return {
+                "view": "matrix",
+                "skills": [{"name": name, "f_c_g": skills[name]} for name in sorted(skills)],
+                "people": [page[person] for _, person in ordered],
+                "totals": totals,
+                "limit": limit,
+                "next_after": ordered[-1][0] if has_more and ordered else None,
+            }
+
+    def stats(self):
+        with self.lock:
+            columns = (self.person, self.skill, self.department, self.line,
+                       self.f_c_g, self.required, self.actual)
+            bitmaps = [self.alive] + [
+                bitmap for group in (self.by_department, self.by_line, self.by_type)
+                for bitmap in group.values()
+            ]
+            return {
+                "rows": len(self.slot_of),
+                "slots": len(self.object_ids),
+                "people": len(self.people.values),
+                "skills": len(self.skills.values),
+                "version": self.version,
+                "age_s": round(time.monotonic() - self.built_at, 1),
+                "column_bytes": sum(c.itemsize * len(c) for c in columns),
+                "bitmap_bytes": sum(len(b.bits) for b in bitmaps),
+            }
+
+
+plants = PlantIndexes(lambda plantt_code: PlantIndex(plantt_code).load(),
+                     INDEX_REBUILD_SECONDS)
+
+
+def for_plant(plantt_code):
+    """Synced index of ``plantt_code``, loaded on first use; None if disabled"""
+    if not ENABLED or plantt_code in (None, ""):
+        return None
+    return plants.get(plantt_code)
+
+
+def upsert(row):
+    """Apply a committed insert/update to the loaded index of its plant"""
+    plants.upsert(row)
+
+
+def remove(object_ids):
+    """Apply committed deletes to every loaded index"""
+    plants.remove(object_ids)
+
+
+def invalidate(plantt_code=None):
+    plants.invalidate(plantt_code)
+
+
+def stats():
+    return {"enabled": ENABLED,
+            "plants": {i.plantt_code: i.stats() for i in plants.loaded()}}
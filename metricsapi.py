@@ -0,0 +1,60 @@
+from cs.platform.web import JsonAPI
+from cs.platform.web.root import Internal
+
+from . import coalesce
+from . import instrumentation
+from . import matrix_index
+from . import search_index
+from . import sqlquery
+from .plant_rollup import last_good_cache, rollup_cache
+from .plantcodeapi import plant_code_cache
+from .skill_analytics import analytics_cache
+from .skill_trends import trends_cache
+from .staffing import competency_cache
+
+
+class MetricsAPI(JsonAPI):
+    pass
+
+
+@Internal.mount(app=MetricsAPI, path="skill_matrix_metrics")
+def _mount_app():
+    return MetricsAPI()
+
+
+class MetricsHandler:
+    """Latency percentiles and cache counters of this process"""
+
+    def get_metrics(self):
+        return {
+            "endpoints": instrumentation.snapshot(),
+            "coalescing": coalesce.stats(),
+            "caches": {
+                "plant_code": plant_code_cache.stats(),
+                "analytics": analytics_cache.stats(),
+                "trends": trends_cache.stats(),
+                "statements": sqlquery.cache_info(),
+                "matrix_index": matrix_index.stats(),
+                "search_index": search_index.stats(),
+                "staffing": competency_cache.stats(),
+                "rollup": rollup_cache.stats(),
+                "rollup_last_good": last_good_cache.stats(),
+            },
+        }
+
+
+@MetricsAPI.path(model=MetricsHandler, path="")
+def _path():
+    return MetricsHandler()
+
+
+@MetricsAPI.json(model=MetricsHandler, request_method="GET")
+def _get_json(model, request):
+    return model.get_metrics()
+
+
+# 🔹 DELETE → Reset the latency windows
+@MetricsAPI.json(model=MetricsHandler, request_method="DELETE")
+def _delete_json(model, request):
+    instrumentation.reset()
+    return {"status": "success", "message": "Metrics reset"}
@@ -0,0 +1,77 @@
+"""Registry of the in-process per-plant indexes.
+
+:mod:`matrix_index` and :mod:`search_index` both keep one index per plant,
+loaded on first use, rebuilt after a while and kept current between
+rebuilds by their own ``sync()``. :class:`PlantIndexes` holds those
+indexes for either of them. A plant is loaded by one thread at a time:
+the first request for a plant waits for the load, and while an older
+index exists other requests keep reading it during the rebuild.
+"""
+
+import threading
+import time
+
+
+class PlantIndexes:
+    """Loaded indexes by plant; ``build(plantt_code)`` returns a loaded index
+
+    Indexes need ``plantt_code``, ``built_at`` (monotonic), ``sync()``,
+    ``upsert(row)`` and ``remove(object_id)``.
+    """
+
+    def __init__(self, build, max_age):
+        self.build = build
+        self.max_age = max_age
+        self._indexes = {}
+        self._loading = {}
+        self._lock = threading.Lock()
+
+    def get(self, plantt_code):
+        """Synced index of ``plantt_code``, loaded on first use"""
+        plantt_code = int(plantt_code)
+        index = self._indexes.get(plantt_code)
+        if index is None or time.monotonic() - index.built_at > self.max_age:
+            with self._lock:
+                loading = self._loading.setdefault(plantt_code, threading.Lock())
+            if loading.acquire(blocking=index is None):
+                try:
+                    current = self._indexes.get(plantt_code)
+                    if current is None or current is index:
+                        fresh = self.build(plantt_code)
+                        with self._lock:
+                            self._indexes[plantt_code] = fresh
+                        return fresh
+                    # Loaded by the thread we waited for
+                    index = current
+                finally:
+                    loading.release()
+        index.sync()
+        return index
+
+    def loaded(self):
+        with self._lock:
+            return list(self._indexes.values())
+
+    def upsert(self, row):
+        """Apply a committed insert/update to the loaded index of its plant"""
+        plantt_code = row.get("plantt_code")
+        for index in self.loaded():
+            # A row that moved plants leaves its old index
+            if plantt_code is not None and index.plantt_code == int(plantt_code):
+                index.upsert(row)
+            else:
+                index.remove(row["cdb_object_id"])
+
+    def remove(self, object_ids):
+        """Apply committed deletes to every loaded index"""
+        indexes = self.loaded()
+        for object_id in object_ids:
+            for index in indexes:
+                index.remove(object_id)
+
+    def invalidate(self, plantt_code=None):
+        with self._lock:
+            if plantt_code is None:
+                self._indexes.clear()
+            else:
+                self._indexes.pop(int(plantt_code), None)
@@ -0,0 +1,216 @@
+"""Group-level coverage / gap report across all plants.
+
+``GET /internal/hr_plant_rollup`` runs the per-plant gap aggregates of
+:mod:`skill_analytics` on a small thread pool and merges them into one
+report: totals, F/C/G types, departments and the worst lines across
+plants.
+
+Each plant's slice is cached separately, keyed by that plant's
+skill_changes version, so a report only recomputes the plants that
+changed. Plants that miss the timeout are reported as ``"timeout"``, or
+as ``"stale"`` with their last good slice (kept for an hour) and the age
+of that slice since it was computed. Their queries keep running and fill
+the cache for the next report. The same slice is never computed twice at
+once.
+
+Query params: ``plants`` (comma separated, default every plant with
+skill rows), ``department``, ``skill_type``, ``top``.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from cs.platform.web import JsonAPI
+from cs.platform.web.root import Internal
+
+from . import skill_changes, sqlquery
+from .instrumentation import instrumented, log
+from .skill_analytics import TOP_N_DEFAULT, TOP_N_MAX, SkillAnalyticsData, _summarize
+from .ttlcache import TTLCache
+
+
+ROLLUP_WORKERS = int(os.environ.get("SKILL_MATRIX_ROLLUP_WORKERS", "4"))
+PLANT_TIMEOUT = float(os.environ.get("SKILL_MATRIX_ROLLUP_TIMEOUT_S", "5"))
+ROLLUP_FILTERS = ("department", "skill_type")
+
+# Slices are keyed by version; the TTL only catches writes made elsewhere
+SLICE_TTL = 10 * 60
+PLANTS_TTL = 5 * 60
+# How long a plant that keeps timing out is still answered from its last slice
+LAST_GOOD_TTL = 60 * 60
+rollup_cache = TTLCache(maxsize=1024, ttl=SLICE_TTL)
+plants_cache = TTLCache(maxsize=1, ttl=PLANTS_TTL)
+# Slice key without version → (slice, computed at)
+last_good_cache = TTLCache(maxsize=1024, ttl=LAST_GOOD_TTL)
+
+_inflight = {}      # slice key → Future
+_lock = threading.Lock()
+_pool = None
+
+
+class PlantRollupAPI(JsonAPI):
+    pass
+
+
+@Internal.mount(app=PlantRollupAPI, path="hr_plant_rollup")
+def _mount_app():
+    return PlantRollupAPI()
+
+
+def _executor():
+    global _pool
+    with _lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(
+                max_workers=ROLLUP_WORKERS, thread_name_prefix="plant-rollup"
+            )
+        return _pool
+
+
+def all_plants():
+    """Every plantt_code with skill rows"""
+    def load():
+        rs = sqlquery.select(
+            "SELECT DISTINCT plantt_code FROM hr_machining_skills"
+            " WHERE plantt_code IS NOT NULL"
+        )
+        return sorted(int(row["plantt_code"]) for row in rs)
+    return plants_cache.get_or_load("plants", load)
+
+
+def _slice(plantt_code, filters, top_n):
+    """One plant's aggregates; runs on the pool"""
+    key = (plantt_code, filters, top_n, skill_changes.fingerprint(plantt_code))
+    entry = rollup_cache.get(key)
+    if entry is None:
+        started = time.monotonic()
+        data = SkillAnalyticsData()._compute(
+            dict(filters, plantt_code=plantt_code), top_n
+        )
+        data["elapsed_ms"] = round((time.monotonic() - started) * 1000, 1)
+        # Keep when the slice was computed, so a cache hit does not make it younger
+        entry = (data, time.time())
+        rollup_cache.set(key, entry)
+    last_good_cache.set((plantt_code, filters, top_n), entry)
+    return entry[0]
+
+
+def _submit(plantt_code, filters, top_n):
+    """Future for the plant's slice, shared with requests already waiting on it"""
+    key = (plantt_code, filters, top_n)
+    pool = _executor()
+    with _lock:
+        future = _inflight.get(key)
+        if future is None:
+            future = _inflight[key] = pool.submit(_slice, plantt_code, filters, top_n)
+            future.add_done_callback(lambda f: _forget(key, f))
+    return future
+
+
+def _forget(key, future):
+    with _lock:
+        if _inflight.get(key) is future:
+            del _inflight[key]
+
+
+def _add(totals, summary):
+    totals["total"] += summary["total"]
+    totals["covered"] += summary["covered"]
+    totals["gap_levels"] += summary["gap_levels"]
+
+
+def _totals():
+    return {"total": 0, "covered": 0, "gap_levels": 0}
+
+
+class PlantRollupData:
+    """Per-plant gap aggregates merged into one group report"""
+
+    def get_rollup(self, plants=None, filters=None, top_n=TOP_N_DEFAULT,
+                   timeout=PLANT_TIMEOUT):
+        filters = tuple(sorted(
+            (k, v) for k, v in (filters or {}).items()
+            if k in ROLLUP_FILTERS and v not in (None, "")
+        ))
+        plants = sorted({int(p) for p in plants}) if plants else all_plants()
+        futures = {p: _submit(p, filters, top_n) for p in plants}
+        wait(futures.values(), timeout=timeout)
+
+        slices = {}
+        report_plants = {}
+        for plant, future in futures.items():
+            entry = {"status": "ok"}
+            if future.done() and future.exception() is None:
+                slices[plant] = future.result()
+            else:
+                if future.done():
+                    log.error("plant rollup for %s failed: %s", plant, future.exception())
+                    entry = {"status": "error", "message": str(future.exception())}
+                else:
+                    entry = {"status": "timeout"}
+                last = last_good_cache.get((plant, filters, top_n))
+                if last is not None:
+                    slices[plant] = last[0]
+                    entry = {"status": "stale", "reason": entry["status"],
+                             "age_s": round(time.time() - last[1], 1)}
+            if plant in slices:
+                entry["plant"] = slices[plant]["plant"]
+                entry["by_type"] = slices[plant]["by_type"]
+                entry["elapsed_ms"] = slices[plant].get("elapsed_ms")
+            report_plants[plant] = entry
+
+        return dict(
+            self._merge(slices, top_n),
+            status="success",
+            complete=all(e["status"] == "ok" for e in report_plants.values()),
+            missing=[p for p in plants if p not in slices],
+            filters=dict(filters),
+            plants=report_plants,
+        )
+
+    @staticmethod
+    def _merge(slices, top_n):
+        total = _totals()
+        by_type = {}
+        by_department = {}
+        lines = {}
+        for plant, data in slices.items():
+            for group in data["groups"]:
+                _add(total, group)
+                _add(by_type.setdefault(group["f_c_g"], _totals()), group)
+                _add(by_department.setdefault(group["department"], _totals()), group)
+                _add(lines.setdefault((plant, group["liness"]), _totals()), group)
+
+        worst = sorted(
+            ({"plantt_code": plant, "liness": line, **_summarize(t)}
+             for (plant, line), t in lines.items()),
+            key=lambda l: (l["coverage_pct"], -l["gap_levels"],
+                           l["plantt_code"], str(l["liness"])),
+        )
+        return {
+            "total": _summarize(total),
+            "by_type": {t: _summarize(v) for t, v in by_type.items()},
+            "by_department": {d: _summarize(v) for d, v in by_department.items()},
+            "worst_lines": worst[:top_n],
+        }
+
+
+# 🔗 Path Mapping
+@PlantRollupAPI.path(model=PlantRollupData, path="")
+def _path():
+    return PlantRollupData()
+
+
+# 🔹 GET → ?plants=2021,2022&department=&skill_type=&top=
+@PlantRollupAPI.json(model=PlantRollupData, request_method="GET")
+@instrumented("hr_plant_rollup.GET")
+def _get_json(model, request):
+    filters = {key: request.params.get(key) for key in ROLLUP_FILTERS}
+    try:
+        plants = [p for p in (request.params.get('plants') or "").split(",") if p.strip()]
+        top_n = int(request.params.get('top') or TOP_N_DEFAULT)
+        return model.get_rollup(plants, filters, max(1, min(top_n, TOP_N_MAX)))
+    except ValueError as e:
+        return {"status": "error", "message": f"Invalid rollup request: {e}"}
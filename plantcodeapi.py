@@ -1,6 +1,22 @@
+import os
+
 from cs.platform.web import JsonAPI
 from cs.platform.web.root import Internal
-from cdb import sqlapi, auth
+from cdb import auth, rte, sig
+from cdb.objects.org import Person
+
+from . import sqlquery
+from .conditional import conditional, make_etag
+from .ttlcache import TTLCache
+
+
+# personalnummer → plant_code, shared by all requests in this process
+PLANT_CODE_TTL = 15 * 60
+PLANT_CODE_MISS_TTL = 60
+plant_code_cache = TTLCache(maxsize=20000, ttl=PLANT_CODE_TTL)
+
+# Set to "1" to preload every employee's plant code at startup
+WARM_UP_ENV = "SKILL_MATRIX_PLANT_CODE_WARMUP"
 
 
 class PlantCodeAPI(JsonAPI):
@@ -12,23 +28,52 @@ def _mount_app():
     return PlantCodeAPI()
 
 
+def load_plant_code(personal_no):
+    sql_plant_code = """
+        SELECT plant_code
+        FROM angestellter
+        WHERE personalnummer = ?
+    """
+    res = sqlquery.select(sql_plant_code, [personal_no])
+
+    if res and len(res) > 0:
+        return res[0]["plant_code"]
+    return None
+
+
+def invalidate_plant_code(personal_no=None):
+    """Forget the cached plant code of one employee (or of everybody)"""
+    plant_code_cache.invalidate(personal_no)
+
+
+def warm_up_plant_codes():
+    """Preload the plant code of every employee into the cache"""
+    rs = sqlquery.select(
+        "SELECT personalnummer, plant_code FROM angestellter"
+        " WHERE personalnummer IS NOT NULL"
+    )
+    count = 0
+    for row in rs:
+        if row["plant_code"] is not None:
+            plant_code_cache.set(row["personalnummer"], row["plant_code"])
+            count += 1
+    return count
+
+
 class PlantCodeHandler:
     def logic_for_api(self, filters=None):
         personal_no = auth.get_attribute('personalnummer')
         if not personal_no:
             return {"error": "No personalnummer found"}
 
-        sql_plant_code = f"""
-            SELECT plant_code 
-            FROM angestellter 
-            WHERE personalnummer = '{personal_no}'
-        """
-        res = sqlapi.RecordSet2(sql=sql_plant_code)
-
-        if res and len(res) > 0:
-            plant_code = res[0]["plant_code"]
-        else:
-            plant_code = "N/A"
+        plant_code = plant_code_cache.get(personal_no)
+        if plant_code is None:
+            plant_code = load_plant_code(personal_no)
+            if plant_code is None:
+                plant_code = "N/A"
+                plant_code_cache.set(personal_no, plant_code, ttl=PLANT_CODE_MISS_TTL)
+            else:
+                plant_code_cache.set(personal_no, plant_code)
 
         return {"plant_code": plant_code}
 
@@ -40,6 +85,23 @@ def _path():
 
 @PlantCodeAPI.json(model=PlantCodeHandler)
 def _json(model, request):
+    if request.params.get('stats') == '1':
+        return plant_code_cache.stats()
     filters = {}  # abhi ke liye empty
-    return model.logic_for_api(filters)
- 
\ No newline at end of file
+    result = model.logic_for_api(filters)
+    # Answered from the cache, so the ETag only saves the transfer
+    return conditional(request, make_etag(result), lambda: result)
+
+
+# 🔄 Keep the cache in sync with angestellter
+@sig.connect(Person, "create", "post")
+@sig.connect(Person, "modify", "post")
+@sig.connect(Person, "delete", "post")
+def _person_changed(self, ctx):
+    invalidate_plant_code(self.personalnummer)
+
+
+@sig.connect(rte.APPLICATIONS_LOADED_HOOK)
+def _warm_up():
+    if os.environ.get(WARM_UP_ENV) == "1":
+        warm_up_plant_codes()
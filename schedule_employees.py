@@ -0,0 +1,108 @@
+"""Schedule ↔ employee link table for hr_training_schedule.
+
+``hr_training_schedule.employee_ids`` stores a JSON list, which can only be
+searched with ``LIKE '%id%'`` (full scan, and employee 12 matches 123).
+The handlers keep one ``(schedule_id, employee_id)`` row per attendee in
+``hr_training_schedule_employee`` so the employee filter becomes an
+indexed lookup.
+
+Existing schedules are linked once with :func:`backfill`, e.g. from a
+``cdb`` python shell::
+
+    from kalyani.iot.skill_matrix import schedule_employees
+    schedule_employees.create_link_table()
+    schedule_employees.backfill()
+"""
+
+import json
+
+from . import sqlquery
+from .streaming import iter_keyset
+
+
+LINK_TABLE = "hr_training_schedule_employee"
+
+CREATE_STATEMENTS = (
+    f"""
+    CREATE TABLE {LINK_TABLE} (
+        schedule_id VARCHAR(40) NOT NULL,
+        employee_id VARCHAR(40) NOT NULL,
+        PRIMARY KEY (schedule_id, employee_id)
+    )
+    """,
+    f"CREATE INDEX {LINK_TABLE}_emp ON {LINK_TABLE} (employee_id, schedule_id)",
+)
+
+# Link rows per INSERT statement
+LINK_CHUNK_ROWS = 500
+
+
+def create_link_table():
+    """Create the link table and its employee index"""
+    for ddl in CREATE_STATEMENTS:
+        sqlquery.execute(ddl)
+
+
+def normalize_ids(employee_ids):
+    """Return the distinct employee ids (as strings) of a list or JSON text"""
+    if isinstance(employee_ids, str):
+        try:
+            employee_ids = json.loads(employee_ids or "[]")
+        except ValueError:
+            return []
+    if not isinstance(employee_ids, (list, tuple)):
+        employee_ids = [employee_ids]
+    seen = []
+    for employee_id in employee_ids:
+        if employee_id is None or employee_id == "":
+            continue
+        employee_id = str(employee_id)
+        if employee_id not in seen:
+            seen.append(employee_id)
+    return seen
+
+
+def add_links(pairs):
+    """Insert ``(schedule_id, employee_id)`` pairs in multi-row chunks"""
+    pairs = list(pairs)
+    for start in range(0, len(pairs), LINK_CHUNK_ROWS):
+        chunk = pairs[start:start + LINK_CHUNK_ROWS]
+        sql = sqlquery.statement(
+            "INSERT INTO {0} (schedule_id, employee_id) VALUES {1}",
+            LINK_TABLE, ", ".join(["(?, ?)"] * len(chunk)),
+        )
+        sqlquery.execute(sql, [value for pair in chunk for value in pair])
+    return len(pairs)
+
+
+def delete_links(schedule_id):
+    sqlquery.execute(
+        f"DELETE FROM {LINK_TABLE} WHERE schedule_id = ?", [schedule_id]
+    )
+
+
+def replace_links(schedule_id, employee_ids):
+    """Make the links of one schedule match ``employee_ids``"""
+    delete_links(schedule_id)
+    return add_links(
+        (schedule_id, employee_id) for employee_id in normalize_ids(employee_ids)
+    )
+
+
+def backfill():
+    """Rebuild the link table from ``hr_training_schedule.employee_ids``"""
+    sqlquery.execute(f"DELETE FROM {LINK_TABLE}")
+    schedules = 0
+    pairs = []
+    links = 0
+    for row in iter_keyset(("cdb_object_id", "employee_ids"), "hr_training_schedule"):
+        schedules += 1
+        pairs.extend(
+            (row["cdb_object_id"], employee_id)
+            for employee_id in normalize_ids(row["employee_ids"])
+        )
+        if len(pairs) >= LINK_CHUNK_ROWS:
+            links += add_links(pairs)
+            pairs = []
+    links += add_links(pairs)
+    return {"schedules": schedules, "links": links}
@@ -0,0 +1,449 @@
+"""Typeahead search over people, skills, departments and lines of a plant.
+
+``GET /internal/hr_search?plantt_code=&q=&kind=&offset=&limit=`` answers
+from an in-process index per plant. Names are normalised to lower case
+without accents. Devanagari is transliterated to Latin, and common
+spelling variants of Indian names are folded to one key, so
+"Shrikant"/"Srikant", "Lakshmi"/"Laxmi" and "Pooja"/"Puja" find each
+other. Query tokens match indexed tokens by prefix (bisect over the
+sorted vocabulary). When that yields too few hits, trigram similarity
+fills the page, which catches typos and infixes.
+
+People, skills, departments and lines come from hr_machining_skills.
+Writes through ``MachiningSkillsData`` update the index via :func:`upsert`
+and :func:`remove`, and other processes' writes are pulled from
+:mod:`skill_changes` like :mod:`matrix_index` does. The master-data
+departments, lines and skills from :mod:`master_data` are added too, and
+re-diffed when the master stamp changes.
+"""
+
+import os
+import re
+import threading
+import time
+import unicodedata
+from bisect import bisect_left
+
+from cs.platform.web import JsonAPI
+from cs.platform.web.root import Internal
+
+from . import master_data
+from . import skill_changes
+from . import sqlquery
+from .instrumentation import add_rows, instrumented
+from .plant_indexes import PlantIndexes
+from .streaming import iter_keyset
+
+
+SYNC_SECONDS = float(os.environ.get("SKILL_MATRIX_SEARCH_SYNC_S", "2"))
+INDEX_REBUILD_SECONDS = 30 * 60
+
+KINDS = ("person", "skill", "department", "line")
+SEARCH_PAGE_SIZE = 10
+SEARCH_MAX_PAGE_SIZE = 50
+# Trigram matches below this similarity are dropped
+MIN_SIMILARITY = 0.3
+
+INDEX_COLUMNS = (
+    "cdb_object_id",
+    "person_name",
+    "machining_skills_names",
+    "department",
+    "liness",
+    "plantt_code",
+)
+
+
+class SearchAPI(JsonAPI):
+    pass
+
+
+@Internal.mount(app=SearchAPI, path="hr_search")
+def _mount_app():
+    return SearchAPI()
+
+
+# 🔹 Normalisation
+
+_DEVANAGARI_VOWELS = {
+    "अ": "a", "आ": "aa", "इ": "i", "ई": "ii", "उ": "u", "ऊ": "uu", "ऋ": "ri",
+    "ए": "e", "ऐ": "ai", "ओ": "o", "औ": "au",
+}
+_DEVANAGARI_SIGNS = {
+    "ा": "aa", "ि": "i", "ी": "ii", "ु": "u", "ू": "uu", "ृ": "ri",
+    "े": "e", "ै": "ai", "ो": "o", "ौ": "au",
+}
+_DEVANAGARI_CONSONANTS = {
+    "क": "k", "ख": "kh", "ग": "g", "घ": "gh", "ङ": "n",
+    "च": "ch", "छ": "chh", "ज": "j", "झ": "jh", "ञ": "n",
+    "ट": "t", "ठ": "th", "ड": "d", "ढ": "dh", "ण": "n",
+    "त": "t", "थ": "th", "द": "d", "ध": "dh", "न": "n",
+    "प": "p", "फ": "ph", "ब": "b", "भ": "bh", "म": "m",
+    "य": "y", "र": "r", "ल": "l", "ळ": "l", "व": "v",
+    "श": "sh", "ष": "sh", "स": "s", "ह": "h",
+}
+_VIRAMA = "्"
+_NASALS = {"ं": "n", "ँ": "n", "ः": "h"}
+
+
+def transliterate(text):
+    """Devanagari → Latin (inherent vowel dropped at word end)"""
+    out = []
+    pending = False  # consonant waiting for its vowel
+    for char in text:
+        if char in _DEVANAGARI_CONSONANTS:
+            if pending:
+                out.append("a")
+            out.append(_DEVANAGARI_CONSONANTS[char])
+            pending = True
+        elif char in _DEVANAGARI_SIGNS:
+            out.append(_DEVANAGARI_SIGNS[char])
+            pending = False
+        elif char == _VIRAMA:
+            pending = False
+        else:
+            if pending and (char in _NASALS or char.isalnum()):
+                out.append("a")
+            pending = False
+            out.append(_DEVANAGARI_VOWELS.get(char) or _NASALS.get(char) or char)
+    return "".join(out)
+
+
+# Spelling variants folded onto one key; applied in order
+_FOLDS = (
+    (re.compile(r"ee|ii"), "i"),
+    (re.compile(r"oo|uu"), "u"),
+    (re.compile(r"ksh|x"), "x"),
+    (re.compile(r"([kgcjtdpb])h"), r"\1"),
+    (re.compile(r"sh"), "s"),
+    (re.compile(r"w"), "v"),
+    (re.compile(r"q|ck"), "k"),
+    (re.compile(r"z"), "j"),
+    (re.compile(r"([a-z])\1+"), r"\1"),
+)
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def normalize(text):
+    """Lower-case ASCII form of ``text`` (accents stripped, Devanagari transliterated)"""
+    text = transliterate(str(text or ""))
+    text = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in text if not unicodedata.combining(c)).lower()
+
+
+def fold(token):
+    for pattern, replacement in _FOLDS:
+        token = pattern.sub(replacement, token)
+    return token
+
+
+def tokens(text):
+    return [fold(t) for t in _TOKEN.findall(normalize(text))]
+
+
+def trigrams(key):
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+# 🔹 Index
+
+class _Doc:
+    __slots__ = ("id", "kind", "name", "key", "tokens", "grams", "rows",
+                 "master", "department", "liness")
+
+    def __init__(self, doc_id, kind, name):
+        self.id = doc_id
+        self.kind = kind
+        self.name = name
+        self.tokens = tokens(name)
+        self.key = " ".join(self.tokens)
+        self.grams = trigrams(self.key)
+        self.rows = set()
+        self.master = False
+        self.department = None
+        self.liness = None
+
+
+class SearchIndex:
+    """Prefix vocabulary + trigram postings over one plant's names"""
+
+    def __init__(self, plantt_code):
+        self.plantt_code = int(plantt_code)
+        self.lock = threading.RLock()
+        self.docs = {}
+        self.by_name = {}
+        self.next_id = 0
+        self.vocabulary = []
+        self.token_docs = {}
+        self.gram_docs = {}
+        # cdb_object_id → doc keys the row contributes to
+        self.row_docs = {}
+        self.version = 0
+        self.stamp = None
+        self.masters_version = None
+        self.built_at = time.monotonic()
+        self.synced_at = 0.0
+
+    def _doc(self, kind, name):
+        key = (kind, name)
+        doc = self.by_name.get(key)
+        if doc is None:
+            doc = _Doc(self.next_id, kind, name)
+            self.next_id += 1
+            self.by_name[key] = doc
+            self.docs[doc.id] = doc
+            for token in set(doc.tokens):
+                postings = self.token_docs.get(token)
+                if postings is None:
+                    postings = self.token_docs[token] = set()
+                    self.vocabulary.insert(bisect_left(self.vocabulary, token), token)
+                postings.add(doc.id)
+            for gram in doc.grams:
+                self.gram_docs.setdefault(gram, set()).add(doc.id)
+        return doc
+
+    def _release(self, doc):
+        if doc.rows or doc.master:
+            return
+        del self.by_name[(doc.kind, doc.name)]
+        del self.docs[doc.id]
+        for token in set(doc.tokens):
+            postings = self.token_docs[token]
+            postings.discard(doc.id)
+            if not postings:
+                del self.token_docs[token]
+                del self.vocabulary[bisect_left(self.vocabulary, token)]
+        for gram in doc.grams:
+            postings = self.gram_docs[gram]
+            postings.discard(doc.id)
+            if not postings:
+                del self.gram_docs[gram]
+
+    @staticmethod
+    def _valid(name):
+        return name is not None and str(name).strip() not in ("", "None")
+
+    def upsert(self, row):
+        with self.lock:
+            self.remove(row["cdb_object_id"])
+            keys = []
+            for kind, column in (("person", "person_name"),
+                                 ("skill", "machining_skills_names"),
+                                 ("department", "department"),
+                                 ("line", "liness")):
+                name = row.get(column)
+                if not self._valid(name):
+                    continue
+                doc = self._doc(kind, name)
+                doc.rows.add(row["cdb_object_id"])
+                if kind == "person":
+                    doc.department = doc.department or row.get("department")
+                    doc.liness = doc.liness or row.get("liness")
+                keys.append((kind, name))
+            self.row_docs[row["cdb_object_id"]] = keys
+
+    def remove(self, object_id):
+        with self.lock:
+            for key in self.row_docs.pop(object_id, ()):
+                doc = self.by_name.get(key)
+                if doc is not None:
+                    doc.rows.discard(object_id)
+                    self._release(doc)
+
+    def _sync_masters(self):
+        version = master_data.masters_version()
+        if version == self.masters_version:
+            return
+        masters = master_data.get_masters(self.plantt_code, version)
+        wanted = set()
+        for kind, key, column in (("department", "departments", "department"),
+                                  ("line", "lines", "line"),
+                                  ("skill", "skills", "skill")):
+            for entry in masters[key]:
+                if self._valid(entry[column]):
+                    wanted.add((kind, entry[column]))
+        for doc in list(self.docs.values()):
+            if doc.master and (doc.kind, doc.name) not in wanted:
+                doc.master = False
+                self._release(doc)
+        for kind, name in wanted:
+            self._doc(kind, name).master = True
+        self.masters_version = version
+
+    def load(self):
+        self.stamp = skill_changes.fingerprint(self.plantt_code)
+        self.version = self.stamp[0]
+        where, params = sqlquery.where(
+            sqlquery.SKILL_FILTERS, {"plantt_code": self.plantt_code}
+        )
+        count = 0
+        with self.lock:
+            for row in iter_keyset(INDEX_COLUMNS, "hr_machining_skills", where, params):
+                self.upsert(row)
+                count += 1
+            self._sync_masters()
+        add_rows(count)
+        self.synced_at = time.monotonic()
+        return self
+
+    def sync(self, force=False):
+        now = time.monotonic()
+        if not force and now - self.synced_at < SYNC_SECONDS:
+            return
+        with self.lock:
+            stamp = skill_changes.fingerprint(self.plantt_code)
+            if stamp != self.stamp:
+                delta = skill_changes.changes_since(
+                    self.version, INDEX_COLUMNS, {"plantt_code": self.plantt_code}
+                )
+                for object_id in delta["deleted"]:
+                    self.remove(object_id)
+                for row in delta["changed"]:
+                    if row["plantt_code"] is not None \
+                            and int(row["plantt_code"]) != self.plantt_code:
+                        self.remove(row["cdb_object_id"])
+                    else:
+                        self.upsert(row)
+                self.version = delta["version"]
+                self.stamp = stamp
+            self._sync_masters()
+            self.synced_at = now
+
+    # 🔹 Query
+
+    def _prefix_docs(self, token):
+        start = bisect_left(self.vocabulary, token)
+        found = set()
+        for vocab in self.vocabulary[start:]:
+            if not vocab.startswith(token):
+                break
+            found |= self.token_docs[vocab]
+        return found
+
+    def search(self, query, kind=None, offset=0, limit=SEARCH_PAGE_SIZE):
+        query_tokens = tokens(query)
+        if not query_tokens:
+            return [], 0
+        query_key = " ".join(query_tokens)
+        with self.lock:
+            scored = {}
+            matched = None
+            for token in query_tokens:
+                docs = self._prefix_docs(token)
+                matched = docs if matched is None else matched & docs
+                if not matched:
+                    break
+            for doc_id in matched or ():
+                doc = self.docs[doc_id]
+                score = 60.0
+                if doc.key == query_key:
+                    score += 40.0
+                elif doc.key.startswith(query_key):
+                    score += 20.0
+                score += 10.0 * len(query_key) / max(len(doc.key), 1)
+                scored[doc_id] = score
+
+            if len(scored) < offset + limit and len(query_key) >= 3:
+                query_grams = trigrams(query_key)
+                shared = {}
+                for gram in query_grams:
+                    for doc_id in self.gram_docs.get(gram, ()):
+                        shared[doc_id] = shared.get(doc_id, 0) + 1
+                for doc_id, count in shared.items():
+                    if doc_id in scored:
+                        continue
+                    doc = self.docs[doc_id]
+                    similarity = count / max(len(query_grams), len(doc.grams))
+                    if similarity >= MIN_SIMILARITY:
+                        scored[doc_id] = 50.0 * similarity
+
+            docs = [self.docs[d] for d in scored]
+            if kind:
+                docs = [d for d in docs if d.kind == kind]
+            docs.sort(key=lambda d: (-scored[d.id], -len(d.rows), d.name))
+            page = docs[offset:offset + limit]
+            return [
+                {
+                    "kind": doc.kind,
+                    "name": doc.name,
+                    "score": round(scored[doc.id], 2),
+                    "rows": len(doc.rows),
+                    **({"department": doc.department, "liness": doc.liness}
+                       if doc.kind == "person" else {}),
+                }
+                for doc in page
+            ], len(docs)
+
+    def stats(self):
+        with self.lock:
+            return {
+                "docs": len(self.docs),
+                "tokens": len(self.vocabulary),
+                "trigrams": len(self.gram_docs),
+                "rows": len(self.row_docs),
+                "version": self.version,
+            }
+
+
+plants = PlantIndexes(lambda plantt_code: SearchIndex(plantt_code).load(),
+                     INDEX_REBUILD_SECONDS)
+
+
+def for_plant(plantt_code):
+    """Synced search index of ``plantt_code``, loaded on first use"""
+    return plants.get(plantt_code)
+
+
+def upsert(row):
+    """Apply a committed insert/update to the loaded index of its plant"""
+    plants.upsert(row)
+
+
+def remove(object_ids):
+    plants.remove(object_ids)
+
+
+def stats():
+    return {i.plantt_code: i.stats() for i in plants.loaded()}
+
+
+class SearchData:
+    def search(self, plantt_code, query, kind=None, offset=0, limit=SEARCH_PAGE_SIZE):
+        results, total = for_plant(plantt_code).search(query, kind, offset, limit)
+        add_rows(len(results))
+        return {
+            "query": query,
+            "kind": kind,
+            "total": total,
+            "offset": offset,
+            "limit": limit,
+            "next_offset": offset + limit if offset + limit < total else None,
+            "results": results,
+        }
+
+
+# 🔗 Path Mapping
+@SearchAPI.path(model=SearchData, path="")
+def _path():
+    return SearchData()
+
+
+# 🔹 GET → ?plantt_code=&q=&kind=person|skill|department|line&offset=&limit=
+@SearchAPI.json(model=SearchData, request_method="GET")
+@instrumented("hr_search.GET")
+def _get_json(model, request):
+    plantt_code = request.params.get('plantt_code')
+    if not plantt_code:
+        return {"status": "error", "message": "plantt_code is required"}
+    kind = request.params.get('kind') or None
+    if kind is not None and kind not in KINDS:
+        return {"status": "error", "message": f"kind must be one of {', '.join(KINDS)}"}
+    try:
+        offset = max(0, int(request.params.get('offset') or 0))
+        limit = int(request.params.get('limit') or SEARCH_PAGE_SIZE)
+        limit = max(1, min(limit, SEARCH_MAX_PAGE_SIZE))
+        return model.search(int(plantt_code), request.params.get('q') or "",
+                            kind, offset, limit)
+    except ValueError as e:
+        return {"status": "error", "message": f"Invalid search request: {e}"}
@@ -0,0 +1,144 @@
+from cs.platform.web import JsonAPI
+from cs.platform.web.root import Internal
+
+from . import sqlquery
+from .sqlquery import statement
+from .ttlcache import TTLCache
+
+
+# Aggregates are memoized per plant + filters for a short time
+ANALYTICS_TTL = 60
+analytics_cache = TTLCache(maxsize=512, ttl=ANALYTICS_TTL)
+
+TOP_N_DEFAULT = 5
+TOP_N_MAX = 50
+
+# Shared aggregate columns: rows, covered rows, summed level shortfall
+_AGGREGATES = """
+    COUNT(*) AS total,
+    SUM(CASE WHEN COALESCE(actual, 0) >= skill_required THEN 1 ELSE 0 END) AS covered,
+    SUM(CASE WHEN COALESCE(actual, 0) < skill_required
+             THEN skill_required - COALESCE(actual, 0) ELSE 0 END) AS gap_levels
+"""
+
+
+class SkillAnalyticsAPI(JsonAPI):
+    pass
+
+
+@Internal.mount(app=SkillAnalyticsAPI, path="hr_skill_analytics")
+def _mount_app():
+    return SkillAnalyticsAPI()
+
+
+def _summarize(row):
+    total = int(row["total"] or 0)
+    covered = int(row["covered"] or 0)
+    return {
+        "total": total,
+        "covered": covered,
+        "gaps": total - covered,
+        "gap_levels": int(row["gap_levels"] or 0),
+        "coverage_pct": round(100.0 * covered / total, 1) if total else 0.0,
+    }
+
+
+class SkillAnalyticsData:
+    """Skill-gap aggregates over hr_machining_skills, computed in the DB"""
+
+    # 🔹 GET → Gap counts / coverage by department, line and F/C/G type
+    def get_gap_analytics(self, filters=None, top_n=TOP_N_DEFAULT):
+        filters = filters or {}
+        key = (tuple(sorted(filters.items())), top_n)
+        return analytics_cache.get_or_load(
+            key, lambda: self._compute(filters, top_n)
+        )
+
+    def _compute(self, filters, top_n):
+        where, params = sqlquery.where(
+            sqlquery.SKILL_FILTERS, filters, sqlquery.VALID_SKILL_ROWS
+        )
+
+        # 1️⃣ department × line × type
+        group_sql = statement(
+            "SELECT plantt_code, department, liness, f_c_g, {0}"
+            " FROM hr_machining_skills WHERE {1}"
+            " GROUP BY plantt_code, department, liness, f_c_g",
+            _AGGREGATES, where,
+        )
+        groups = []
+        plant = {"total": 0, "covered": 0, "gap_levels": 0}
+        by_type = {}
+        for row in sqlquery.select(group_sql, params):
+            summary = _summarize(row)
+            groups.append({
+                "plantt_code": row["plantt_code"],
+                "department": row["department"],
+                "liness": row["liness"],
+                "f_c_g": row["f_c_g"],
+                **summary,
+            })
+            for totals in (plant, by_type.setdefault(row["f_c_g"], {
+                    "total": 0, "covered": 0, "gap_levels": 0})):
+                totals["total"] += summary["total"]
+                totals["covered"] += summary["covered"]
+                totals["gap_levels"] += summary["gap_levels"]
+
+        # 2️⃣ line × skill, ranked in Python (few rows per line)
+        skill_sql = statement(
+            "SELECT liness, machining_skills_names, f_c_g, {0}"
+            " FROM hr_machining_skills WHERE {1}"
+            " GROUP BY liness, machining_skills_names, f_c_g",
+            _AGGREGATES, where,
+        )
+        at_risk = {}
+        for row in sqlquery.select(skill_sql, params):
+            summary = _summarize(row)
+            if not summary["gaps"]:
+                continue
+            at_risk.setdefault(row["liness"], []).append({
+                "skill": row["machining_skills_names"],
+                "f_c_g": row["f_c_g"],
+                **summary,
+            })
+        for line, skills in at_risk.items():
+            skills.sort(key=lambda s: (s["coverage_pct"], -s["gap_levels"], s["skill"]))
+            at_risk[line] = skills[:top_n]
+
+        return {
+            "filters": filters,
+            "plant": _summarize(plant),
+            "by_type": {t: _summarize(v) for t, v in by_type.items()},
+            "groups": groups,
+            "top_at_risk": at_risk,
+        }
+
+
+# 🔗 Path Mapping
+@SkillAnalyticsAPI.path(model=SkillAnalyticsData, path="")
+def _path():
+    return SkillAnalyticsData()
+
+
+# 🔹 GET → ?plantt_code=&department=&liness=&skill_type=&top=
+@SkillAnalyticsAPI.json(model=SkillAnalyticsData, request_method="GET")
+def _get_json(model, request):
+    filters = {}
+    for key in ('plantt_code', 'department', 'liness', 'skill_type'):
+        value = request.params.get(key)
+        if value:
+            filters[key] = value
+
+    # plantt_code is numeric; a bad value is an error, not a 500 from the query
+    try:
+        sqlquery.where(sqlquery.SKILL_FILTERS, filters)
+    except ValueError as e:
+        return {"status": "error", "message": f"Invalid filter: {e}"}
+
+    try:
+        top_n = int(request.params.get('top') or TOP_N_DEFAULT)
+    except ValueError:
+        top_n = TOP_N_DEFAULT
+    top_n = max(1, min(top_n, TOP_N_MAX))
+
+    return model.get_gap_analytics(filters, top_n=top_n)
@@ -0,0 +1,163 @@
+"""Change tracking for hr_machining_skills (delta sync).
+
+Every write through ``MachiningSkillsData`` stamps the touched rows in
+``hr_machining_skills_changes`` with a new value of a monotonic counter.
+The table keeps only the latest stamp per ``cdb_object_id``, so it never
+grows beyond the number of rows ever written. Deleted rows stay in it as
+tombstones (``op = 'D'``).
+
+``GET /internal/hr_machining_skills?since=<version>`` then returns only
+the rows changed after ``version``. The table is created once with
+:func:`create_change_table`.
+
+Versions are taken inside the writing transaction, before it commits. A
+slow transaction can therefore commit a version below one that a poller
+has already seen. To cover that, :func:`changes_since` re-reads the last
+``LAG_VERSIONS`` versions before ``since``. Clients must apply deltas
+idempotently. :func:`fingerprint` also changes when such a late commit
+lands.
+"""
+
+import os
+
+from cdb import util
+
+from . import sqlquery
+from .sqlquery import statement
+
+
+CHANGE_TABLE = "hr_machining_skills_changes"
+VERSION_COUNTER = "hr_machining_skills_version"
+
+OP_UPSERT = "U"
+OP_DELETE = "D"
+
+CREATE_STATEMENTS = (
+    f"""
+    CREATE TABLE {CHANGE_TABLE} (
+        cdb_object_id VARCHAR(40) NOT NULL PRIMARY KEY,
+        version BIGINT NOT NULL,
+        op CHAR(1) NOT NULL,
+        plantt_code INTEGER
+    )
+    """,
+    f"CREATE INDEX {CHANGE_TABLE}_ver ON {CHANGE_TABLE} (plantt_code, version)",
+)
+
+# ids per DELETE/INSERT ... IN (...) statement
+CHANGE_CHUNK_IDS = 500
+
+# Versions other writers may take while one transaction is still open
+LAG_VERSIONS = int(os.environ.get("SKILL_MATRIX_CHANGE_LAG", "100"))
+
+_PLANT_FILTER = (("plantt_code", "plantt_code = ?", int),)
+
+
+def create_change_table():
+    for ddl in CREATE_STATEMENTS:
+        sqlquery.execute(ddl)
+
+
+def record(cdb_object_ids, op=OP_UPSERT):
+    """Stamp rows with a new version; call after insert/update, before delete.
+
+    Must run in the caller's transaction so the stamp commits (or rolls
+    back) together with the write. Only ids still present in
+    hr_machining_skills are stamped, so a write that missed its row
+    leaves an existing tombstone alone.
+    """
+    cdb_object_ids = list(cdb_object_ids)
+    if not cdb_object_ids:
+        return None
+    version = util.nextval(VERSION_COUNTER)
+    for start in range(0, len(cdb_object_ids), CHANGE_CHUNK_IDS):
+        markers, ids = sqlquery.placeholders(
+            cdb_object_ids[start:start + CHANGE_CHUNK_IDS]
+        )
+        sqlquery.execute(
+            statement(
+                "DELETE FROM {0} WHERE cdb_object_id IN ("
+                "SELECT cdb_object_id FROM hr_machining_skills"
+                " WHERE cdb_object_id IN ({1}))",
+                CHANGE_TABLE, markers,
+            ),
+            ids,
+        )
+        sqlquery.execute(
+            statement(
+                "INSERT INTO {0} (cdb_object_id, version, op, plantt_code)"
+                " SELECT cdb_object_id, ?, ?, plantt_code"
+                " FROM hr_machining_skills WHERE cdb_object_id IN ({1})",
+                CHANGE_TABLE, markers,
+            ),
+            [version, op] + ids,
+        )
+    return version
+
+
+def current_version(plantt_code=None):
+    where, params = sqlquery.where(_PLANT_FILTER, {"plantt_code": plantt_code})
+    rs = sqlquery.select(
+        statement("SELECT MAX(version) AS version FROM {0} WHERE {1}",
+                  CHANGE_TABLE, where),
+        params,
+    )
+    return int(rs[0]["version"] or 0) if rs and len(rs) else 0
+
+
+def fingerprint(plantt_code=None):
+    """(max version, count, sum) of the newest ``LAG_VERSIONS`` versions
+
+    Unlike :func:`current_version` this also changes when a transaction
+    commits a version below the current maximum.
+    """
+    where, params = sqlquery.where(_PLANT_FILTER, {"plantt_code": plantt_code})
+    rs = sqlquery.select(
+        statement(
+            "SELECT MAX(version) AS version, COUNT(*) AS cnt, SUM(version) AS total"
+            " FROM {0} WHERE {1} AND version >"
+            " (SELECT COALESCE(MAX(version), 0) FROM {0} WHERE {1}) - ?",
+            CHANGE_TABLE, where,
+        ),
+        params + params + [LAG_VERSIONS],
+    )
+    if not rs or not len(rs):
+        return 0, 0, 0
+    row = rs[0]
+    return int(row["version"] or 0), int(row["cnt"] or 0), int(row["total"] or 0)
+
+
+def changes_since(since, columns, filters=None):
+    """Rows changed after ``since`` plus ids of rows deleted after it
+
+    The last ``LAG_VERSIONS`` versions before ``since`` are read again, so
+    rows from transactions that committed late are not missed.
+    """
+    filters = dict(filters or {})
+    where, params = sqlquery.where(
+        (("plantt_code", "c.plantt_code = ?", int),), filters,
+        (("c.version > ?", max(0, int(since) - LAG_VERSIONS)),),
+    )
+    sql = statement(
+        "SELECT c.version AS change_version, c.op AS change_op,"
+        " c.cdb_object_id AS changed_id, {0}"
+        " FROM {1} c LEFT OUTER JOIN hr_machining_skills s"
+        " ON s.cdb_object_id = c.cdb_object_id"
+        " WHERE {2} ORDER BY c.version",
+        ", ".join("s." + c for c in columns), CHANGE_TABLE, where,
+    )
+    changed = []
+    deleted = []
+    version = int(since)
+    for row in sqlquery.select(sql, params):
+        version = max(version, int(row["change_version"]))
+        if row["change_op"] == OP_DELETE or row["cdb_object_id"] is None:
+            deleted.append(row["changed_id"])
+        else:
+            changed.append({c: row[c] for c in columns})
+    return {
+        "since": int(since),
+        "version": version,
+        "changed": changed,
+        "deleted": deleted,
+    }
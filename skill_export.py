@@ -0,0 +1,387 @@
+"""Background CSV/XLSX exports of the pivoted skill matrix.
+
+``POST /internal/hr_skill_matrix_export`` with ``{"plantt_code": ...,
+"format": "csv"|"xlsx"}`` (optionally plus ``skill_type``, ``department``
+and ``liness``) queues an export and returns its job. ``GET ?job=<id>``
+polls the job, and ``GET ?job=<id>&download=1`` streams the finished
+file.
+
+Jobs run on a small worker pool (``SKILL_MATRIX_EXPORT_WORKERS``, default
+2). A worker writes the matrix layout (one row per person, required and
+actual level per skill) to a file under ``SKILL_MATRIX_EXPORT_DIR``. It
+reads ``EXPORT_PAGE_PEOPLE`` people at a time through
+:meth:`MachiningSkillsData.get_skill_matrix`, so memory stays at one page
+however large the plant is.
+
+A finished export is reused by later requests with the same filters and
+format until the plant's :func:`skill_changes.fingerprint` moves. Index
+rebuilds do not invalidate it. Jobs live in the memory of the process
+that accepted them, so polling must reach that process.
+
+Workers run outside any request. Everything they use from the request
+(the filters and the format) is copied into the job at submit time. The
+reads go through :mod:`sqlquery`/``cdb.sqlapi`` and the matrix index and
+need no request, user or open transaction, the same as the
+:mod:`plant_rollup` pool; instrumentation calls are no-ops there.
+"""
+
+import csv
+import os
+import tempfile
+import threading
+import time
+import uuid
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from xml.sax.saxutils import escape
+
+from cs.platform.web import JsonAPI
+from cs.platform.web.root import Internal
+from webob import Response
+
+from . import skill_changes, sqlquery
+from .hr_machining_skills import MachiningSkillsData
+from .instrumentation import add_rows, instrumented, log
+from .sqlquery import statement
+
+
+EXPORT_WORKERS = int(os.environ.get("SKILL_MATRIX_EXPORT_WORKERS", "2"))
+EXPORT_DIR = os.environ.get(
+    "SKILL_MATRIX_EXPORT_DIR",
+    os.path.join(tempfile.gettempdir(), "skill_matrix_exports"),
+)
+
+FORMATS = ("csv", "xlsx")
+EXPORT_FILTERS = ("plantt_code", "skill_type", "department", "liness")
+
+# People per matrix page read by a worker
+EXPORT_PAGE_PEOPLE = 200
+# Finished exports are dropped (with their files) after this long
+EXPORT_TTL = 60 * 60
+# Bytes per chunk of a download
+DOWNLOAD_CHUNK_BYTES = 64 * 1024
+
+CONTENT_TYPES = {
+    "csv": "text/csv",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+_jobs = {}
+_by_key = {}
+_jobs_lock = threading.Lock()
+_pool = None
+
+
+class SkillExportAPI(JsonAPI):
+    pass
+
+
+@Internal.mount(app=SkillExportAPI, path="hr_skill_matrix_export")
+def _mount_app():
+    return SkillExportAPI()
+
+
+def _executor():
+    global _pool
+    with _jobs_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(
+                max_workers=EXPORT_WORKERS, thread_name_prefix="skill-export"
+            )
+        return _pool
+
+
+# 🔹 Writers: writerow(values) then close()
+
+class _CsvWriter:
+    def __init__(self, path):
+        # BOM so Excel opens the UTF-8 file with the right encoding
+        self._file = open(path, "w", newline="", encoding="utf-8-sig")
+        self._writer = csv.writer(self._file)
+
+    def writerow(self, values):
+        self._writer.writerow(["" if v is None else v for v in values])
+
+    def close(self):
+        self._file.close()
+
+
+_XLSX_PARTS = {
+    "[Content_Types].xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    "_rels/.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    "xl/workbook.xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"'
+        ' xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Skill Matrix" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    "xl/_rels/workbook.xml.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    ),
+}
+
+
+class _XlsxWriter:
+    """Single-sheet XLSX with inline strings, streamed into the zip"""
+
+    def __init__(self, path):
+        self._zip = zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED)
+        for name, xml in _XLSX_PARTS.items():
+            self._zip.writestr(name, xml)
+        self._sheet = self._zip.open("xl/worksheets/sheet1.xml", "w", force_zip64=True)
+        self._sheet.write(
+            b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+            b'<sheetData>'
+        )
+
+    @staticmethod
+    def _cell(value):
+        if value is None or value == "":
+            return "<c/>"
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return f"<c><v>{value}</v></c>"
+        return f'<c t="inlineStr"><is><t>{escape(str(value))}</t></is></c>'
+
+    def writerow(self, values):
+        cells = "".join(self._cell(v) for v in values)
+        self._sheet.write(f"<row>{cells}</row>".encode("utf-8"))
+
+    def close(self):
+        self._sheet.write(b"</sheetData></worksheet>")
+        self._sheet.close()
+        self._zip.close()
+
+
+WRITERS = {"csv": _CsvWriter, "xlsx": _XlsxWriter}
+
+
+def _skill_columns(filters):
+    """All skills of the filter, in the grid's column order"""
+    where, params = sqlquery.where(
+        sqlquery.SKILL_FILTERS, filters, sqlquery.VALID_SKILL_ROWS
+    )
+    sql = statement(
+        "SELECT machining_skills_names, MIN(f_c_g) AS f_c_g"
+        " FROM hr_machining_skills WHERE {0}"
+        " GROUP BY machining_skills_names ORDER BY machining_skills_names",
+        where,
+    )
+    return [(r["machining_skills_names"], r["f_c_g"]) for r in sqlquery.select(sql, params)]
+
+
+def write_matrix(path, fmt, filters):
+    """Write the pivoted matrix of ``filters`` to ``path``; returns people"""
+    skills = _skill_columns(filters)
+    writer = WRITERS[fmt](path)
+    try:
+        header = ["Person", "Department", "Line"]
+        for name, f_c_g in skills:
+            label = f"{name} [{f_c_g}]" if f_c_g else name
+            header += [f"{label} required", f"{label} actual"]
+        header += ["Skills", "Gaps"]
+        writer.writerow(header)
+
+        data = MachiningSkillsData()
+        people = 0
+        after = None
+        while True:
+            page = data.get_skill_matrix(filters, after=after, limit=EXPORT_PAGE_PEOPLE)
+            for person in page["people"]:
+                cells = person["cells"]
+                row = [person["person_name"], person["department"], person["liness"]]
+                gaps = 0
+                for name, _ in skills:
+                    cell = cells.get(name)
+                    if cell is None:
+                        row += [None, None]
+                        continue
+                    row += [cell["required"], cell["actual"]]
+                    if cell["required"] is not None and cell["actual"] < cell["required"]:
+                        gaps += 1
+                writer.writerow(row + [len(cells), gaps])
+                people += 1
+            after = page["next_after"]
+            if not after:
+                break
+    finally:
+        writer.close()
+    return people
+
+
+def _public(job):
+    result = {k: v for k, v in job.items() if k not in ("path", "key")}
+    if job["status"] == "done":
+        result["download"] = f"?job={job['id']}&download=1"
+    return result
+
+
+def _update(job, **fields):
+    with _jobs_lock:
+        job.update(fields)
+
+
+def _run(job):
+    _update(job, status="running", started=time.time())
+    tmp_path = job["path"] + ".part"
+    try:
+        people = write_matrix(tmp_path, job["format"], job["filters"])
+        os.replace(tmp_path, job["path"])
+        add_rows(people)
+        _update(job, status="done", people=people,
+                bytes=os.path.getsize(job["path"]), finished=time.time())
+    except Exception as e:
+        log.exception("skill matrix export %s failed", job["id"])
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        with _jobs_lock:
+            job.update(status="error", message=str(e), finished=time.time())
+            # A failed job must not answer later submits
+            if _by_key.get(job["key"]) == job["id"]:
+                del _by_key[job["key"]]
+
+
+def _expire(now):
+    with _jobs_lock:
+        expired = [
+            job for job in _jobs.values()
+            if job.get("finished") and now - job["finished"] > EXPORT_TTL
+        ]
+        for job in expired:
+            del _jobs[job["id"]]
+            if _by_key.get(job["key"]) == job["id"]:
+                del _by_key[job["key"]]
+    for job in expired:
+        if os.path.exists(job["path"]):
+            os.remove(job["path"])
+
+
+def submit(filters, fmt="csv"):
+    """Queue an export, or return the job already covering this data version"""
+    if fmt not in FORMATS:
+        raise ValueError(f"format must be one of {', '.join(FORMATS)}")
+    filters = {k: v for k, v in filters.items() if k in EXPORT_FILTERS and v not in (None, "")}
+    if not filters.get("plantt_code"):
+        raise ValueError("plantt_code is required")
+
+    now = time.time()
+    _expire(now)
+    # Changes through any process move the fingerprint; index rebuilds do not
+    version = skill_changes.fingerprint(filters["plantt_code"])
+    key = (tuple(sorted((k, str(v)) for k, v in filters.items())), fmt, version)
+    with _jobs_lock:
+        job_id = _by_key.get(key)
+        if job_id in _jobs:
+            return _public(_jobs[job_id])
+        job_id = uuid.uuid4().hex
+        job = _jobs[job_id] = {
+            "id": job_id,
+            "key": key,
+            "status": "queued",
+            "format": fmt,
+            "filters": filters,
+            "version": list(version),
+            "created": now,
+            "path": os.path.join(EXPORT_DIR, f"skill_matrix_{job_id}.{fmt}"),
+        }
+        _by_key[key] = job_id
+        result = _public(job)
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    _executor().submit(_run, job)
+    return result
+
+
+def get_job(job_id):
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+        return _public(job) if job is not None else None
+
+
+def _iter_file(path):
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(DOWNLOAD_CHUNK_BYTES)
+            if not chunk:
+                return
+            yield chunk
+
+
+def download(job_id):
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+    if job is None or job["status"] != "done":
+        return None
+    plant = job["filters"].get("plantt_code")
+    response = Response(
+        app_iter=_iter_file(job["path"]),
+        content_type=CONTENT_TYPES[job["format"]],
+    )
+    response.headers.update({
+        "Content-Disposition":
+            f'attachment; filename="skill_matrix_{plant}.{job["format"]}"',
+        "Content-Length": str(job["bytes"]),
+    })
+    return response
+
+
+class SkillExportData:
+    def submit(self, data):
+        filters = {key: data.get(key) for key in EXPORT_FILTERS}
+        return submit(filters, (data.get("format") or "csv").lower())
+
+    def status(self, job_id):
+        return get_job(job_id)
+
+    def download(self, job_id):
+        return download(job_id)
+
+
+# 🔗 Path Mapping
+@SkillExportAPI.path(model=SkillExportData, path="")
+def _path():
+    return SkillExportData()
+
+
+# 🔹 POST → Queue an export of one plant's matrix
+@SkillExportAPI.json(model=SkillExportData, request_method="POST")
+@instrumented("hr_skill_matrix_export.POST")
+def _post_json(model, request):
+    try:
+        return model.submit(request.json or {})
+    except ValueError as e:
+        return {"status": "error", "message": f"Invalid export request: {e}"}
+
+
+# 🔹 GET → ?job=<id> status, &download=1 for the file
+@SkillExportAPI.json(model=SkillExportData, request_method="GET")
+@instrumented("hr_skill_matrix_export.GET")
+def _get_json(model, request):
+    job_id = request.params.get('job')
+    if not job_id:
+        return {"status": "error", "message": "job is required"}
+    if request.params.get('download') in ("1", "true"):
+        response = model.download(job_id)
+        if response is None:
+            return {"status": "error", "message": f"Export {job_id} is not ready"}
+        return response
+    job = model.status(job_id)
+    if job is None:
+        return {"status": "error", "message": f"Unknown export job: {job_id}"}
+    return job
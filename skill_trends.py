@@ -0,0 +1,441 @@
+"""Skill-level trends from kln_hr_skill_level_history.
+
+``GET /internal/hr_skill_trends?plantt_code=&date_from=&date_to=&bucket=``
+returns the following for each bucket (day, week or month) of the period:
+
+- the average current skill level for the plant, per line, per
+  department and per skill, each with a moving average over
+  ``window`` buckets;
+- time-to-competence per skill: days from an employee's first recorded
+  level to the first level that meets ``skill_required``.
+
+With ``&employee_id=`` the employee's own trajectory per skill is added.
+
+The history has no plant column. Its ``employee_id`` is assumed to hold
+the ``person_name`` of hr_machining_skills, the only person key those
+rows have: an employee belongs to the plant whose rows name them, and
+line, department and the required level come from those rows. History
+rows keyed any other way are not counted.
+
+A plant's history is loaded once into sorted ``array`` columns (series,
+day, level). The bucket, level delta and first-change flag of every
+change are derived column-wise with ``map``, added up per bucket for each
+grouping, and carried forward with prefix sums (``accumulate``). No
+per-bucket query runs. Loaded histories and computed results are cached
+per plant and period until the history table's row count or latest
+``updated_at`` changes.
+"""
+
+from array import array
+from datetime import date, datetime, timedelta
+from itertools import accumulate, chain, compress
+from operator import ne
+from statistics import median
+
+from cs.platform.web import JsonAPI
+from cs.platform.web.root import Internal
+
+from . import sqlquery
+from .hr_machining_skills import MachiningSkillsData
+from .instrumentation import add_rows, instrumented, phase
+from .ttlcache import TTLCache
+
+
+HISTORY_TABLE = "kln_hr_skill_level_history"
+
+BUCKETS = ("day", "week", "month")
+DEFAULT_PERIOD_DAYS = 365
+MAX_PERIOD_DAYS = 3 * 366
+DEFAULT_WINDOW = 4
+# Required level when an employee/skill has no hr_machining_skills row
+DEFAULT_REQUIRED_LEVEL = 3
+
+TRENDS_TTL = 10 * 60
+trends_cache = TTLCache(maxsize=128, ttl=TRENDS_TTL)
+
+CREATE_STATEMENTS = (
+    f"CREATE INDEX {HISTORY_TABLE}_at ON {HISTORY_TABLE} (updated_at)",
+)
+
+_HISTORY_SQL = f"""
+    SELECT employee_id, skill_name, previous_level, new_level, updated_at
+    FROM {HISTORY_TABLE}
+    WHERE updated_at < ?
+      AND employee_id IN (SELECT person_name FROM hr_machining_skills
+                          WHERE plantt_code = ?)
+"""
+
+
+class SkillTrendsAPI(JsonAPI):
+    pass
+
+
+@Internal.mount(app=SkillTrendsAPI, path="hr_skill_trends")
+def _mount_app():
+    return SkillTrendsAPI()
+
+
+def create_history_index():
+    for ddl in CREATE_STATEMENTS:
+        sqlquery.execute(ddl)
+
+
+def _as_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(str(value).strip()[:10], "%Y-%m-%d").date()
+
+
+def _level(value):
+    if value is None or value == "":
+        return None
+    return int(value)
+
+
+def history_version():
+    """Cheap version of the history table (rows, latest update)"""
+    rs = sqlquery.select(
+        f"SELECT COUNT(*) AS cnt, MAX(updated_at) AS latest FROM {HISTORY_TABLE}"
+    )
+    row = rs[0]
+    return int(row["cnt"] or 0), str(row["latest"] or "")
+
+
+class BucketAxis:
+    """Maps day ordinals of a period onto bucket positions"""
+
+    def __init__(self, date_from, date_to, bucket):
+        if bucket not in BUCKETS:
+            raise ValueError(f"bucket must be one of {', '.join(BUCKETS)}")
+        self.date_from = date_from
+        self.date_to = date_to
+        self.bucket = bucket
+        self.first = date_from.toordinal()
+        if bucket == "week":
+            self.first -= date_from.weekday()
+        self.size = self.index(date_to.toordinal()) + 1
+
+    def index(self, ordinal):
+        """Bucket of a day ordinal; days before the period map to bucket 0"""
+        if ordinal < self.first:
+            return 0
+        if self.bucket == "day":
+            return ordinal - self.first
+        if self.bucket == "week":
+            return (ordinal - self.first) // 7
+        day = date.fromordinal(ordinal)
+        return (day.year - self.date_from.year) * 12 + day.month - self.date_from.month
+
+    def keys(self):
+        if self.bucket == "month":
+            year, month = self.date_from.year, self.date_from.month
+            keys = []
+            for _ in range(self.size):
+                keys.append(f"{year}-{month:02d}")
+                year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+            return keys
+        step = 7 if self.bucket == "week" else 1
+        return [
+            date.fromordinal(self.first + i * step).isoformat()
+            for i in range(self.size)
+        ]
+
+
+class History:
+    """Level changes of one plant as columns sorted by (series, day).
+
+    A series is one employee × skill. Series attributes (employee, skill,
+    line, department, required level) are kept in parallel lists.
+    """
+
+    def __init__(self):
+        self.series = array("i")
+        self.day = array("i")
+        self.previous = array("i")
+        self.level = array("i")
+        self.employees = []
+        self.skills = []
+        self.lines = []
+        self.departments = []
+        self.required = []
+
+    def __len__(self):
+        return len(self.series)
+
+    @classmethod
+    def load(cls, plantt_code, date_to):
+        history = cls()
+        plantt_code = int(plantt_code)
+
+        # Line, department and required level per employee × skill
+        people = {}
+        required = {}
+        for row in MachiningSkillsData().get_skills_data({"plantt_code": plantt_code}):
+            person = row["person_name"]
+            people.setdefault(person, (row["liness"], row["department"]))
+            if row["skill_required"] is not None:
+                required.setdefault(
+                    (person, row["machining_skills_names"]), int(row["skill_required"])
+                )
+
+        series_of = {}
+        events = []
+        rs = sqlquery.select(
+            _HISTORY_SQL, [(date_to + timedelta(days=1)).isoformat(), plantt_code]
+        )
+        for row in rs:
+            level = _level(row["new_level"])
+            if level is None or row["updated_at"] is None:
+                continue
+            try:
+                ordinal = _as_date(row["updated_at"]).toordinal()
+            except ValueError:
+                continue
+            key = (row["employee_id"], row["skill_name"])
+            series = series_of.get(key)
+            if series is None:
+                series = series_of[key] = len(history.employees)
+                line, department = people.get(key[0], (None, None))
+                history.employees.append(key[0])
+                history.skills.append(key[1])
+                history.lines.append(line)
+                history.departments.append(department)
+                history.required.append(required.get(key, DEFAULT_REQUIRED_LEVEL))
+            previous = _level(row["previous_level"])
+            events.append((series, ordinal, -1 if previous is None else previous, level))
+        add_rows(len(rs))
+
+        events.sort()
+        if events:
+            series, day, previous, level = zip(*events)
+            history.series = array("i", series)
+            history.day = array("i", day)
+            history.previous = array("i", previous)
+            history.level = array("i", level)
+        return history
+
+    # 🔹 Average level per bucket for groups of series
+
+    def changes(self, axis):
+        """Columns per change: bucket, level delta in its series, first of its series"""
+        buckets = array("i", map(axis.index, self.day))
+        # Rows are sorted by series, so a series starts where the id changes
+        first = array("b", map(ne, self.series, chain((-1,), self.series)))
+        deltas = array("i", map(
+            lambda level, before, new: level if new else level - before,
+            self.level, chain((0,), self.level), first,
+        ))
+        return buckets, deltas, first
+
+    def level_trends(self, axis, groups_of):
+        """``{group: (avg_level, series)}`` per bucket for ``groups_of(series)``.
+
+        ``groups_of`` returns a tuple of the same length for every series,
+        one group per grouping (plant, line, ...). Each change adds
+        ``new - old`` to its bucket (and a series to the bucket of its
+        first change). Prefix sums over the buckets then give the summed
+        levels and series counts, carried forward.
+        """
+        size = axis.size
+        buckets, deltas, first = self.changes(axis)
+        memberships = [groups_of(s) for s in range(len(self.employees))]
+        trends = {}
+        for grouping in range(len(memberships[0]) if memberships else 0):
+            ids = {}
+            offset_of = array("i", (
+                ids.setdefault(groups[grouping], len(ids)) * size for groups in memberships
+            ))
+            sums = [0] * (len(ids) * size)
+            counts = [0] * (len(ids) * size)
+            slots = map(lambda series, bucket: offset_of[series] + bucket,
+                        self.series, buckets)
+            for slot, delta, new in zip(slots, deltas, first):
+                sums[slot] += delta
+                counts[slot] += new
+            for group, index in ids.items():
+                lo = index * size
+                totals = list(accumulate(counts[lo:lo + size]))
+                averages = [
+                    level / count if count else None
+                    for level, count in zip(accumulate(sums[lo:lo + size]), totals)
+                ]
+                trends[group] = (averages, totals)
+        return trends
+
+    # 🔹 Days from the first recorded level to the required level
+
+    def time_to_competence(self, axis):
+        first_day = {}
+        reached = {}
+        pending = set()
+        start = axis.date_from.toordinal()
+        for i in range(len(self.series)):
+            series = self.series[i]
+            if series in reached:
+                continue
+            if series not in first_day:
+                if self.previous[i] >= self.required[series]:
+                    # Already competent before the first recorded change
+                    reached[series] = None
+                    continue
+                first_day[series] = self.day[i]
+            if self.level[i] >= self.required[series]:
+                reached[series] = self.day[i] - first_day[series]
+                pending.discard(series)
+                if self.day[i] < start:
+                    reached[series] = None
+            else:
+                pending.add(series)
+
+        per_skill = {}
+        for series, days in reached.items():
+            if days is not None:
+                per_skill.setdefault(self.skills[series], ([], [0]))[0].append(days)
+        for series in pending:
+            per_skill.setdefault(self.skills[series], ([], [0]))[1][0] += 1
+        return [
+            {
+                "skill_name": skill,
+                "reached": len(days),
+                "pending": waiting[0],
+                "median_days": median(days) if days else None,
+                "mean_days": round(sum(days) / len(days), 1) if days else None,
+            }
+            for skill, (days, waiting) in sorted(per_skill.items(), key=lambda i: str(i[0]))
+        ]
+
+    def trajectory(self, employee_id, axis):
+        """Level changes of one employee within the period, per skill"""
+        start = axis.date_from.toordinal()
+        own = {s for s, employee in enumerate(self.employees) if employee == employee_id}
+        wanted = map(lambda series, day: series in own and day >= start,
+                     self.series, self.day)
+        points = {}
+        for series, day, previous, level in compress(
+                zip(self.series, self.day, self.previous, self.level), wanted):
+            points.setdefault(self.skills[series], []).append({
+                "date": date.fromordinal(day).isoformat(),
+                "previous_level": None if previous < 0 else previous,
+                "level": level,
+            })
+        return points
+
+
+def moving_average(values, window):
+    """Trailing mean over ``window`` buckets (None buckets are skipped)"""
+    prefix = [0.0]
+    filled = [0]
+    for value in values:
+        prefix.append(prefix[-1] + (value or 0.0))
+        filled.append(filled[-1] + (value is not None))
+    result = []
+    for i in range(1, len(prefix)):
+        lo = max(0, i - window)
+        n = filled[i] - filled[lo]
+        result.append(round((prefix[i] - prefix[lo]) / n, 3) if n else None)
+    return result
+
+
+def _trend(averages, totals, window):
+    return {
+        "avg_level": [None if a is None else round(a, 3) for a in averages],
+        "moving_avg": moving_average(averages, window),
+        "series": totals,
+    }
+
+
+def load_history(plantt_code, date_to, version):
+    key = ("history", int(plantt_code), date_to, version)
+    return trends_cache.get_or_load(key, lambda: History.load(plantt_code, date_to))
+
+
+def skill_trends(plantt_code, date_from, date_to, bucket="week", window=DEFAULT_WINDOW):
+    """Trends of a plant over a period (cached per plant and period)"""
+    version = history_version()
+    key = ("trends", int(plantt_code), date_from, date_to, bucket, window, version)
+
+    def compute():
+        axis = BucketAxis(date_from, date_to, bucket)
+        with phase("query"):
+            history = load_history(plantt_code, date_to, version)
+        with phase("aggregate"):
+            trends = history.level_trends(axis, lambda s: (
+                ("plant", None),
+                ("line", history.lines[s]),
+                ("department", history.departments[s]),
+                ("skill", history.skills[s]),
+            ))
+            result = {
+                "plantt_code": int(plantt_code),
+                "date_from": date_from.isoformat(),
+                "date_to": date_to.isoformat(),
+                "bucket": bucket,
+                "window": window,
+                "buckets": axis.keys(),
+                "events": len(history),
+                "plant": None,
+                "lines": {},
+                "departments": {},
+                "skills": {},
+                "time_to_competence": history.time_to_competence(axis),
+            }
+            for (kind, name), (averages, totals) in trends.items():
+                trend = _trend(averages, totals, window)
+                if kind == "plant":
+                    result["plant"] = trend
+                else:
+                    result[kind + "s"][str(name)] = trend
+        return result
+
+    return trends_cache.get_or_load(key, compute)
+
+
+def employee_trajectory(plantt_code, employee_id, date_from, date_to):
+    axis = BucketAxis(date_from, date_to, "day")
+    history = load_history(plantt_code, date_to, history_version())
+    return history.trajectory(employee_id, axis)
+
+
+class SkillTrendsData:
+    def get_trends(self, plantt_code, date_from, date_to, bucket, window,
+                   employee_id=None):
+        result = skill_trends(plantt_code, date_from, date_to, bucket, window)
+        if employee_id:
+            result = dict(result, employee={
+                "employee_id": employee_id,
+                "skills": employee_trajectory(plantt_code, employee_id, date_from, date_to),
+            })
+        return result
+
+
+# 🔗 Path Mapping
+@SkillTrendsAPI.path(model=SkillTrendsData, path="")
+def _path():
+    return SkillTrendsData()
+
+
+# 🔹 GET → ?plantt_code=&date_from=&date_to=&bucket=&window=&employee_id=
+@SkillTrendsAPI.json(model=SkillTrendsData, request_method="GET")
+@instrumented("hr_skill_trends.GET")
+def _get_json(model, request):
+    plantt_code = request.params.get('plantt_code')
+    if not plantt_code:
+        return {"status": "error", "message": "plantt_code is required"}
+    try:
+        date_to = _as_date(request.params.get('date_to') or date.today())
+        date_from = _as_date(
+            request.params.get('date_from')
+            or date_to - timedelta(days=DEFAULT_PERIOD_DAYS)
+        )
+        if date_to < date_from or (date_to - date_from).days > MAX_PERIOD_DAYS:
+            raise ValueError(f"period must be 0..{MAX_PERIOD_DAYS} days")
+        window = max(1, int(request.params.get('window') or DEFAULT_WINDOW))
+        return model.get_trends(
+            int(plantt_code), date_from, date_to,
+            request.params.get('bucket') or "week", window,
+            employee_id=request.params.get('employee_id'),
+        )
+    except ValueError as e:
+        return {"status": "error", "message": f"Invalid trends request: {e}"}
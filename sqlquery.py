@@ -0,0 +1,112 @@
+"""Bind-parameter SQL for the internal JsonAPI handlers.
+
+Handlers describe their filters once as ``(filter_key, fragment, convert)``
+specs. For a given set of active filters the statement text is always the
+same (and built only once), and the values go in as ``?`` bind parameters.
+The database can then reuse one cached plan per filter combination instead
+of parsing a new literal statement on every call.
+"""
+
+from functools import lru_cache
+
+from cdb import sqlapi
+
+
+def _as_int(value):
+    return int(value)
+
+
+# (filter key, SQL fragment, value conversion)
+SKILL_FILTERS = (
+    ("skill_type", "f_c_g = ?", None),
+    ("department", "department = ?", None),
+    ("liness", "liness = ?", None),
+    ("plantt_code", "plantt_code = ?", _as_int),
+)
+
+# Extra conditions for rows the grid never shows (empty / "None" names)
+VALID_SKILL_ROWS = (
+    ("person_name IS NOT NULL", None),
+    ("person_name NOT IN ('', 'None')", None),
+    ("machining_skills_names IS NOT NULL", None),
+    ("machining_skills_names NOT IN ('', 'None')", None),
+)
+
+TRAINING_FILTERS = (
+    ("skill_id", "skill_id = ?", _as_int),
+    # Indexed lookup in the link table kept by schedule_employees
+    ("employee_id",
+     "cdb_object_id IN (SELECT schedule_id FROM hr_training_schedule_employee"
+     " WHERE employee_id = ?)", str),
+    ("date_from", "training_date >= ?", None),
+    ("date_to", "training_date <= ?", None),
+)
+
+# Appended to an ORDER BY; the row count is a bind parameter too
+FETCH_FIRST = " OFFSET 0 ROWS FETCH NEXT ? ROWS ONLY"
+
+
+@lru_cache(maxsize=256)
+def _where_clause(fragments):
+    return " AND ".join(("1=1",) + fragments)
+
+
+def where(spec, filters, extra=()):
+    """Return ``(clause, params)`` for the active ``filters`` of ``spec``.
+
+    ``extra`` is a sequence of fixed ``(fragment, value)`` pairs (value may
+    be ``None`` for fragments without a placeholder) appended after the
+    filters.
+    """
+    fragments = []
+    params = []
+    for key, fragment, convert in spec:
+        value = filters.get(key)
+        if value is None or value == "":
+            continue
+        fragments.append(fragment)
+        params.append(convert(value) if convert else value)
+    for fragment, value in extra:
+        fragments.append(fragment)
+        if value is not None:
+            params.append(value)
+    return _where_clause(tuple(fragments)), params
+
+
+def placeholders(values):
+    """Return ``(markers, params)`` for an ``IN (...)`` list.
+
+    The list is padded to the next power of two (repeating the last value)
+    so that varying list lengths map onto a handful of statement texts.
+    """
+    values = list(values)
+    size = 1
+    while size < len(values):
+        size *= 2
+    if values:
+        values += [values[-1]] * (size - len(values))
+    return ", ".join("?" * len(values)), values
+
+
+@lru_cache(maxsize=512)
+def statement(template, *parts):
+    """Format and memoize a statement text from ``template`` and ``parts``"""
+    return template.format(*parts)
+
+
+def select(sql, params=()):
+    """Run a SELECT with bind parameters and return the RecordSet2"""
+    return sqlapi.RecordSet2(sql=sql, params=list(params))
+
+
+def execute(sql, params=()):
+    """Run a DML statement with bind parameters, return affected rows"""
+    return sqlapi.SQL(sql, list(params))
+
+
+def cache_info():
+    """Statement-text cache statistics (for diagnostics)"""
+    return {
+        "where": _where_clause.cache_info()._asdict(),
+        "statements": statement.cache_info()._asdict(),
+    }
@@ -0,0 +1,320 @@
+"""Substitute finder: who can cover a line's critical skills.
+
+For each skill of a plant, :class:`Competency` keeps a bitset of people
+per level (bit *p* set ⇔ person *p* has ``actual >= level``). It is
+derived from the plant's :mod:`matrix_index` and rebuilt only after the
+index changes. "Who covers all of these skills at level ≥ n" is then an
+AND over a handful of ints. The endpoint needs the index and answers
+with an error under ``SKILL_MATRIX_INDEX=0``.
+
+``POST /internal/hr_staffing`` with ``{"plantt_code", "liness",
+"absent": [...]}`` returns ranked substitutes for the absent operators'
+critical skills on that line. With no one absent it covers all of the
+line's critical skills. The response also lists skills nobody available
+covers and a small greedy team that covers as much as possible.
+Optional keys: ``skills`` (explicit list), ``skill_type`` (default
+``"C"``), ``level`` (minimum level instead of the position's
+``skill_required``), ``exclude`` (people who are busy elsewhere) and
+``limit``.
+"""
+
+from cs.platform.web import JsonAPI
+from cs.platform.web.root import Internal
+
+from . import matrix_index
+from .instrumentation import add_rows, instrumented, phase
+from .matrix_index import NULL_LEVEL, members, popcount
+from .ttlcache import TTLCache
+
+
+SUBSTITUTES_DEFAULT = 10
+SUBSTITUTES_MAX = 100
+DEFAULT_SKILL_TYPE = "C"
+
+competency_cache = TTLCache(maxsize=32, ttl=30 * 60)
+
+
+class StaffingAPI(JsonAPI):
+    pass
+
+
+@Internal.mount(app=StaffingAPI, path="hr_staffing")
+def _mount_app():
+    return StaffingAPI()
+
+
+class Competency:
+    """Per-skill, per-level people bitsets of one plant index"""
+
+    def __init__(self, index):
+        self.index = index
+        self.levels = {}         # skill id → [bitset for level 0, 1, 2, ...]
+        self.actual = {}         # (skill id, person id) → best actual level
+        self.line_people = {}    # line id → bitset of people on that line
+        self.everyone = 0
+
+        best = self.actual
+        line_members = {}
+        for slot in members(index.alive.as_int()):
+            person = index.person[slot]
+            skill = index.skill[slot]
+            level = index.actual[slot]
+            level = 0 if level == NULL_LEVEL else level
+            key = (skill, person)
+            if best.get(key, -1) < level:
+                best[key] = level
+            line_members.setdefault(index.line[slot], set()).add(person)
+
+        # Bucket people per skill and level, then accumulate downwards so
+        # levels[s][n] holds everyone at n or above
+        buckets = {}
+        for (skill, person), level in best.items():
+            buckets.setdefault(skill, {}).setdefault(level, []).append(person)
+        for skill, by_level in buckets.items():
+            top = max(by_level)
+            levels = [0] * (top + 1)
+            running = 0
+            for level in range(top, -1, -1):
+                for person in by_level.get(level, ()):
+                    running |= 1 << person
+                levels[level] = running
+            self.levels[skill] = levels
+        for line, people in line_members.items():
+            bits = 0
+            for person in people:
+                bits |= 1 << person
+            self.line_people[line] = bits
+            self.everyone |= bits
+
+    def at_level(self, skill, level):
+        """People with ``actual >= level`` in ``skill``"""
+        levels = self.levels.get(skill)
+        if not levels:
+            return 0
+        if level <= 0:
+            return levels[0]
+        return levels[level] if level < len(levels) else 0
+
+
+def competency(index):
+    """Competency of the plant's index, rebuilt when the index has changed"""
+    with index.lock:
+        stamp = (index.built_at, index.generation)
+        cached = competency_cache.get(index.plantt_code)
+        if cached is None or cached[0] != stamp:
+            # One entry per plant: older generations are replaced, not kept
+            cached = (stamp, Competency(index))
+            competency_cache.set(index.plantt_code, cached)
+        return cached[1]
+
+
+def coverage_counter(bitsets):
+    """Bit-sliced per-person count of the bitsets each person is in
+
+    ``planes[i]`` holds bit *i* of every person's count, so adding a
+    bitset is a ripple-carry over a few ints instead of a loop over people.
+    """
+    planes = []
+    for carry in bitsets:
+        for i, plane in enumerate(planes):
+            planes[i], carry = plane ^ carry, plane & carry
+            if not carry:
+                break
+        if carry:
+            planes.append(carry)
+    return planes
+
+
+def top_covering(bitsets, limit):
+    """People in the most ``bitsets``, whole count groups until ``limit`` is reached"""
+    planes = coverage_counter(bitsets)
+    within = 0
+    for plane in planes:
+        within |= plane
+    chosen = 0
+    found = 0
+    for count in range((1 << len(planes)) - 1, 0, -1):
+        group = within
+        for i, plane in enumerate(planes):
+            group &= plane if count >> i & 1 else ~plane
+            if not group:
+                break
+        if group:
+            chosen |= group
+            found += popcount(group)
+            if found >= limit:
+                break
+    return chosen
+
+
+def _people_ids(index, names):
+    ids = index.people.ids
+    return [ids[name] for name in names or () if name in ids]
+
+
+def _bits(person_ids):
+    bits = 0
+    for person in person_ids:
+        bits |= 1 << person
+    return bits
+
+
+class StaffingData:
+    """Ranked substitutes for the critical skills of a line"""
+
+    def find_substitutes(self, data):
+        plantt_code = data.get("plantt_code")
+        liness = data.get("liness")
+        if not plantt_code or not liness:
+            return {"status": "error", "message": "plantt_code and liness are required"}
+        limit = max(1, min(int(data.get("limit") or SUBSTITUTES_DEFAULT), SUBSTITUTES_MAX))
+        min_level = data.get("level")
+        min_level = int(min_level) if min_level not in (None, "") else None
+        skill_type = data.get("skill_type", DEFAULT_SKILL_TYPE)
+
+        index = matrix_index.for_plant(plantt_code)
+        if index is None:
+            return {"status": "error",
+                    "message": "Staffing needs the matrix index, which is disabled (SKILL_MATRIX_INDEX=0)"}
+        with phase("index"):
+            comp = competency(index)
+
+        with index.lock, phase("match"):
+            line_id = index.lines.ids.get(liness)
+            absent = _people_ids(index, data.get("absent"))
+            absent_bits = _bits(absent)
+            unavailable = absent_bits | _bits(_people_ids(index, data.get("exclude")))
+
+            # 1️⃣ Positions to cover: skill → required level
+            required = self._positions(index, line_id, absent_bits, skill_type,
+                                       data.get("skills"))
+            if min_level is not None:
+                required = {skill: min_level for skill in required}
+            if not required:
+                return {"status": "success", "liness": liness, "skills": [],
+                        "substitutes": [], "uncovered": [], "team": []}
+
+            # 2️⃣ One bitset per position, available people only
+            available = comp.everyone & ~unavailable
+            coverers = {
+                skill: comp.at_level(skill, level) & available
+                for skill, level in required.items()
+            }
+            covered_by_all = available
+            for bits in coverers.values():
+                covered_by_all &= bits
+            uncovered = [s for s, bits in coverers.items() if not bits]
+
+            # 3️⃣ Rank only the best-covering groups, not every candidate
+            on_line = comp.line_people.get(line_id, 0)
+            shortlist = []
+            for person in members(top_covering(coverers.values(), limit)):
+                bit = 1 << person
+                covers = [s for s, bits in coverers.items() if bits & bit]
+                surplus = sum(
+                    comp.actual.get((s, person), 0) - required[s] for s in covers
+                )
+                shortlist.append((
+                    -len(covers), not (on_line & bit), -surplus,
+                    index.people.values[person], person, covers,
+                ))
+            shortlist.sort(key=lambda r: r[:4])
+
+            skill_names = index.skills.values
+            substitutes = [
+                {
+                    "person_name": name,
+                    "covers_all": bool(covered_by_all & (1 << person)),
+                    "covered": len(covers),
+                    "same_line": not other_line,
+                    "surplus_levels": -neg_surplus,
+                    "missing": [skill_names[s] for s in required if s not in covers],
+                }
+                for _, other_line, neg_surplus, name, person, covers in shortlist[:limit]
+            ]
+            team = self._greedy_team(coverers, on_line, index)
+
+        add_rows(len(shortlist))
+        return {
+            "status": "success",
+            "liness": liness,
+            "absent": [index.people.values[p] for p in absent],
+            "skills": [
+                {"name": skill_names[s], "level": level,
+                 "available": popcount(coverers[s])}
+                for s, level in required.items()
+            ],
+            "full_cover": popcount(covered_by_all),
+            "substitutes": substitutes,
+            "uncovered": [skill_names[s] for s in uncovered],
+            "team": team,
+        }
+
+    @staticmethod
+    def _positions(index, line_id, absent_bits, skill_type, skills):
+        """Skills to cover with their level: explicit, absentees', or the line's
+
+        Explicit ``skills`` take the line's highest ``skill_required``
+        (1 where the line has no such position).
+        """
+        if skills:
+            ids = index.skills.ids
+            wanted = {ids[name] for name in skills if name in ids}
+            line_levels = StaffingData._positions(index, line_id, 0, None, None)
+            return {skill: line_levels.get(skill, 1) for skill in wanted}
+        if line_id is None:
+            return {}
+        mask = index.by_line[line_id].as_int()
+        if skill_type:
+            type_id = index.types.ids.get(skill_type)
+            if type_id is None:
+                return {}
+            mask &= index.by_type[type_id].as_int()
+        required = {}
+        for slot in members(mask):
+            if absent_bits and not absent_bits >> index.person[slot] & 1:
+                continue
+            level = index.required[slot]
+            level = 1 if level == NULL_LEVEL else level
+            skill = index.skill[slot]
+            if required.get(skill, -1) < level:
+                required[skill] = level
+        return required
+
+    @staticmethod
+    def _greedy_team(coverers, on_line, index):
+        """Few people who together cover as many positions as possible
+
+        Each round picks whoever covers the most still-open positions,
+        preferring people from the line, then by name.
+        """
+        remaining = {s: bits for s, bits in coverers.items() if bits}
+        names = index.people.values
+        team = []
+        while remaining:
+            best = members(top_covering(remaining.values(), 1))
+            person = min(best, key=lambda p: (not on_line >> p & 1, names[p]))
+            covers = [s for s, bits in remaining.items() if bits >> person & 1]
+            team.append({
+                "person_name": names[person],
+                "covers": [index.skills.values[s] for s in covers],
+            })
+            for skill in covers:
+                del remaining[skill]
+        return team
+
+
+# 🔗 Path Mapping
+@StaffingAPI.path(model=StaffingData, path="")
+def _path():
+    return StaffingData()
+
+
+# 🔹 POST → {"plantt_code", "liness", "absent": [...], "skills"?, "level"?}
+@StaffingAPI.json(model=StaffingData, request_method="POST")
+@instrumented("hr_staffing.POST")
+def _post_json(model, request):
+    try:
+        return model.find_substitutes(request.json or {})
+    except (TypeError, ValueError) as e:
+        return {"status": "error", "message": f"Invalid staffing request: {e}"}
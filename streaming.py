@@ -0,0 +1,118 @@
+"""Chunked JSON / NDJSON responses for the internal GET handlers.
+
+Rows are read from the database in keyset pages of ``STREAM_CHUNK_ROWS``
+and written to the client as they are encoded, so a response never holds
+more than one page of rows in memory.
+"""
+
+import json
+from datetime import datetime, date
+
+from webob import Response
+
+from . import sqlquery
+
+
+# Rows fetched per query and written per body chunk
+STREAM_CHUNK_ROWS = 1000
+
+NDJSON_CONTENT_TYPE = "application/x-ndjson"
+
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+_encode = json.JSONEncoder(
+    default=_default, ensure_ascii=False, separators=(",", ":")
+).encode
+
+
+def iter_keyset(columns, table, where="1=1", params=(),
+                chunk_size=STREAM_CHUNK_ROWS):
+    """Yield rows of ``table`` as dicts, one keyset page at a time.
+
+    Pages are ordered by ``cdb_object_id``, so the result order is stable
+    but not the handlers' usual sort order.
+    """
+    select = ", ".join(columns)
+    first_sql = sqlquery.statement(
+        "SELECT {0} FROM {1} WHERE {2} ORDER BY cdb_object_id"
+        + sqlquery.FETCH_FIRST,
+        select, table, where,
+    )
+    next_sql = sqlquery.statement(
+        "SELECT {0} FROM {1} WHERE {2} AND cdb_object_id > ?"
+        " ORDER BY cdb_object_id" + sqlquery.FETCH_FIRST,
+        select, table, where,
+    )
+    params = list(params)
+    last_id = None
+    while True:
+        if last_id is None:
+            rs = sqlquery.select(first_sql, params + [chunk_size])
+        else:
+            rs = sqlquery.select(next_sql, params + [last_id, chunk_size])
+        count = 0
+        for row in rs:
+            count += 1
+            last_id = row["cdb_object_id"]
+            yield {c: row[c] for c in columns}
+        if count < chunk_size:
+            return
+
+
+def iter_json_array(rows, transform=None, chunk_size=STREAM_CHUNK_ROWS):
+    """Encode ``rows`` as a JSON array, yielding ~``chunk_size`` rows per chunk"""
+    buf = ["["]
+    first = True
+    for row in rows:
+        if transform is not None:
+            row = transform(row)
+        if first:
+            first = False
+        else:
+            buf.append(",")
+        buf.append(_encode(row))
+        if len(buf) >= 2 * chunk_size:
+            yield "".join(buf).encode("utf-8")
+            buf = []
+    buf.append("]")
+    yield "".join(buf).encode("utf-8")
+
+
+def iter_ndjson(rows, transform=None, chunk_size=STREAM_CHUNK_ROWS):
+    """Encode ``rows`` as newline-delimited JSON, one object per line"""
+    buf = []
+    for row in rows:
+        if transform is not None:
+            row = transform(row)
+        buf.append(_encode(row))
+        buf.append("\n")
+        if len(buf) >= 2 * chunk_size:
+            yield "".join(buf).encode("utf-8")
+            buf = []
+    if buf:
+        yield "".join(buf).encode("utf-8")
+
+
+def stream_response(rows, ndjson=False, transform=None):
+    """Build a streaming response for ``rows`` (JSON array or NDJSON)"""
+    if ndjson:
+        body = iter_ndjson(rows, transform)
+        content_type = NDJSON_CONTENT_TYPE
+    else:
+        body = iter_json_array(rows, transform)
+        content_type = "application/json"
+    return Response(
+        app_iter=body, content_type=content_type, charset="utf-8"
+    )
+
+
+def wants_stream(request):
+    """Return (stream, ndjson) flags for ``?stream=1`` / ``?format=ndjson``"""
+    ndjson = request.params.get("format") == "ndjson"
+    stream = ndjson or request.params.get("stream") in ("1", "true")
+    return stream, ndjson
@@ -0,0 +1,206 @@
+"""Whole-test authoring: one document in, hr_tests + hr_questions + hr_options out.
+
+``POST /internal/hr_test_authoring`` takes the test header with its
+questions and options (the shape TestCreation.jsx already builds) and
+writes everything in one transaction using multi-row inserts.
+
+Question and option ids are deterministic and namespaced by test:
+``<test_id>_q<client id or n>`` and ``<question_id>_opt_<n>``, so two tests
+whose editors both number their questions from 1 never share rows. A
+re-submission of the same ``test_id`` replaces the earlier rows instead
+of adding to them, so retries never duplicate questions.
+"""
+
+from cs.platform.web import JsonAPI
+from cs.platform.web.root import Internal
+from cdb import transaction
+
+from . import sqlquery
+from .bulk import bulk_insert
+from .conditional import bump
+from .instrumentation import add_rows, instrumented, log
+
+
+TEST_COLUMNS = (
+    "test_id", "skill_id", "skill_name", "title", "description",
+    "difficulty", "level", "duration", "passing_marks", "total_marks",
+    "question_count", "status", "created_by", "created_at",
+)
+
+QUESTION_COLUMNS = (
+    "question_id", "test_id", "question_type", "question_text", "marks",
+    "explanation", "allow_multiple",
+)
+
+OPTION_COLUMNS = (
+    "option_id", "question_id", "option_label", "option_text", "is_correct",
+)
+
+
+class TestAuthoringAPI(JsonAPI):
+    pass
+
+
+@Internal.mount(app=TestAuthoringAPI, path="hr_test_authoring")
+def _mount_app():
+    return TestAuthoringAPI()
+
+
+def _first(obj, *keys, default=None):
+    """First present key; accepts both snake_case and the UI's camelCase"""
+    for key in keys:
+        if obj.get(key) is not None:
+            return obj[key]
+    return default
+
+
+def _option_rows(question_id, question):
+    correct = question.get("correctAnswers") or question.get("correct_answers") or []
+    rows = []
+    for index, option in enumerate(question.get("options") or []):
+        if isinstance(option, dict):
+            text = _first(option, "option_text", "text")
+            is_correct = bool(_first(option, "is_correct", "isCorrect", default=False))
+            label = _first(option, "option_label", "label")
+        else:
+            text = option
+            is_correct = option in correct
+            label = None
+        rows.append((
+            f"{question_id}_opt_{index}",
+            question_id,
+            label or chr(65 + index),
+            text,
+            1 if is_correct else 0,
+        ))
+    return rows
+
+
+def _question_id(test_id, question, index):
+    """``<test_id>_q<id>``; ids returned by an earlier save are kept as is"""
+    prefix = f"{test_id}_q"
+    client_id = str(_first(question, "question_id", "id", default=index + 1))
+    return client_id if client_id.startswith(prefix) else prefix + client_id
+
+
+def build_rows(doc):
+    """Split a test document into header, question and option rows"""
+    test_id = str(_first(doc, "test_id", "id"))
+    questions = doc.get("questions") or []
+
+    question_rows = []
+    option_rows = []
+    for index, question in enumerate(questions):
+        question_id = _question_id(test_id, question, index)
+        question_rows.append((
+            question_id,
+            test_id,
+            _first(question, "question_type", "type", default="mcq"),
+            _first(question, "question_text", "question"),
+            _first(question, "marks", default=1),
+            question.get("explanation"),
+            1 if _first(question, "allow_multiple", "allowMultiple") else 0,
+        ))
+        option_rows.extend(_option_rows(question_id, question))
+
+    total_marks = _first(doc, "total_marks", "totalMarks",
+                         default=sum(row[4] or 0 for row in question_rows))
+    test_row = (
+        test_id,
+        _first(doc, "skill_id", "skillId"),
+        _first(doc, "skill_name", "skillName"),
+        doc.get("title"),
+        doc.get("description"),
+        doc.get("difficulty"),
+        doc.get("level"),
+        doc.get("duration"),
+        _first(doc, "passing_marks", "passingMarks"),
+        total_marks,
+        len(question_rows),
+        doc.get("status", "active"),
+        _first(doc, "created_by", "createdBy", default="Admin"),
+        _first(doc, "created_at", "createdAt"),
+    )
+    return test_row, question_rows, option_rows
+
+
+def _delete_test(test_id):
+    """Remove an earlier submission of ``test_id``; returns True if one existed
+
+    Options are removed only for questions no other test uses, so rows
+    written before ids were namespaced are left to their own test.
+    """
+    existed = sqlquery.execute("DELETE FROM hr_tests WHERE test_id = ?", [test_id])
+    sqlquery.execute(
+        "DELETE FROM hr_options WHERE question_id IN"
+        " (SELECT question_id FROM hr_questions WHERE test_id = ?)"
+        " AND question_id NOT IN"
+        " (SELECT question_id FROM hr_questions"
+        "  WHERE test_id <> ? AND question_id IS NOT NULL)",
+        [test_id, test_id],
+    )
+    sqlquery.execute("DELETE FROM hr_questions WHERE test_id = ?", [test_id])
+    return bool(existed)
+
+
+class TestAuthoringData:
+    """Saves a complete test document in one transaction"""
+
+    # 🔹 POST → {test header..., questions: [{..., options: [...]}]}
+    def save_test(self, doc):
+        if not isinstance(doc, dict) or not _first(doc, "test_id", "id"):
+            return {"status": "error", "message": "test_id is required"}
+        if not doc.get("questions"):
+            return {"status": "error", "message": "At least one question is required"}
+
+        test_row, question_rows, option_rows = build_rows(doc)
+        test_id = test_row[0]
+        add_rows(1 + len(question_rows) + len(option_rows))
+
+        try:
+            with transaction.Transaction():
+                replaced = _delete_test(test_id)
+                for table, columns, rows in (
+                        ("hr_tests", TEST_COLUMNS, [test_row]),
+                        ("hr_questions", QUESTION_COLUMNS, question_rows),
+                        ("hr_options", OPTION_COLUMNS, option_rows)):
+                    if not rows:
+                        continue
+                    written = bulk_insert(table, columns, rows)
+                    if written["status"] != "success":
+                        raise RuntimeError(written["message"])
+                bump("hr_tests")
+        except Exception as e:
+            log.exception("Error saving test %s", test_id)
+            return {"status": "error", "message": f"Failed to save test: {e}"}
+
+        option_ids = {}
+        for option in option_rows:
+            option_ids.setdefault(option[1], []).append(option[0])
+        return {
+            "status": "success",
+            "test_id": test_id,
+            "replaced": replaced,
+            "questions": [
+                {"question_id": q[0], "option_ids": option_ids.get(q[0], [])}
+                for q in question_rows
+            ],
+        }
+
+
+# 🔗 Path Mapping
+@TestAuthoringAPI.path(model=TestAuthoringData, path="")
+def _path():
+    return TestAuthoringData()
+
+
+@TestAuthoringAPI.json(model=TestAuthoringData, request_method="POST")
+@instrumented("hr_test_authoring.POST")
+def _post_json(model, request):
+    return model.save_test(request.json)
+
+
+@TestAuthoringAPI.json(model=TestAuthoringData, request_method="PUT")
+@instrumented("hr_test_authoring.PUT")
+def _put_json(model, request):
+    return model.save_test(request.json)
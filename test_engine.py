@@ -0,0 +1,280 @@
+"""Server-side test delivery and grading for hr_tests / hr_questions / hr_options.
+
+``GET /internal/hr_test_engine?test_id=`` returns the question paper
+without the ``is_correct`` flags. ``POST`` grades a whole submission in
+one pass and writes the ``hr_test_attempts`` row and all
+``hr_user_answers`` rows in one transaction.
+
+A test's question/option graph is loaded with a single join and cached
+per test and authoring version. hr_options has no test_id, so options
+of a question_id that another test also uses are left out rather than
+mixed into this test's answer key; the authoring endpoint namespaces
+ids so that only older rows can collide. The version is the ``hr_tests`` stamp
+from :mod:`conditional`, which the authoring endpoint increases.
+"""
+
+import json
+from datetime import datetime
+
+from cs.platform.web import JsonAPI
+from cs.platform.web.root import Internal
+from cdb import cdbuuid, transaction
+
+from . import sqlquery
+from .bulk import bulk_insert
+from .conditional import table_stamp
+from .instrumentation import add_rows, instrumented, log, phase
+from .ttlcache import TTLCache
+
+
+# Graphs are also dropped after this long, for edits made elsewhere
+TEST_GRAPH_TTL = 10 * 60
+test_graph_cache = TTLCache(maxsize=256, ttl=TEST_GRAPH_TTL)
+
+_TRUE_VALUES = ("1", "true", "y", "yes")
+
+_GRAPH_SQL = """
+    SELECT
+        t.test_id, t.title, t.description, t.duration, t.passing_marks,
+        t.total_marks, t.skill_id, t.skill_name, t.level,
+        q.question_id, q.question_type, q.question_text, q.marks,
+        q.explanation, q.allow_multiple,
+        o.option_id, o.option_label, o.option_text, o.is_correct
+    FROM hr_tests t
+    LEFT OUTER JOIN hr_questions q ON q.test_id = t.test_id
+    LEFT OUTER JOIN hr_options o ON o.question_id = q.question_id
+        AND NOT EXISTS (
+            SELECT 1 FROM hr_questions other
+            WHERE other.question_id = q.question_id AND other.test_id <> t.test_id
+        )
+    WHERE t.test_id = ?
+    ORDER BY q.question_id, o.option_label
+"""
+
+ANSWER_COLUMNS = (
+    "attempt_id",
+    "question_id",
+    "selected_options",
+    "is_correct",
+    "marks_awarded",
+)
+
+
+class TestEngineAPI(JsonAPI):
+    pass
+
+
+@Internal.mount(app=TestEngineAPI, path="hr_test_engine")
+def _mount_app():
+    return TestEngineAPI()
+
+
+def _is_true(value):
+    if isinstance(value, str):
+        return value.strip().lower() in _TRUE_VALUES
+    return bool(value)
+
+
+def _number(value, default=0):
+    try:
+        return float(value) if value is not None else default
+    except (TypeError, ValueError):
+        return default
+
+
+def load_test_graph(test_id):
+    """Return the test header with its questions and options (cached)"""
+    key = (str(test_id), table_stamp("hr_tests"))
+    return test_graph_cache.get_or_load(key, lambda: _load_graph(test_id))
+
+
+def _load_graph(test_id):
+    test = None
+    questions = {}
+    for row in sqlquery.select(_GRAPH_SQL, [test_id]):
+        if test is None:
+            test = {
+                "test_id": row["test_id"],
+                "title": row["title"],
+                "description": row["description"],
+                "duration": row["duration"],
+                "passing_marks": _number(row["passing_marks"]),
+                "total_marks": row["total_marks"],
+                "skill_id": row["skill_id"],
+                "skill_name": row["skill_name"],
+                "level": row["level"],
+                "questions": [],
+            }
+        if row["question_id"] is None:
+            continue        # test without questions: empty paper
+        question = questions.get(row["question_id"])
+        if question is None:
+            question = questions[row["question_id"]] = {
+                "question_id": row["question_id"],
+                "question_type": row["question_type"],
+                "question_text": row["question_text"],
+                "marks": _number(row["marks"], 1),
+                "explanation": row["explanation"],
+                "allow_multiple": _is_true(row["allow_multiple"]),
+                "options": [],
+            }
+            test["questions"].append(question)
+        if row["option_id"] is not None:
+            question["options"].append({
+                "option_id": row["option_id"],
+                "option_label": row["option_label"],
+                "option_text": row["option_text"],
+                "is_correct": _is_true(row["is_correct"]),
+            })
+    return test
+
+
+def _paper(test):
+    """The graph without the answer key, for delivery to the client"""
+    paper = {k: v for k, v in test.items() if k != "questions"}
+    paper["questions"] = [
+        {
+            **{k: v for k, v in q.items() if k not in ("options", "explanation")},
+            "options": [
+                {k: v for k, v in o.items() if k != "is_correct"}
+                for o in q["options"]
+            ],
+        }
+        for q in test["questions"]
+    ]
+    return paper
+
+
+def _selected_ids(question, answer):
+    """Map an answer (option id, label, text, or a list of them) to option ids"""
+    if answer is None or answer == "":
+        return set()
+    answers = answer if isinstance(answer, (list, tuple)) else [answer]
+    selected = set()
+    for value in answers:
+        value = str(value)
+        for option in question["options"]:
+            if value in (str(option["option_id"]), option["option_label"],
+                         option["option_text"]):
+                selected.add(option["option_id"])
+                break
+    return selected
+
+
+def grade(test, answers):
+    """Grade ``answers`` ({question_id: answer}) against the test graph"""
+    answers = {str(k): v for k, v in (answers or {}).items()}
+    results = []
+    total_marks = earned_marks = 0.0
+    correct_count = answered = 0
+    for question in test["questions"]:
+        answer = answers.get(str(question["question_id"]))
+        selected = _selected_ids(question, answer)
+        correct = {o["option_id"] for o in question["options"] if o["is_correct"]}
+        is_correct = bool(selected) and selected == correct
+        marks = question["marks"]
+        total_marks += marks
+        if selected:
+            answered += 1
+        if is_correct:
+            correct_count += 1
+            earned_marks += marks
+        results.append({
+            "question_id": question["question_id"],
+            "selected_options": sorted(selected, key=str),
+            "correct_options": sorted(correct, key=str),
+            "is_correct": is_correct,
+            "marks": marks,
+            "marks_awarded": marks if is_correct else 0,
+            "explanation": question["explanation"],
+        })
+    percentage = round(100.0 * earned_marks / total_marks, 2) if total_marks else 0.0
+    return {
+        "total_questions": len(test["questions"]),
+        "answered_questions": answered,
+        "correct_answers": correct_count,
+        "total_marks": total_marks,
+        "earned_marks": earned_marks,
+        "percentage": percentage,
+        "passed": percentage >= test["passing_marks"],
+        "results": results,
+    }
+
+
+class TestEngineData:
+    """Delivers test papers and grades submissions"""
+
+    # 🔹 GET → Question paper without correct answers
+    def get_paper(self, test_id):
+        if not test_id:
+            return {"status": "error", "message": "test_id is required"}
+        test = load_test_graph(test_id)
+        if test is None:
+            return {"status": "error", "message": f"Test {test_id} not found"}
+        return _paper(test)
+
+    # 🔹 POST → Grade one submission and store attempt + answers
+    def submit(self, data):
+        test_id = data.get("test_id")
+        user_id = data.get("user_id")
+        if not test_id or not user_id:
+            return {"status": "error", "message": "test_id and user_id are required"}
+
+        test = load_test_graph(test_id)
+        if test is None:
+            return {"status": "error", "message": f"Test {test_id} not found"}
+
+        with phase("grade"):
+            graded = grade(test, data.get("answers"))
+        add_rows(graded["total_questions"])
+
+        attempt_id = cdbuuid.create_uuid()
+        answer_rows = [
+            (attempt_id, r["question_id"], json.dumps(r["selected_options"]),
+             1 if r["is_correct"] else 0, r["marks_awarded"])
+            for r in graded["results"]
+        ]
+        try:
+            with phase("write"), transaction.Transaction():
+                sqlquery.execute(
+                    """
+                    INSERT INTO hr_test_attempts
+                        (cdb_object_id, attempt_id, test_id, user_id,
+                         assignment_id, total_marks, earned_marks, percentage,
+                         passed, time_taken, submitted_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    [attempt_id, attempt_id, test_id, str(user_id),
+                     data.get("assignment_id"), graded["total_marks"],
+                     graded["earned_marks"], graded["percentage"],
+                     1 if graded["passed"] else 0, data.get("time_taken"),
+                     datetime.now()],
+                )
+                written = bulk_insert("hr_user_answers", ANSWER_COLUMNS, answer_rows)
+                if written["status"] != "success":
+                    raise RuntimeError(written["message"])
+        except Exception as e:
+            log.exception("Error storing attempt for test %s", test_id)
+            return {"status": "error", "message": f"Failed to store attempt: {e}"}
+
+        return {"status": "success", "attempt_id": attempt_id, **graded}
+
+
+# 🔗 Path Mapping
+@TestEngineAPI.path(model=TestEngineData, path="")
+def _path():
+    return TestEngineData()
+
+
+# 🔹 GET → ?test_id=
+@TestEngineAPI.json(model=TestEngineData, request_method="GET")
+@instrumented("hr_test_engine.GET")
+def _get_json(model, request):
+    return model.get_paper(request.params.get('test_id'))
+
+
+# 🔹 POST → {test_id, user_id, assignment_id, answers: {question_id: answer}, time_taken}
+@TestEngineAPI.json(model=TestEngineData, request_method="POST")
+@instrumented("hr_test_engine.POST")
+def _post_json(model, request):
+    return model.submit(request.json)
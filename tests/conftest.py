@@ -0,0 +1,49 @@
+"""Run the package on the SQLite stand-ins from ``benchmarks/standin.py``."""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                "benchmarks"))
+
+import bench_skill_matrix  # noqa: E402  (installs the stand-ins and loads the package)
+import standin  # noqa: E402
+
+
+TEST_SCHEMA = (
+    """
+    CREATE TABLE hr_tests (
+        cdb_object_id VARCHAR(40) PRIMARY KEY, test_id VARCHAR(60),
+        skill_id VARCHAR(60), skill_name VARCHAR(200), title VARCHAR(200),
+        description TEXT, difficulty VARCHAR(20), level VARCHAR(20),
+        duration INTEGER, passing_marks REAL, total_marks REAL,
+        question_count INTEGER, status VARCHAR(20), created_by VARCHAR(100),
+        created_at VARCHAR(40)
+    )
+    """,
+    """
+    CREATE TABLE hr_questions (
+        cdb_object_id VARCHAR(40) PRIMARY KEY, question_id VARCHAR(100),
+        test_id VARCHAR(60), question_type VARCHAR(20), question_text TEXT,
+        marks REAL, explanation TEXT, allow_multiple INTEGER
+    )
+    """,
+    """
+    CREATE TABLE hr_options (
+        cdb_object_id VARCHAR(40) PRIMARY KEY, option_id VARCHAR(120),
+        question_id VARCHAR(100), option_label VARCHAR(5), option_text TEXT,
+        is_correct INTEGER
+    )
+    """,
+)
+
+
+@pytest.fixture(scope="session", autouse=True)
+def schema():
+    bench_skill_matrix.build_schema()
+    conn = standin.connection()
+    for ddl in TEST_SCHEMA:
+        conn.execute(ddl)
+    return conn
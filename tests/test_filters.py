@@ -0,0 +1,28 @@
+import pytest
+import standin
+
+from skill_matrix import hr_training_schedule, master_data, skill_analytics
+from skill_matrix.hr_training_schedule import TrainingScheduleData
+
+
+@pytest.mark.parametrize("params", [
+    {"view": "calendar", "plantt_code": "abc"},
+    {"skill_id": "abc"},
+    {"view": "calendar", "skill_id": "abc"},
+])
+def test_non_numeric_training_filters_answer_with_an_error(params):
+    result = hr_training_schedule._get_json(TrainingScheduleData(), standin.Request(params))
+    assert result["status"] == "error"
+    assert result["message"].startswith("Invalid filter:")
+
+
+def test_non_numeric_plant_answers_skill_analytics_with_an_error():
+    result = skill_analytics._get_json(skill_analytics.SkillAnalyticsData(),
+                                       standin.Request({"plantt_code": "abc"}))
+    assert result["status"] == "error"
+
+
+def test_non_numeric_plant_answers_master_data_with_an_error():
+    result = master_data._get_json(master_data.MasterDataHandler(),
+                                   standin.Request({"plant_code": "abc"}))
+    assert result == {"status": "error", "message": "Invalid plant_code: abc"}
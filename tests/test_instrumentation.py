@@ -0,0 +1,37 @@
+import standin
+
+from skill_matrix import instrumentation
+
+
+def _served(endpoint, response):
+    """Run an instrumented view and its after-callbacks like the framework"""
+    request = standin.Request()
+    request.content_length = 7
+    result = instrumentation.instrumented(endpoint)(lambda model, request: response)(
+        None, request)
+    for callback in request.after_callbacks:
+        callback(result)
+    return result
+
+
+def _metrics(endpoint):
+    return instrumentation.snapshot().get(endpoint)
+
+
+def test_rendered_body_size_is_the_payload():
+    _served("test.rendered", standin._Response(body=b'{"status": "success"}'))
+    metrics = _metrics("test.rendered")["metrics"]
+    assert metrics["payload_bytes"]["max"] == 21
+    assert metrics["request_bytes"]["max"] == 7
+
+
+def test_streamed_body_is_recorded_when_iteration_ends():
+    response = _served("test.streamed", standin._Response(
+        app_iter=(chunk for chunk in (b"[1,", b"2]"))))
+    assert _metrics("test.streamed") is None
+    assert b"".join(response.app_iter) == b"[1,2]"
+    metrics = _metrics("test.streamed")
+    assert metrics["count"] == 1
+    assert metrics["metrics"]["payload_bytes"]["max"] == 5
+    response.app_iter.close()
+    assert _metrics("test.streamed")["count"] == 1
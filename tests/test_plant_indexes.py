@@ -0,0 +1,57 @@
+import threading
+import time
+
+from skill_matrix.plant_indexes import PlantIndexes
+
+
+class _Index:
+    def __init__(self, plantt_code):
+        self.plantt_code = plantt_code
+        self.built_at = time.monotonic()
+        self.synced = 0
+
+    def sync(self):
+        self.synced += 1
+
+
+def test_concurrent_first_requests_load_a_plant_once():
+    loads = []
+    started = threading.Event()
+
+    def build(plantt_code):
+        loads.append(plantt_code)
+        started.set()
+        time.sleep(0.05)
+        return _Index(plantt_code)
+
+    plants = PlantIndexes(build, max_age=60)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(plants.get("2021")))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert loads == [2021]
+    assert len({id(index) for index in results}) == 1
+
+
+def test_stale_index_is_served_while_another_thread_rebuilds():
+    rebuilding = threading.Event()
+    release = threading.Event()
+
+    def build(plantt_code):
+        if plants.loaded():
+            rebuilding.set()
+            release.wait(5)
+        return _Index(plantt_code)
+
+    plants = PlantIndexes(build, max_age=0)
+    old = plants.get(2021)
+    rebuild = threading.Thread(target=plants.get, args=(2021,))
+    rebuild.start()
+    assert rebuilding.wait(5)
+    assert plants.get(2021) is old
+    release.set()
+    rebuild.join()
+    assert plants.loaded()[0] is not old
@@ -0,0 +1,13 @@
+from skill_matrix import plant_rollup
+
+
+def test_cache_hits_keep_the_slice_compute_time(schema):
+    schema.execute(
+        "INSERT INTO hr_machining_skills (cdb_object_id, machining_skills_names,"
+        " f_c_g, department, person_name, skill_required, actual, liness, plantt_code)"
+        " VALUES ('r-rollup', 'Drilling', 'C', 'Ops', 'Ann', 3, 2, 'L1', 3031)"
+    )
+    first = plant_rollup._slice(3031, (), 5)
+    computed_at = plant_rollup.last_good_cache.get((3031, (), 5))[1]
+    assert plant_rollup._slice(3031, (), 5) is first
+    assert plant_rollup.last_good_cache.get((3031, (), 5))[1] == computed_at
@@ -0,0 +1,21 @@
+import time
+
+from skill_matrix import matrix_index, skill_export
+
+
+def test_finished_export_survives_an_index_rebuild(schema, tmp_path, monkeypatch):
+    monkeypatch.setattr(skill_export, "EXPORT_DIR", str(tmp_path))
+    schema.execute(
+        "INSERT INTO hr_machining_skills (cdb_object_id, machining_skills_names,"
+        " f_c_g, department, person_name, skill_required, actual, liness, plantt_code)"
+        " VALUES ('export-1', 'Milling', 'C', 'Ops', 'Asha', 3, 3, 'L1', 6061)"
+    )
+    job = skill_export.submit({"plantt_code": 6061})
+    deadline = time.monotonic() + 5
+    while skill_export.get_job(job["id"])["status"] not in ("done", "error"):
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    assert skill_export.get_job(job["id"])["status"] == "done"
+
+    matrix_index.invalidate(6061)
+    assert skill_export.submit({"plantt_code": 6061})["id"] == job["id"]
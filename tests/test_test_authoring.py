@@ -0,0 +1,63 @@
+from skill_matrix.test_authoring import TestAuthoringData
+from skill_matrix.test_engine import TestEngineData
+
+
+def _doc(test_id, texts):
+    return {
+        "test_id": test_id,
+        "title": test_id,
+        "questions": [
+            {"id": 1, "question": texts[0], "options": ["A0", "A1"], "correctAnswers": ["A1"]},
+            {"id": 2, "question": texts[1], "options": ["B0", "B1"], "correctAnswers": ["B0"]},
+        ],
+    }
+
+
+def test_tests_sharing_question_ids_keep_their_own_rows():
+    authoring = TestAuthoringData()
+    first = authoring.save_test(_doc("T1", ["t1 q1", "t1 q2"]))
+    second = authoring.save_test(_doc("T2", ["t2 q1", "t2 q2"]))
+    assert first["status"] == second["status"] == "success"
+    assert [q["question_id"] for q in first["questions"]] == ["T1_q1", "T1_q2"]
+    assert first["questions"][0]["option_ids"] == ["T1_q1_opt_0", "T1_q1_opt_1"]
+
+    # Re-saving T2 must not touch T1's options
+    assert authoring.save_test(_doc("T2", ["t2 q1", "t2 q2"]))["replaced"] is True
+
+    engine = TestEngineData()
+    for test_id in ("T1", "T2"):
+        paper = engine.get_paper(test_id)
+        assert [q["question_text"] for q in paper["questions"]] == [
+            f"{test_id.lower()} q1", f"{test_id.lower()} q2"]
+        assert [len(q["options"]) for q in paper["questions"]] == [2, 2]
+
+
+def test_resubmitted_ids_are_not_prefixed_twice():
+    authoring = TestAuthoringData()
+    doc = _doc("T3", ["q1", "q2"])
+    saved = authoring.save_test(doc)
+    for question, returned in zip(doc["questions"], saved["questions"]):
+        question["id"] = returned["question_id"]
+    again = authoring.save_test(doc)
+    assert [q["question_id"] for q in again["questions"]] == ["T3_q1", "T3_q2"]
+
+
+def test_test_without_questions_is_an_empty_paper(schema):
+    schema.execute("INSERT INTO hr_tests (cdb_object_id, test_id, title, passing_marks)"
+                   " VALUES ('t-empty', 'T4', 'empty', 50)")
+    paper = TestEngineData().get_paper("T4")
+    assert paper["test_id"] == "T4"
+    assert paper["questions"] == []
+
+
+def test_options_of_a_question_id_shared_with_another_test_are_not_mixed_in(schema):
+    for test_id in ("T5", "T6"):
+        schema.execute("INSERT INTO hr_tests (cdb_object_id, test_id, passing_marks)"
+                       " VALUES (?, ?, 50)", (f"t-{test_id}", test_id))
+        schema.execute("INSERT INTO hr_questions (cdb_object_id, question_id, test_id, marks)"
+                       " VALUES (?, 'legacy_q1', ?, 1)", (f"q-{test_id}", test_id))
+    schema.execute("INSERT INTO hr_options (cdb_object_id, option_id, question_id,"
+                   " option_label, is_correct) VALUES ('o-1', 'o1', 'legacy_q1', 'A', 1)")
+    for test_id in ("T5", "T6"):
+        paper = TestEngineData().get_paper(test_id)
+        assert [q["options"] for q in paper["questions"]] == [[]]
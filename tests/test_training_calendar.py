@@ -0,0 +1,10 @@
+from skill_matrix import skill_changes, training_calendar
+
+
+def test_calendar_reads_the_version_once_per_request(monkeypatch):
+    calls = []
+    real = skill_changes.fingerprint
+    monkeypatch.setattr(skill_changes, "fingerprint",
+                        lambda plantt_code: calls.append(plantt_code) or real(plantt_code))
+    training_calendar.calendar("2031-01-01", "2031-06-30", plantt_code=5051)
+    assert calls == [5051]
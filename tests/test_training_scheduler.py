@@ -0,0 +1,40 @@
+import pytest
+
+from skill_matrix.training_scheduler import TrainingSchedulerData
+
+
+@pytest.fixture(scope="module", autouse=True)
+def gap_rows(schema):
+    for n, skill in enumerate(("Boring", "Honing")):
+        schema.execute(
+            "INSERT INTO hr_machining_skills (cdb_object_id, machining_skills_names,"
+            " f_c_g, department, person_name, skill_required, actual, liness, plantt_code)"
+            " VALUES (?, ?, 'C', 'Ops', 'Ravi', 3, 1, 'L1', 4041)", (f"sched-{n}", skill)
+        )
+
+
+def _plan(**data):
+    return TrainingSchedulerData().plan(dict(
+        plantt_code=4041, trainers=["T"], date_from="2030-01-07",
+        date_to="2030-01-07", **data,
+    ))
+
+
+def test_unresolved_people_are_reported_and_kept_apart_by_name():
+    plan = _plan()
+    assert plan["unresolved"] == ["Ravi"]
+    first, second = plan["sessions"]
+    assert first["employee_ids"] == second["employee_ids"] == [None]
+    assert first["training_time"] != second["training_time"]
+
+
+def test_resolved_people_are_checked_against_existing_bookings(schema):
+    schema.execute(
+        "INSERT INTO hr_training_schedule (cdb_object_id, training_date, training_time,"
+        " duration_hours, trainer_name, employee_ids)"
+        " VALUES ('busy', '2030-01-07', '09:00', 4, 'Other', '[\"E7\"]')"
+    )
+    plan = _plan(employee_ids={"Ravi": "E7"})
+    assert plan["unresolved"] == []
+    assert [s["training_time"] for s in plan["sessions"]] == ["13:00", "15:00"]
+    assert plan["sessions"][0]["employee_ids"] == ["E7"]
@@ -0,0 +1,200 @@
+"""Calendar view of hr_training_schedule: day/week/month buckets.
+
+Schedules are read one calendar month at a time with an indexed range
+predicate on ``training_date``. Each month is cached as a compact rollup,
+keyed by plant, the table stamp from :mod:`conditional` and, with a
+plant, that plant's skill_changes fingerprint. Any write through the
+schedule or skill handlers therefore invalidates it. Buckets, counts and trainer
+load for any window are then assembled from the cached months.
+
+hr_training_schedule has no plant column. A plant's schedules are those
+whose ``skill_name`` appears in that plant's hr_machining_skills.
+"""
+
+from datetime import date, datetime, timedelta
+
+from . import skill_changes
+from . import sqlquery
+from .conditional import table_stamp
+from .instrumentation import add_rows, phase
+from .ttlcache import TTLCache
+
+
+BUCKETS = ("day", "week", "month")
+
+# Calendar windows longer than this are refused
+MAX_WINDOW_DAYS = 366
+
+MONTH_ROLLUP_TTL = 30 * 60
+month_rollup_cache = TTLCache(maxsize=512, ttl=MONTH_ROLLUP_TTL)
+
+CREATE_STATEMENTS = (
+    "CREATE INDEX hr_training_schedule_date"
+    " ON hr_training_schedule (training_date)",
+)
+
+_MONTH_SQL = """
+    SELECT cdb_object_id, training_id, skill_name, skill_type,
+           training_date, training_time, duration_hours, trainer_name,
+           employee_names
+    FROM hr_training_schedule
+    WHERE training_date >= ? AND training_date < ?
+"""
+
+_PLANT_FILTER = (
+    " AND skill_name IN (SELECT machining_skills_names"
+    " FROM hr_machining_skills WHERE plantt_code = ?)"
+)
+
+
+def create_date_index():
+    for ddl in CREATE_STATEMENTS:
+        sqlquery.execute(ddl)
+
+
+def _as_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(str(value).strip()[:10], "%Y-%m-%d").date()
+
+
+def _month_start(day):
+    return day.replace(day=1)
+
+
+def _next_month(day):
+    return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def _employee_count(employee_names):
+    # JSON list text; counting commas avoids parsing every row
+    text = (employee_names or "").strip()
+    if text in ("", "[]"):
+        return 0
+    return text.count(",") + 1
+
+
+def _load_month(month, plantt_code):
+    sql = _MONTH_SQL + (_PLANT_FILTER if plantt_code else "")
+    params = [month.isoformat(), _next_month(month).isoformat()]
+    if plantt_code:
+        params.append(int(plantt_code))
+    sessions = []
+    rs = sqlquery.select(sql, params)
+    for row in rs:
+        try:
+            day = _as_date(row["training_date"])
+        except ValueError:
+            continue
+        sessions.append({
+            "cdb_object_id": row["cdb_object_id"],
+            "training_id": row["training_id"],
+            "skill_name": row["skill_name"],
+            "skill_type": row["skill_type"],
+            "training_date": day,
+            "training_time": row["training_time"],
+            "duration_hours": float(row["duration_hours"] or 0),
+            "trainer_name": row["trainer_name"],
+            "employee_count": _employee_count(row["employee_names"]),
+        })
+    add_rows(len(rs))
+    sessions.sort(key=lambda s: (s["training_date"], str(s["training_time"] or "")))
+    return sessions
+
+
+def default_window(date_from=None, date_to=None, today=None):
+    """``(date_from, date_to)`` ISO strings; missing ends → the current month"""
+    today = today or date.today()
+    date_from = date_from or _month_start(today).isoformat()
+    date_to = date_to or (_next_month(today) - timedelta(days=1)).isoformat()
+    return date_from, date_to
+
+
+def version(plantt_code=None):
+    """What the calendar data depends on, for ETags and month rollups"""
+    stamp = table_stamp("hr_training_schedule")
+    if plantt_code:
+        return stamp, skill_changes.fingerprint(plantt_code)
+    return stamp, None
+
+
+def month_rollup(month, plantt_code=None, data_version=None):
+    """Sessions of one calendar month (cached until the tables change)
+
+    ``data_version`` is :func:`version` of ``plantt_code``; pass it when
+    reading several months so it is computed once.
+    """
+    if data_version is None:
+        data_version = version(plantt_code)
+    key = (month, plantt_code, data_version)
+    return month_rollup_cache.get_or_load(key, lambda: _load_month(month, plantt_code))
+
+
+def _bucket_of(day, bucket):
+    if bucket == "day":
+        return day.isoformat(), day
+    if bucket == "week":
+        year, week, _ = day.isocalendar()
+        return f"{year}-W{week:02d}", day - timedelta(days=day.weekday())
+    return day.strftime("%Y-%m"), _month_start(day)
+
+
+def calendar(date_from, date_to, bucket="month", plantt_code=None,
+             with_sessions=True):
+    """Schedules between ``date_from`` and ``date_to`` grouped per bucket"""
+    if bucket not in BUCKETS:
+        raise ValueError(f"bucket must be one of {', '.join(BUCKETS)}")
+    date_from = _as_date(date_from)
+    date_to = _as_date(date_to)
+    if date_to < date_from or (date_to - date_from).days > MAX_WINDOW_DAYS:
+        raise ValueError(f"date window must be 0..{MAX_WINDOW_DAYS} days")
+
+    buckets = {}
+    with phase("query"):
+        data_version = version(plantt_code)
+        month = _month_start(date_from)
+        months = []
+        while month <= date_to:
+            months.append(month_rollup(month, plantt_code, data_version))
+            month = _next_month(month)
+
+    with phase("serialize"):
+        for sessions in months:
+            for session in sessions:
+                day = session["training_date"]
+                if day < date_from or day > date_to:
+                    continue
+                key, start = _bucket_of(day, bucket)
+                entry = buckets.get(key)
+                if entry is None:
+                    entry = buckets[key] = {
+                        "key": key,
+                        "start": start.isoformat(),
+                        "count": 0,
+                        "hours": 0.0,
+                        "employees": 0,
+                        "trainer_load": {},
+                        "sessions": [],
+                    }
+                entry["count"] += 1
+                entry["hours"] += session["duration_hours"]
+                entry["employees"] += session["employee_count"]
+                trainer = session["trainer_name"] or "Unassigned"
+                entry["trainer_load"][trainer] = (
+                    entry["trainer_load"].get(trainer, 0.0) + session["duration_hours"]
+                )
+                if with_sessions:
+                    entry["sessions"].append(
+                        {**session, "training_date": day.isoformat()}
+                    )
+
+    return {
+        "view": "calendar",
+        "bucket": bucket,
+        "date_from": date_from.isoformat(),
+        "date_to": date_to.isoformat(),
+        "plantt_code": plantt_code,
+        "buckets": [buckets[key] for key in sorted(buckets)],
+    }
@@ -0,0 +1,350 @@
+"""Conflict detection and batch auto-scheduling for training sessions.
+
+Existing bookings are loaded once per request into one
+:class:`IntervalIndex` per trainer and per employee. Overlapping
+bookings are merged into disjoint busy intervals, so checking a
+candidate slot is a single bisect per person (O(log n)).
+
+``POST /internal/hr_training_scheduler`` with ``{"sessions": [...]}``
+reports conflicts for proposed sessions. With ``{"gaps": [...]}`` (or
+``{"plantt_code": ...}`` to derive gaps from hr_machining_skills) it plans
+a conflict-free batch of sessions. ``"commit": true`` then saves the batch
+through :meth:`TrainingScheduleData.create_training_schedule_bulk`.
+
+hr_machining_skills only knows people by name. Derived gaps carry no
+employee id unless the request maps names to ids (``"employee_ids":
+{person_name: id}``). People without an id are kept apart within the
+batch by name, but cannot be checked against existing bookings; the
+plan lists them under ``"unresolved"`` and saves a null id for them.
+"""
+
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, timedelta
+
+from cs.platform.web import JsonAPI
+from cs.platform.web.root import Internal
+
+from . import sqlquery
+from .hr_training_schedule import TrainingScheduleData
+from .instrumentation import add_rows, instrumented, phase
+from .schedule_employees import normalize_ids
+
+
+DAY_START = "09:00"
+DAY_END = "17:00"
+DEFAULT_DURATION_HOURS = 2
+DEFAULT_GROUP_SIZE = 10
+DEFAULT_HORIZON_DAYS = 90
+# Candidate start times are tried in these steps within a day
+SLOT_STEP_MINUTES = 30
+# Sunday is the weekly off
+OFF_WEEKDAYS = (6,)
+
+
+class TrainingSchedulerAPI(JsonAPI):
+    pass
+
+
+@Internal.mount(app=TrainingSchedulerAPI, path="hr_training_scheduler")
+def _mount_app():
+    return TrainingSchedulerAPI()
+
+
+class IntervalIndex:
+    """Disjoint, sorted busy intervals of one trainer or employee"""
+
+    __slots__ = ("starts", "ends")
+
+    def __init__(self):
+        self.starts = []
+        self.ends = []
+
+    def conflicts(self, start, end):
+        """True if [start, end) overlaps a busy interval"""
+        i = bisect_left(self.starts, end) - 1
+        return i >= 0 and self.ends[i] > start
+
+    def add(self, start, end):
+        """Mark [start, end) busy, merging with overlapping intervals"""
+        lo = bisect_left(self.starts, start)
+        if lo > 0 and self.ends[lo - 1] >= start:
+            lo -= 1
+        hi = bisect_right(self.starts, end)
+        if lo < hi:
+            start = min(start, self.starts[lo])
+            end = max(end, max(self.ends[lo:hi]))
+        self.starts[lo:hi] = [start]
+        self.ends[lo:hi] = [end]
+
+    def __len__(self):
+        return len(self.starts)
+
+
+def _parse_date(value):
+    """Accept date/datetime objects, YYYY-MM-DD and the UI's DD/MM/YYYY"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    value = str(value).strip()[:10]
+    if "/" in value:
+        return datetime.strptime(value, "%d/%m/%Y").date()
+    return datetime.strptime(value, "%Y-%m-%d").date()
+
+
+def _parse_time(value, default=DAY_START):
+    value = str(value or default).strip()[:5]
+    return datetime.strptime(value, "%H:%M").time()
+
+
+def session_interval(training_date, training_time, duration_hours):
+    start = datetime.combine(_parse_date(training_date), _parse_time(training_time))
+    hours = float(duration_hours or DEFAULT_DURATION_HOURS)
+    return start, start + timedelta(hours=hours)
+
+
+class Calendar:
+    """Busy intervals of all trainers and employees in a date window"""
+
+    def __init__(self):
+        self.trainers = {}
+        self.employees = {}
+
+    def _index(self, kind, key):
+        indexes = self.trainers if kind == "trainer" else self.employees
+        index = indexes.get(key)
+        if index is None:
+            index = indexes[key] = IntervalIndex()
+        return index
+
+    def book(self, start, end, trainer=None, employees=()):
+        if trainer:
+            self._index("trainer", trainer).add(start, end)
+        for employee in employees:
+            self._index("employee", employee).add(start, end)
+
+    def conflicts(self, start, end, trainer=None, employees=()):
+        found = []
+        if trainer and trainer in self.trainers \
+                and self.trainers[trainer].conflicts(start, end):
+            found.append({"type": "trainer", "id": trainer})
+        for employee in employees:
+            index = self.employees.get(employee)
+            if index is not None and index.conflicts(start, end):
+                found.append({"type": "employee", "id": employee})
+        return found
+
+    @classmethod
+    def load(cls, date_from, date_to):
+        """Calendar of the schedules between ``date_from`` and ``date_to``"""
+        calendar = cls()
+        rs = sqlquery.select(
+            "SELECT training_date, training_time, duration_hours,"
+            " trainer_name, employee_ids FROM hr_training_schedule"
+            " WHERE training_date >= ? AND training_date <= ?",
+            [date_from.isoformat(), date_to.isoformat()],
+        )
+        for row in rs:
+            try:
+                start, end = session_interval(
+                    row["training_date"], row["training_time"], row["duration_hours"]
+                )
+            except (TypeError, ValueError):
+                continue
+            calendar.book(start, end, row["trainer_name"],
+                          normalize_ids(row["employee_ids"]))
+        add_rows(len(rs))
+        return calendar
+
+
+def gaps_from_skills(plantt_code, skill_type=None, liness=None):
+    """Employees below the required level, grouped per skill"""
+    where, params = sqlquery.where(
+        sqlquery.SKILL_FILTERS,
+        {"plantt_code": plantt_code, "skill_type": skill_type, "liness": liness},
+        sqlquery.VALID_SKILL_ROWS + (("COALESCE(actual, 0) < skill_required", None),),
+    )
+    sql = sqlquery.statement(
+        "SELECT machining_skills_names, f_c_g, person_name"
+        " FROM hr_machining_skills WHERE {0}"
+        " ORDER BY machining_skills_names, person_name",
+        where,
+    )
+    gaps = {}
+    for row in sqlquery.select(sql, params):
+        gap = gaps.setdefault(row["machining_skills_names"], {
+            "skill_name": row["machining_skills_names"],
+            "skill_type": row["f_c_g"],
+            "employees": [],
+        })
+        gap["employees"].append({"id": None, "name": row["person_name"]})
+    return list(gaps.values())
+
+
+def _attendee(employee, employee_ids):
+    """``{"id", "name"}`` of a gap entry, the id resolved by name if missing"""
+    if not isinstance(employee, dict):
+        return {"id": employee, "name": employee}
+    if employee.get("id") in (None, ""):
+        return dict(employee, id=employee_ids.get(employee.get("name")))
+    return employee
+
+
+def _calendar_keys(group):
+    # People without an employee id are only known by name: keyed apart so
+    # they never match an id from an existing booking
+    return [str(e["id"]) if e["id"] not in (None, "") else ("name", e.get("name"))
+            for e in group]
+
+
+def _gap_priority(gap):
+    # Critical skills first, then the largest groups
+    return ({"C": 0, "F": 1}.get(gap.get("skill_type"), 2), -len(gap.get("employees") or []))
+
+
+class TrainingSchedulerData:
+    """Conflict checks and batch planning on top of TrainingScheduleData"""
+
+    # 🔹 Conflicts of proposed sessions (UI payload shape)
+    def check_sessions(self, sessions):
+        starts = []
+        for session in sessions:
+            starts.append(session_interval(
+                session.get("training_date"), session.get("training_time"),
+                session.get("duration_hours"),
+            ))
+        if not starts:
+            return {"status": "success", "sessions": []}
+        calendar = Calendar.load(
+            min(s for s, _ in starts).date(), max(e for _, e in starts).date()
+        )
+
+        results = []
+        for session, (start, end) in zip(sessions, starts):
+            employees = normalize_ids(session.get("employee_ids", []))
+            trainer = session.get("trainer_name")
+            conflicts = calendar.conflicts(start, end, trainer, employees)
+            results.append({"training_id": session.get("training_id"),
+                            "conflicts": conflicts})
+            # Sessions in the same batch must not clash with each other either
+            calendar.book(start, end, trainer, employees)
+        has_conflicts = any(r["conflicts"] for r in results)
+        return {"status": "conflict" if has_conflicts else "success",
+                "sessions": results}
+
+    # 🔹 Conflict-free batch for a set of skill gaps
+    def plan(self, data):
+        trainers = data.get("trainers") or []
+        if not trainers:
+            return {"status": "error", "message": "At least one trainer is required"}
+
+        gaps = data.get("gaps")
+        if gaps is None:
+            if not data.get("plantt_code"):
+                return {"status": "error", "message": "gaps or plantt_code is required"}
+            with phase("gaps"):
+                gaps = gaps_from_skills(
+                    data["plantt_code"], data.get("skill_type"), data.get("liness")
+                )
+
+        date_from = _parse_date(data.get("date_from") or date.today() + timedelta(days=1))
+        date_to = _parse_date(
+            data.get("date_to") or date_from + timedelta(days=DEFAULT_HORIZON_DAYS)
+        )
+        duration = float(data.get("duration_hours") or DEFAULT_DURATION_HOURS)
+        group_size = int(data.get("group_size") or DEFAULT_GROUP_SIZE)
+        day_start = _parse_time(data.get("day_start"), DAY_START)
+        day_end = _parse_time(data.get("day_end"), DAY_END)
+
+        with phase("load"):
+            calendar = Calendar.load(date_from, date_to)
+
+        employee_ids = data.get("employee_ids") or {}
+        sessions = []
+        unscheduled = []
+        unresolved = set()
+        with phase("plan"):
+            for gap in sorted(gaps, key=_gap_priority):
+                employees = [_attendee(e, employee_ids) for e in gap.get("employees") or []]
+                unresolved.update(e.get("name") for e in employees
+                                  if e["id"] in (None, ""))
+                for offset in range(0, len(employees), group_size):
+                    group = employees[offset:offset + group_size]
+                    keys = _calendar_keys(group)
+                    slot = self._first_free_slot(
+                        calendar, trainers, keys,
+                        date_from, date_to, day_start, day_end, duration,
+                    )
+                    if slot is None:
+                        unscheduled.append({"skill_name": gap.get("skill_name"),
+                                            "employees": group})
+                        continue
+                    start, end, trainer = slot
+                    calendar.book(start, end, trainer, keys)
+                    sessions.append(self._session(gap, group, start, trainer, duration))
+
+        result = {
+            "status": "success" if not unscheduled else "partial",
+            "sessions": sessions,
+            "unscheduled": unscheduled,
+            "unresolved": sorted(unresolved, key=str),
+        }
+        if data.get("commit") and sessions:
+            result["saved"] = TrainingScheduleData().create_training_schedule_bulk(sessions)
+        return result
+
+    @staticmethod
+    def _first_free_slot(calendar, trainers, employees, date_from, date_to,
+                         day_start, day_end, duration):
+        length = timedelta(hours=duration)
+        step = timedelta(minutes=SLOT_STEP_MINUTES)
+        day = date_from
+        while day <= date_to:
+            if day.weekday() not in OFF_WEEKDAYS:
+                start = datetime.combine(day, day_start)
+                last = datetime.combine(day, day_end) - length
+                while start <= last:
+                    end = start + length
+                    if not calendar.conflicts(start, end, None, employees):
+                        for trainer in trainers:
+                            if not calendar.conflicts(start, end, trainer):
+                                return start, end, trainer
+                    start += step
+            day += timedelta(days=1)
+        return None
+
+    @staticmethod
+    def _session(gap, group, start, trainer, duration):
+        return {
+            "skill_id": gap.get("skill_id"),
+            "skill_name": gap.get("skill_name"),
+            "skill_code": gap.get("skill_code"),
+            "skill_type": gap.get("skill_type"),
+            "employee_ids": [e["id"] for e in group],
+            "employee_names": [e.get("name") for e in group],
+            "training_date": start.strftime("%d/%m/%Y"),
+            "training_day": start.strftime("%A"),
+            "training_time": start.strftime("%H:%M"),
+            "duration_hours": duration,
+            "trainer_name": trainer,
+            "notes": "Auto-scheduled from skill gaps",
+        }
+
+
+# 🔗 Path Mapping
+@TrainingSchedulerAPI.path(model=TrainingSchedulerData, path="")
+def _path():
+    return TrainingSchedulerData()
+
+
+# 🔹 POST → {"sessions": [...]} checks, {"gaps"/"plantt_code": ...} plans
+@TrainingSchedulerAPI.json(model=TrainingSchedulerData, request_method="POST")
+@instrumented("hr_training_scheduler.POST")
+def _post_json(model, request):
+    data = request.json or {}
+    try:
+        if "sessions" in data:
+            return model.check_sessions(data["sessions"])
+        return model.plan(data)
+    except (TypeError, ValueError) as e:
+        return {"status": "error", "message": f"Invalid scheduling request: {e}"}